@@ -3,16 +3,31 @@
 import os
 import subprocess
 import re
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
 ANDROID_REMOTE_URL = os.getenv('remote_url', 'http://127.0.0.1:4723')
 
 # Default is for local run. CI sets android_deviceName from YAML.
-# Set to empty, "any", or "any_active" to auto-pick the first device from `adb devices`.
+# Set to empty, "any", or "any_active" to auto-pick the first healthy device from `adb devices`.
 _ANDROID_DEVICE_NAME_RAW = os.getenv('android_deviceName', 'any')
+# Off under an offline transport (pytest --fake-appium / --replay): no device behind
+# the sessions, so any/any_active resolve to the placeholder without running adb.
+ANDROID_DEVICE_DISCOVERY = True
+_PLACEHOLDER_ANDROID_DEVICE = 'emulator-5554'
 
 
-def _first_connected_android_device():
-    # Return the first connected device/emulator id from `adb devices`, or None.
+# Base ports for parallel runs: each leased device gets base + slot.
+# UiAutomator2 systemPort must be unique per device on one Appium host.
+ANDROID_SYSTEM_PORT_BASE = int(os.getenv('android_systemPortBase', '8200'))
+# Optional: one Appium server per device on base + slot (e.g. 4723, 4724, ...).
+# Leave empty to send every worker to remote_url.
+APPIUM_BASE_PORT = os.getenv('appium_basePort', '')
+
+
+def _connected_android_devices():
+    # Return all connected device/emulator ids from `adb devices` (may be empty).
     try:
         out = subprocess.run(
             ['adb', 'devices'],
@@ -21,27 +36,18 @@ def _first_connected_android_device():
             timeout=10,
         )
         if out.returncode != 0:
-            return None
+            return []
         # Lines like "emulator-5554" or "R5CT4037HVT"
+        devices = []
         for line in out.stdout.splitlines():
             m = re.match(r'^(\S+)\s+device\s*$', line)
             if m:
-                return m.group(1)
+                devices.append(m.group(1))
+        return devices
     except (FileNotFoundError, subprocess.TimeoutExpired):
-        pass
-    return None
-
-
-def get_android_device_name():
-    # Device name for Appium: from env, or first connected device if env is any/any_active/empty
-    raw = _ANDROID_DEVICE_NAME_RAW.strip().lower()
-    if raw in ('', 'any', 'any_active'):
-        device = _first_connected_android_device()
-        return device if device else 'emulator-5554'
-    return _ANDROID_DEVICE_NAME_RAW
+        return []
 
 
-ANDROID_DEVICE_NAME = get_android_device_name()
 ANDROID_APP_PACKAGE = os.getenv(
     'android_appPackage',
     'com.example.android.architecture.blueprints.main',
@@ -57,9 +63,151 @@ ANDROID_APP_WAIT_ACTIVITY = os.getenv(
 # Leave empty to launch the already-installed app without reinstalling.
 # Set android_app env var to an APK path when you want Appium to (re)install it.
 ANDROID_APP_PATH = os.getenv('android_app', '')
+# Room database of the app, used for bulk seeding over `adb shell run-as`
+ANDROID_TASKS_DB = os.getenv('android_tasksDb', 'Tasks.db')
+ANDROID_TASKS_TABLE = os.getenv('android_tasksTable', 'task')
+# Emulator snapshot of the clean app state (--isolation snapshot)
+EMULATOR_SNAPSHOT_NAME = os.getenv('emulator_snapshotName', 'todo_app_clean')
+EMULATOR_SNAPSHOT_TIMEOUT = float(os.getenv('emulator_snapshotTimeout', '120'))
+
+
+# Device discovery runs on first use (not at import), is cached for the process
+# and probes all connected devices and the Appium server concurrently.
+ANDROID_PROBE_TIMEOUT = float(os.getenv('android_probeTimeout', '10'))
+
+_discovery = None
+_discovery_lock = threading.Lock()
+
+
+def _probe_android_device(device):
+    # One adb round trip per device: boot completed + app installed
+    probe = {'device': device, 'booted': False, 'app_installed': False}
+    try:
+        out = subprocess.run(
+            ['adb', '-s', device, 'shell', f'getprop sys.boot_completed; pm path {ANDROID_APP_PACKAGE}'],
+            capture_output=True,
+            text=True,
+            timeout=ANDROID_PROBE_TIMEOUT,
+        )
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return probe
+    lines = out.stdout.split()
+    probe['booted'] = bool(lines) and lines[0] == '1'
+    # With android_app set, Appium installs the APK itself
+    probe['app_installed'] = bool(ANDROID_APP_PATH) or any(line.startswith('package:') for line in lines)
+    return probe
+
+
+def _appium_reachable(url):
+    try:
+        with urllib.request.urlopen(url.rstrip('/') + '/status', timeout=ANDROID_PROBE_TIMEOUT) as response:
+            return response.status == 200
+    except (OSError, ValueError):
+        return False
+
 
+def discover_android_devices(refresh=False):
+    """Probe the connected Android devices; cached for the process unless `refresh`.
 
-def _android_options(device_override=None):
+    Returns one dict per device in `adb devices` order with 'booted'
+    (sys.boot_completed), 'app_installed', 'appium' (remote_url answers
+    /status; not checked with per-device servers, appium_basePort) and
+    'healthy' (all three).
+    """
+    global _discovery
+    with _discovery_lock:
+        if _discovery is None or refresh:
+            devices = _connected_android_devices()
+            with ThreadPoolExecutor(max_workers=len(devices) + 1) as pool:
+                appium = None if APPIUM_BASE_PORT else pool.submit(_appium_reachable, ANDROID_REMOTE_URL)
+                probes = list(pool.map(_probe_android_device, devices))
+            reachable = appium.result() if appium is not None else True
+            for probe in probes:
+                probe['appium'] = reachable
+                probe['healthy'] = probe['booted'] and probe['app_installed'] and reachable
+            _discovery = probes
+        return [dict(probe) for probe in _discovery]
+
+
+def healthy_android_devices():
+    # Ids of the devices that passed every probe
+    return [probe['device'] for probe in discover_android_devices() if probe['healthy']]
+
+
+def get_android_device_name():
+    # Device name for Appium: from env, or the first healthy device if env is any/any_active/empty
+    # (first connected one when none is healthy, so Appium reports the actual problem)
+    raw = _ANDROID_DEVICE_NAME_RAW.strip().lower()
+    if raw in ('', 'any', 'any_active'):
+        if not ANDROID_DEVICE_DISCOVERY:
+            return _PLACEHOLDER_ANDROID_DEVICE
+        probes = discover_android_devices()
+        for probe in probes:
+            if probe['healthy']:
+                return probe['device']
+        return probes[0]['device'] if probes else _PLACEHOLDER_ANDROID_DEVICE
+    return _ANDROID_DEVICE_NAME_RAW
+
+
+def __getattr__(name):
+    # ANDROID_DEVICE_NAME used to be resolved at import; now it is resolved on first access
+    if name == 'ANDROID_DEVICE_NAME':
+        return get_android_device_name()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+# Capability profiles (pytest --caps-profile, env appium_capsProfile): speed-relevant
+# capabilities layered over the base set.  "isolated" is the base set itself;
+# "fast" skips re-initialization (needs the UiAutomator2 server and settings app
+# already installed, i.e. one earlier session on the device) and trims idle waits;
+# "debug" keeps sessions alive at breakpoints and logs more on failures.
+CAPABILITY_PROFILES = {
+    'android': {
+        'isolated': {},
+        'fast': {
+            'skipServerInstallation': True,
+            'skipDeviceInitialization': True,
+            'disableWindowAnimation': True,
+            'settings[ignoreUnimportantViews]': True,
+            'settings[waitForIdleTimeout]': 0,
+            'settings[actionAcknowledgmentTimeout]': 0,
+        },
+        'debug': {
+            'newCommandTimeout': 3600,
+            'printPageSourceOnFindFailure': True,
+            'skipLogcatCapture': False,
+        },
+    },
+    'ios': {
+        'isolated': {},
+        'fast': {
+            'waitForIdleTimeout': 0,
+            'waitForQuiescence': False,
+            'animationCoolOffTimeout': 0,
+            'reduceMotion': True,
+            'settings[snapshotMaxDepth]': 30,
+        },
+        'debug': {
+            'newCommandTimeout': 3600,
+            'printPageSourceOnFindFailure': True,
+            'showXcodeLog': True,
+        },
+    },
+}
+CAPABILITY_PROFILE = os.getenv('appium_capsProfile', 'isolated')
+
+
+def _apply_profile(options, platform, profile=None):
+    profile = profile or CAPABILITY_PROFILE
+    profiles = CAPABILITY_PROFILES[platform]
+    if profile not in profiles:
+        raise ValueError(f'Unknown capability profile {profile!r}; expected one of {", ".join(profiles)}')
+    for name, value in profiles[profile].items():
+        options.set_capability(name, value)
+    return options
+
+
+def _android_options(device_override=None, system_port=None, profile=None):
     from appium.options.android import UiAutomator2Options
     if device_override is None or str(device_override).strip().lower() in ('', 'any', 'any_active'):
         device_name = get_android_device_name()
@@ -74,7 +222,68 @@ def _android_options(device_override=None):
         options.set_capability('app', ANDROID_APP_PATH)
     options.set_capability('noReset', False)
     options.set_capability('autoGrantPermissions', True)
-    return options
+    if system_port is not None:
+        options.set_capability('systemPort', system_port)
+    return _apply_profile(options, 'android', profile)
+
+
+# HTTP transport to the Appium server (shared keep-alive pool per process)
+APPIUM_CONNECT_TIMEOUT = float(os.getenv('appium_connectTimeout', '10'))
+# Session creation can take minutes (install, UiAutomator2 server start)
+APPIUM_READ_TIMEOUT = float(os.getenv('appium_readTimeout', '300'))
+APPIUM_RETRIES = int(os.getenv('appium_retries', '2'))
+APPIUM_POOL_SIZE = int(os.getenv('appium_poolSize', '4'))
+# Appium servers (host:port) kept in the pool, e.g. one per device with appium_basePort
+APPIUM_NUM_POOLS = int(os.getenv('appium_numPools', '4'))
+
+
+# Sync layer: state polling used by test helpers instead of fixed sleeps
+SYNC_TIMEOUT = float(os.getenv('sync_timeout', '5.0'))
+SYNC_POLL_INTERVAL = float(os.getenv('sync_pollInterval', '0.1'))
+
+
+# Scroll-aware task lookup in long lists: swipe length (fraction of the list
+# height, < 1 so consecutive pages overlap) and upper bound of swipes per scan
+SCROLL_PERCENT = float(os.getenv('scroll_percent', '0.75'))
+SCROLL_MAX_SWIPES = int(os.getenv('scroll_maxSwipes', '200'))
+
+
+# Failure artifacts: WebDriver commands kept in the ring buffer, logcat lines
+# captured on failure, and the time allowed to write pending bundles at exit
+ARTIFACTS_COMMANDS = int(os.getenv('artifacts_commands', '50'))
+ARTIFACTS_LOGCAT_LINES = int(os.getenv('artifacts_logcatLines', '2000'))
+ARTIFACTS_FLUSH_TIMEOUT = float(os.getenv('artifacts_flushTimeout', '60'))
+
+
+# Session health monitor: how long finds must keep missing before the app
+# state is queried (and the minimum time between two queries)
+HEALTH_CHECK_INTERVAL = float(os.getenv('health_checkInterval', '2.0'))
+
+
+# Wait engine (--waits): first back-off after a missed poll and its cap, the
+# longest server-side (implicit wait) block per poll, and the times-to-pass
+# kept per wait for the adaptive schedule
+WAIT_POLL_MIN = float(os.getenv('wait_pollMin', '0.05'))
+WAIT_POLL_MAX = float(os.getenv('wait_pollMax', '0.5'))
+WAIT_SERVER_SLICE = float(os.getenv('wait_serverSlice', '2.0'))
+WAIT_HISTORY = int(os.getenv('wait_history', '20'))
+# Most wait keys saved in the pytest cache (least recently used dropped)
+WAIT_HISTORY_KEYS = int(os.getenv('wait_historyKeys', '500'))
+
+
+# Device metrics (--device-metrics): sampling interval and the budgets of a
+# test (0: none); a perf_budget marker overrides them per test
+METRICS_INTERVAL = float(os.getenv('metrics_interval', '1.0'))
+METRICS_MAX_MEMORY_GROWTH_KB = float(os.getenv('metrics_maxMemoryGrowthKb', '0'))
+METRICS_MAX_MEMORY_PER_TASK_KB = float(os.getenv('metrics_maxMemoryPerTaskKb', '0'))
+METRICS_MAX_CPU_PERCENT = float(os.getenv('metrics_maxCpuPercent', '0'))
+METRICS_MAX_JANK_PERCENT = float(os.getenv('metrics_maxJankPercent', '0'))
+
+
+# Soak test (--soak): most tasks kept in the list (rows on screen) and the
+# number of windows a run's latencies are cut into to measure drift
+SOAK_MAX_TASKS = int(os.getenv('soak_maxTasks', '6'))
+SOAK_WINDOWS = int(os.getenv('soak_windows', '5'))
 
 
 # iOS Config
@@ -87,7 +296,7 @@ IOS_BUNDLE_ID = os.getenv('ios_bundleId', 'com.example.todo')
 IOS_APP_PATH = os.getenv('ios_app', '/path/to/Todo.app')
 
 
-def _ios_options():
+def _ios_options(profile=None):
     from appium.options.ios import XCUITestOptions
     options = XCUITestOptions()
     options.set_capability('deviceName', IOS_DEVICE_NAME)
@@ -96,14 +305,16 @@ def _ios_options():
     options.set_capability('app', IOS_APP_PATH)
     options.set_capability('automationName', 'XCUITest')
     options.set_capability('noReset', False)
-    return options
+    return _apply_profile(options, 'ios', profile)
 
 
-def todo_driver_options(platform: str = 'android', device_override=None):
+def todo_driver_options(platform: str = 'android', device_override=None, system_port=None, profile=None):
     """Return Appium capability options for the Todo app on the given platform.
 
     device_override: optional device id or 'any'/'any_active' (e.g. from pytest --device).
                      For Android, when None or any/any_active, uses env or first from adb.
+    system_port: optional UiAutomator2 systemPort (unique per device in parallel runs).
+    profile: capability profile from CAPABILITY_PROFILES (default: CAPABILITY_PROFILE).
 
     Usage::
 
@@ -113,8 +324,8 @@ def todo_driver_options(platform: str = 'android', device_override=None):
     """
     p = platform.lower()
     if p == 'android':
-        return _android_options(device_override=device_override)
+        return _android_options(device_override=device_override, system_port=system_port, profile=profile)
     if p == 'ios':
-        return _ios_options()
+        return _ios_options(profile=profile)
     raise ValueError(f'Unsupported platform: {platform!r}')
 
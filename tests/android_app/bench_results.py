@@ -0,0 +1,98 @@
+"""
+Result store for the scalability benchmarks (test_todo_app_benchmarks.py).
+
+Measurements are kept as ``metric -> list size -> [seconds per round]`` and
+written as JSON, so runs can be compared with ``--benchmark-compare``.
+For every metric the summary also reports the growth exponent between
+consecutive list sizes (time ~ size^k): k ~ 0 is constant, k ~ 1 linear,
+and anything above SUPERLINEAR_EXPONENT is flagged.
+"""
+
+import json
+import math
+import platform as host_platform
+import time
+from pathlib import Path
+
+from perf_stats import percentile
+
+SUPERLINEAR_EXPONENT = 1.2
+
+
+class BenchmarkResults:
+
+    def __init__(self):
+        self.results = {}
+        self.baseline = None
+
+    def add(self, metric: str, size: int, seconds: float) -> None:
+        self.results.setdefault(metric, {}).setdefault(str(size), []).append(seconds)
+
+    def medians(self) -> dict:
+        return {
+            metric: {size: percentile(values, 50) for size, values in by_size.items()}
+            for metric, by_size in self.results.items()
+        }
+
+    @staticmethod
+    def exponents(by_size: dict) -> list:
+        # [(size_a, size_b, k)] for consecutive sizes with t(b)/t(a) = (b/a)^k
+        sizes = sorted(by_size, key=int)
+        growth = []
+        for a, b in zip(sizes, sizes[1:]):
+            if by_size[a] > 0 and by_size[b] > 0 and int(b) > int(a):
+                k = math.log(by_size[b] / by_size[a]) / math.log(int(b) / int(a))
+                growth.append((a, b, k))
+        return growth
+
+    def load_baseline(self, path) -> None:
+        self.baseline = json.loads(Path(path).read_text())['medians']
+
+    # RUN_STATS protocol
+
+    def as_dict(self) -> dict:
+        return self.results
+
+    def merge(self, data: dict) -> None:
+        for metric, by_size in data.items():
+            for size, values in by_size.items():
+                self.results.setdefault(metric, {}).setdefault(size, []).extend(values)
+
+    def __bool__(self):
+        return bool(self.results)
+
+    def summary(self) -> str:
+        medians = self.medians()
+        lines = [f'{"metric":<28} {"size":>6} {"median s":>10} {"vs baseline":>12}']
+        flagged = []
+        for metric, by_size in sorted(medians.items()):
+            for size in sorted(by_size, key=int):
+                ratio = ''
+                base = (self.baseline or {}).get(metric, {}).get(size)
+                if base:
+                    ratio = f'x{by_size[size] / base:.2f}'
+                lines.append(f'{metric:<28} {size:>6} {by_size[size]:>10.3f} {ratio:>12}')
+            for a, b, k in self.exponents(by_size):
+                if k > SUPERLINEAR_EXPONENT:
+                    flagged.append(f'{metric}: {a} -> {b} tasks grows as size^{k:.2f}')
+        if flagged:
+            lines.append('')
+            lines.append('super-linear growth:')
+            lines.extend(f'  {line}' for line in flagged)
+        return '\n'.join(lines)
+
+    def write_json(self, path, **metadata) -> None:
+        Path(path).write_text(json.dumps({
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'host': host_platform.node(),
+            **metadata,
+            'medians': self.medians(),
+            'rounds': self.results,
+            'growth': {
+                metric: [{'from': a, 'to': b, 'exponent': k} for a, b, k in self.exponents(by_size)]
+                for metric, by_size in self.medians().items()
+            },
+        }, indent=2))
+
+
+BENCH = BenchmarkResults()
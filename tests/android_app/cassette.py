@@ -0,0 +1,222 @@
+"""
+Record and replay of the Appium HTTP traffic of a run (cassettes).
+
+``--record PATH`` sends every WebDriver request to the Appium server as
+usual and writes each request (method, path, body) with its parsed response
+and its latency to a gzipped JSON cassette at the end of the run.
+``--replay PATH`` serves the same responses back without a server or
+device: the connection answers each request from the cassette and sleeps for
+the recorded latency times ``--replay-latency`` (0: no device time at all,
+0.5: a server twice as fast).  The replay summary puts the time slept for the
+"device" next to the run's wall time; the difference is harness time, so the
+harness can be profiled and tuned offline.
+
+Both hook into the transport (``RemoteConnection._request``), below Selene,
+the wait engine and every driver wrapper, so replayed runs exercise the same
+harness code.  Matching: requests are answered in recorded order per
+(method, path, body).  A request repeated more often than in the recording
+(polling) gets its last response again; a body never recorded (e.g. an
+implicit wait computed from the time left) takes the next response recorded
+for the same method and path.  A request without any recorded response
+fails with a WebDriver error naming it.
+
+adb traffic (seeding, logcat, health diagnostics) is not part of a
+cassette: record runs whose app state goes through Appium (e.g. on a device
+without the adb seeding channel) for a faithful replay.  Under xdist each
+worker records / replays its own ``<name>.<worker>`` cassette.
+"""
+
+import collections
+import copy
+import gzip
+import json
+import threading
+import time
+from pathlib import Path
+from urllib import parse
+
+import urllib3
+
+from transport import PooledAppiumConnection
+
+MODE = None      # None, 'record' or 'replay'
+LATENCY = 1.0    # replay: factor applied to the recorded latencies
+VERSION = 1
+
+
+class CassetteStats:
+    def __init__(self):
+        self.requests = 0
+        self.server_time = 0.0   # record: time waiting on the server; replay: recorded time
+        self.slept = 0.0
+        self.fuzzy = 0           # replay: matched on method and path only
+        self.repeated = 0        # replay: last response served again
+        self.misses = 0
+        self.wall = 0.0
+        self.started = time.perf_counter()
+
+    def as_dict(self) -> dict:
+        data = dict(vars(self))
+        data['wall'] = time.perf_counter() - self.started
+        del data['started']
+        return data
+
+    def merge(self, data: dict) -> None:
+        for name, value in data.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def __bool__(self):
+        return self.requests > 0
+
+    def summary(self) -> str:
+        # Own run time, or the workers' (summed) under xdist
+        wall = self.wall or time.perf_counter() - self.started
+        if MODE == 'record':
+            return (
+                f'cassette (record): {self.requests} requests, {self.server_time:.2f}s waiting on the server '
+                f'({self.server_time / wall:.0%} of {wall:.2f}s)'
+            )
+        return (
+            f'cassette (replay, latency x{LATENCY:g}): {self.requests} requests '
+            f'({self.fuzzy} matched on method/path, {self.repeated} repeated, {self.misses} not recorded); '
+            f'recorded server time {self.server_time:.2f}s, slept {self.slept:.2f}s, '
+            f'harness {max(0.0, wall - self.slept):.2f}s of {wall:.2f}s'
+        )
+
+
+STATS = CassetteStats()
+
+_recorded = []   # record: [method, path, body, latency, response or None, error or None]
+_record_lock = threading.Lock()
+_cassette = None  # replay: Cassette
+
+
+def cassette_path(path: str, worker: str = None) -> str:
+    """`path`, with the xdist worker id before the extension ('run.json.gz' -> 'run.gw0.json.gz')."""
+    if not worker:
+        return path
+    # Only the file name's extensions move: directories may contain dots ('./', 'my.dir')
+    file = Path(path)
+    suffixes = ''.join(file.suffixes)
+    stem = file.name[:len(file.name) - len(suffixes)] if suffixes else file.name
+    return str(file.with_name(f'{stem}.{worker}{suffixes}'))
+
+
+def connection(remote_server_addr: str):
+    """The command executor for a new session: recording, replaying or plain pooled."""
+    if MODE == 'record':
+        return RecordingConnection(remote_server_addr)
+    if MODE == 'replay':
+        return ReplayConnection(remote_server_addr)
+    return PooledAppiumConnection(remote_server_addr)
+
+
+def _path(url: str) -> str:
+    # Host and port differ between record and replay (leases, fake server ports)
+    parsed = parse.urlparse(url)
+    return parsed.path + (f'?{parsed.query}' if parsed.query else '')
+
+
+class RecordingConnection(PooledAppiumConnection):
+    def _request(self, method, url, body=None):
+        start = time.perf_counter()
+        response = error = None
+        try:
+            response = super()._request(method, url, body)
+            return response
+        except urllib3.exceptions.HTTPError as e:
+            error = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            with _record_lock:
+                # Copied: Selenium unwraps the response's elements in place
+                _recorded.append([method, _path(url), body, round(latency, 4), copy.deepcopy(response), error])
+                STATS.requests += 1
+                STATS.server_time += latency
+
+
+def save(path: str) -> int:
+    """Write the interactions recorded by this process, if any; return their number."""
+    with _record_lock:
+        data = {'version': VERSION, 'interactions': list(_recorded)}
+    if not data['interactions']:  # e.g. the xdist controller
+        return 0
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    return len(data['interactions'])
+
+
+class Cassette:
+    """Recorded interactions, answered in order per request."""
+
+    def __init__(self, interactions):
+        self.interactions = interactions
+        self.used = [False] * len(interactions)
+        self.exact = collections.defaultdict(collections.deque)
+        self.loose = collections.defaultdict(collections.deque)
+        self.last = {}
+        self.lock = threading.Lock()
+        for index, (method, path, body, *_) in enumerate(interactions):
+            self.exact[(method, path, body)].append(index)
+            self.loose[(method, path)].append(index)
+
+    @classmethod
+    def load(cls, path: str) -> 'Cassette':
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != VERSION:
+            raise ValueError(f'{path}: cassette version {data.get("version")}, expected {VERSION}')
+        return cls(data['interactions'])
+
+    def answer(self, method: str, path: str, body):
+        """The interaction recorded for this request, or None."""
+        exact = (method, path, body)
+        with self.lock:
+            index = self._next(self.exact, exact)
+            if index is None and exact in self.last:
+                STATS.repeated += 1
+                return self.interactions[self.last[exact]]
+            if index is None:
+                # A body never recorded (e.g. a computed timeout): same method and path
+                index = self._next(self.loose, (method, path))
+                if index is None:
+                    return None
+                STATS.fuzzy += 1
+            self.used[index] = True
+            self.last[exact] = index
+            return self.interactions[index]
+
+    def _next(self, queues, key):
+        queue = queues.get(key)
+        while queue and self.used[queue[0]]:
+            queue.popleft()
+        return queue[0] if queue else None
+
+
+def load(path: str) -> int:
+    """Load the cassette to replay; return its number of interactions."""
+    global _cassette
+    _cassette = Cassette.load(path)
+    return len(_cassette.interactions)
+
+
+class ReplayConnection(PooledAppiumConnection):
+    def _request(self, method, url, body=None):
+        path = _path(url)
+        interaction = _cassette.answer(method, path, body)
+        STATS.requests += 1
+        if interaction is None:
+            STATS.misses += 1
+            message = f'No response recorded for {method} {path} {body or ""}'.strip()
+            return {'status': 500, 'value': json.dumps(
+                {'value': {'error': 'unknown error', 'message': message, 'stacktrace': ''}}
+            )}
+        latency, response, error = interaction[3:]
+        STATS.server_time += latency
+        if LATENCY > 0:
+            time.sleep(latency * LATENCY)
+            STATS.slept += latency * LATENCY
+        if error is not None:
+            raise urllib3.exceptions.ProtocolError(f'(replayed) {error}')
+        return copy.deepcopy(response)
@@ -6,10 +6,22 @@ Run with:
     pytest tests/android_app/test_todo_app.py --platform android --device emulator-5554
     pytest tests/android_app/test_todo_app.py --platform android --device any
     pytest tests/android_app/test_todo_app.py --platform ios
+    pytest tests/android_app/test_todo_app.py --platform android --isolation app-reset
+    pytest tests/android_app/test_todo_app.py --platform android --isolation snapshot   # emulator
+    pytest tests/android_app/test_todo_app.py --platform android --prewarm   # needs 2 devices
+    pytest tests/android_app/test_todo_app.py --platform android --device pool -n 4
+    pytest tests/android_app/test_todo_app.py --platform android --assert-mode snapshot
+    pytest tests/android_app/test_todo_app.py --fake-appium        # no device / Appium needed
+    pytest tests/android_app/test_todo_app.py -n 4 --schedule longest-first
+    pytest tests/android_app/test_todo_app.py --shard 1/3 --schedule failed-first
 """
 
+import json
 import os
+import random
 import sys
+import time
+import warnings
 from pathlib import Path
 
 # Ensure project root and this package are on path so config and locators import
@@ -19,12 +31,33 @@ for _path in (_project_root, _android_app_dir):
     if str(_path) not in sys.path:
         sys.path.insert(0, str(_path))
 
+import allure
 import pytest
-from appium import webdriver
 from selene import browser
 
-import config
-from locators import get_locators
+import cassette
+import config as settings  # not `config`: pytest hooks take a `config` argument
+import device_metrics
+import failure_artifacts
+import health
+import instrumentation
+import locator_compiler
+import results_sink
+import run_history
+from bench_results import BENCH
+import scrolling
+import seeding
+import sessions
+import soak
+import snapshot
+import sync
+import text_entry
+import transport
+import waits
+from device_pool import NoDeviceAvailable, lease_device
+from fake_appium import FakeAppiumServer
+from locators import AndroidLocators, get_locators
+from sessions import SessionPrewarmer, SharedSession, SnapshotSession, new_driver
 
 
 def pytest_addoption(parser):
@@ -40,9 +73,397 @@ def pytest_addoption(parser):
         action='store',
         default='',
         help='Device id for Appium (e.g. emulator-5554, R5CT4037HVT). '
-             'Use "any" or "any_active" to pick the first from adb devices. '
-             'Default: use env android_deviceName or first connected device.',
+             'Use "any" or "any_active" to pick the first from adb devices, '
+             '"pool" to lease a distinct connected device per xdist worker. '
+             'Default: use env android_deviceName or first connected device '
+             '(under xdist: pool).',
     )
+    parser.addoption(
+        '--isolation',
+        action='store',
+        default='new-session',
+        choices=['new-session', 'app-reset', 'snapshot'],
+        help='How tests are isolated from each other: "new-session" starts a fresh '
+             'Appium session per test; "app-reset" keeps one session for the run and '
+             'clears/relaunches the app between tests (new session only if the reset fails); '
+             '"snapshot" keeps one session and restores an emulator snapshot of the clean '
+             'app between tests (app-reset where snapshots are unsupported).',
+    )
+    parser.addoption(
+        '--caps-profile',
+        action='store',
+        default=None,
+        choices=['isolated', 'fast', 'debug'],
+        help='Appium capability profile (config.CAPABILITY_PROFILES; default: env '
+             'appium_capsProfile or "isolated").  Compare them with profile_bench.py.',
+    )
+    parser.addoption(
+        '--prewarm',
+        action='store_true',
+        default=False,
+        help='With new-session isolation, start the next test\'s Appium session in the '
+             'background while the current test runs.  Sessions alternate between two '
+             'Android devices (the test device and a second leased one).',
+    )
+    parser.addoption(
+        '--assert-mode',
+        action='store',
+        default='remote',
+        choices=['remote', 'snapshot'],
+        help='How check_screen() batches are evaluated: "remote" runs one Selene assertion '
+             'per check; "snapshot" fetches the page source once per screen state and '
+             'evaluates all checks locally.',
+    )
+    parser.addoption(
+        '--waits',
+        action='store',
+        default='adaptive',
+        choices=['server', 'adaptive', 'selene'],
+        help='Wait engine for should()/click()/...: "adaptive" (default) backs off, scheduled from each '
+             'wait\'s past times-to-pass; "server" also waits for missing elements on the device (raises '
+             'the session\'s implicit wait); "selene" is Selene\'s back-to-back polling.',
+    )
+    parser.addoption(
+        '--text-entry',
+        action='store',
+        default='fast',
+        choices=['fast', 'type'],
+        help='How helpers fill text fields: "fast" sets the text in one command (IME bypass or paste '
+             'on Android, verified, falling back to typing); "type" is Selene\'s type().',
+    )
+    parser.addoption(
+        '--compile-locators',
+        action='store',
+        default='on',
+        choices=['on', 'check', 'off'],
+        help='Android XPath locators: "on" rewrites the supported ones to UiSelector before the '
+             'tests are collected; "check" also repeats every compiled find with the XPath and '
+             'reverts a locator to XPath when they disagree; "off" uses them as written.',
+    )
+    parser.addoption(
+        '--lookup',
+        action='store',
+        default='screen',
+        choices=['screen', 'scroll'],
+        help='How helpers locate task rows: "screen" only finds rows currently on screen; '
+             '"scroll" scrolls long lists first (UiScrollable search on Android, '
+             'scroll-and-scan with a cached position per title otherwise).',
+    )
+    parser.addoption(
+        '--schedule',
+        action='store',
+        default='collection',
+        choices=['collection', 'longest-first', 'failed-first'],
+        help='Test order from the duration/outcome history (pytest cache): "longest-first" '
+             'balances xdist workers; "failed-first" runs recently failed and flaky cases first.',
+    )
+    parser.addoption(
+        '--shard',
+        action='store',
+        default='',
+        help='Run one of N shards of equal expected duration, e.g. --shard 1/3 '
+             '(from the duration history; tests without history count as the median).',
+    )
+    parser.addoption(
+        '--history-runs',
+        action='store',
+        type=int,
+        default=10,
+        help='Results per test kept in the duration/outcome history (default: 10).',
+    )
+    parser.addoption(
+        '--results-jsonl',
+        action='store',
+        default='',
+        help='Append one JSON line per test and per helper step to this file as tests finish '
+             '(default: off); aggregate runs with results_trend.py.',
+    )
+    parser.addoption(
+        '--timings-json',
+        action='store',
+        default='',
+        help='Write the per-command/helper latency summary of the run to this JSON file '
+             '(default: off).',
+    )
+    parser.addoption(
+        '--soak',
+        action='store_true',
+        default=False,
+        help='Run the soak test (tests marked "soak"); skipped otherwise.',
+    )
+    parser.addoption(
+        '--soak-iterations',
+        action='store',
+        type=int,
+        default=500,
+        help='Operations per soak run (0: no limit, run for --soak-duration; default: 500).',
+    )
+    parser.addoption(
+        '--soak-duration',
+        action='store',
+        type=float,
+        default=0.0,
+        help='Seconds per soak run (0: no limit); the run ends at whichever limit comes first.',
+    )
+    parser.addoption(
+        '--soak-seed',
+        action='store',
+        type=int,
+        default=None,
+        help='Seed of the soak operation sequence (default: random, printed in the summary).',
+    )
+    parser.addoption(
+        '--soak-max-drift',
+        action='store',
+        type=float,
+        default=0.0,
+        help='Fail the soak run when an operation\'s last-window median latency exceeds its '
+             'first-window median by this factor (0: report only).',
+    )
+    parser.addoption(
+        '--soak-json',
+        action='store',
+        default='soak_results.json',
+        help='Write soak results (latency series and drift per operation) to this JSON file.',
+    )
+    parser.addoption(
+        '--device-metrics',
+        action='store_true',
+        default=False,
+        help='Sample the app\'s memory, CPU and frames during each test, attach the summary and fail '
+             'tests over the metrics_max* budgets (or their perf_budget marker).',
+    )
+    parser.addoption(
+        '--run-benchmarks',
+        action='store_true',
+        default=False,
+        help='Run the scalability benchmarks (tests marked "benchmark"); skipped otherwise.',
+    )
+    parser.addoption(
+        '--benchmark-sizes',
+        action='store',
+        default='10,100,1000',
+        help='Comma-separated task list sizes for the benchmarks (default: 10,100,1000).',
+    )
+    parser.addoption(
+        '--benchmark-rounds',
+        action='store',
+        type=int,
+        default=3,
+        help='Repetitions of each repeatable benchmark measurement (median is reported).',
+    )
+    parser.addoption(
+        '--benchmark-json',
+        action='store',
+        default='benchmark_results.json',
+        help='Write benchmark results to this JSON file.',
+    )
+    parser.addoption(
+        '--benchmark-compare',
+        action='store',
+        default='',
+        help='Previous benchmark JSON to compare against (ratios in the summary).',
+    )
+    parser.addoption(
+        '--fake-appium',
+        action='store_true',
+        default=False,
+        help='Run against an in-process fake Appium server simulating the Todo app '
+             '(no device or Appium server needed).',
+    )
+    parser.addoption(
+        '--record',
+        action='store',
+        default='',
+        metavar='PATH',
+        help='Record every Appium request/response with its latency to a gzipped JSON cassette '
+             '(one per xdist worker: PATH with the worker id before the extension).',
+    )
+    parser.addoption(
+        '--replay',
+        action='store',
+        default='',
+        metavar='PATH',
+        help='Answer Appium requests from a cassette written by --record (no device or server).',
+    )
+    parser.addoption(
+        '--replay-latency',
+        action='store',
+        type=float,
+        default=1.0,
+        help='Factor applied to the recorded latencies on --replay (0: no waiting, 0.5: twice as fast).',
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: scalability benchmark, run with --run-benchmarks')
+    config.addinivalue_line('markers', 'soak: long-running soak test, run with --soak')
+    config.addinivalue_line('markers', 'name(text): human readable test case name')
+    config.addinivalue_line('markers', 'test_case_id(id): stable test case id, keys the duration history')
+    config.addinivalue_line(
+        'markers', 'perf_budget(**limits): device metric budgets of the test, e.g. memory_per_task_kb=50'
+    )
+    cache = getattr(config, 'cache', None)
+    # Fake Appium / replayed timings say nothing about devices: separate history
+    variant = config.getoption('--platform') + (
+        '-fake' if config.getoption('--fake-appium') else '-replay' if config.getoption('--replay') else ''
+    )
+    config._run_history = run_history.RunHistory.load(cache, variant, config.getoption('--history-runs')) if cache else None
+    config._wait_history_key = f'{waits.CACHE_KEY}/{variant}'
+    if cache:
+        waits.load_history(cache.get(config._wait_history_key, {}))
+    config._schedule_note = None
+    if config._run_history is not None and not hasattr(config, 'workerinput'):
+        # Controller (or single process) records results; xdist forwards worker reports
+        config.pluginmanager.register(run_history.HistoryRecorder(config._run_history), 'todo_app_history')
+    if config.getoption('--results-jsonl') and not hasattr(config, 'workerinput'):
+        config.pluginmanager.register(results_sink.ResultSink(
+            config.getoption('--results-jsonl'), config.getoption('--platform'), variant,
+            device=config.getoption('--device'), workers=getattr(config.option, 'numprocesses', None) or 0,
+        ), 'todo_app_results')
+    snapshot.MODE = config.getoption('--assert-mode')
+    scrolling.MODE = config.getoption('--lookup')
+    waits.MODE = config.getoption('--waits')
+    text_entry.MODE = config.getoption('--text-entry')
+    locator_compiler.MODE = config.getoption('--compile-locators')
+    # Replayed sessions have no device to measure
+    device_metrics.ENABLED = config.getoption('--device-metrics') and not config.getoption('--replay')
+    # No adb (device discovery, database seeding) when sessions go to the fake server or a cassette
+    settings.ANDROID_DEVICE_DISCOVERY = seeding.ENABLED = not _offline(config)
+    if config.getoption('--platform').lower() == 'android':
+        locator_compiler.compile_locators(AndroidLocators)
+    if config.getoption('--caps-profile'):
+        _select_capability_profile(config.getoption('--caps-profile'))
+    if config.getoption('--benchmark-compare'):
+        BENCH.load_baseline(config.getoption('--benchmark-compare'))
+    _configure_cassette(config)
+    if config.getoption('--fake-appium'):
+        config._fake_appium = FakeAppiumServer().start()
+        _point_remote_url_at(config._fake_appium.url)
+
+
+def _configure_cassette(config):
+    record, replay = config.getoption('--record'), config.getoption('--replay')
+    if record and replay or replay and config.getoption('--fake-appium'):
+        raise pytest.UsageError('--replay cannot be combined with --record or --fake-appium')
+    worker = getattr(config, 'workerinput', {}).get('workerid')
+    if record:
+        cassette.MODE = 'record'
+        config._cassette_path = cassette.cassette_path(record, worker)
+    elif replay:
+        cassette.MODE = 'replay'
+        cassette.LATENCY = config.getoption('--replay-latency')
+        if not worker and getattr(config.option, 'numprocesses', None):
+            return  # xdist controller: only the workers open sessions
+        path = cassette.cassette_path(replay, worker)
+        try:
+            cassette.load(path if Path(path).exists() else replay)
+        except (OSError, ValueError) as e:
+            raise pytest.UsageError(f'--replay: cannot load {replay}: {e}')
+
+
+def _offline(config) -> bool:
+    # No real device behind the sessions: fake server or replayed cassette
+    return bool(config.getoption('--fake-appium') or config.getoption('--replay'))
+
+
+def _select_capability_profile(profile):
+    settings.CAPABILITY_PROFILE = profile
+
+
+def _point_remote_url_at(url):
+    # Send every new Appium session of this process to `url`
+    settings.ANDROID_REMOTE_URL = url
+    settings.IOS_REMOTE_URL = url
+
+
+def pytest_unconfigure(config):
+    sink = config.pluginmanager.get_plugin('todo_app_results')
+    if sink is not None:
+        sink.close()
+    fake = getattr(config, '_fake_appium', None)
+    if fake is not None:
+        fake.stop()
+
+
+@pytest.hookimpl(tryfirst=True)  # before xdist turns xdist_group markers into node ids
+def pytest_collection_modifyitems(config, items):
+    if not config.getoption('--run-benchmarks'):
+        skip = pytest.mark.skip(reason='benchmark: run with --run-benchmarks')
+        for item in items:
+            if 'benchmark' in item.keywords:
+                item.add_marker(skip)
+    if not config.getoption('--soak'):
+        skip = pytest.mark.skip(reason='soak: run with --soak')
+        for item in items:
+            if 'soak' in item.keywords:
+                item.add_marker(skip)
+    _schedule(config, items)
+
+
+def _schedule(config, items):
+    # Tag items with their history key, then shard/reorder them from the history
+    for item in items:
+        item.user_properties.append((run_history.PROPERTY, run_history.history_key(item)))
+    history = config._run_history
+    notes = []
+    if config.getoption('--shard'):
+        index, count = run_history.parse_shard(config.getoption('--shard'))
+        if history is None:
+            # No cache (-p no:cacheprovider): every test counts the same, so the shards
+            # take turns in collection order instead of every shard running the whole suite
+            selected = run_history.lpt_shards(items, run_history.RunHistory(), count)[index]
+            notes.append(f'shard {index + 1}/{count}: {len(selected)} tests, no duration history')
+        else:
+            selected = run_history.lpt_shards(items, history, count)[index]
+            expected = sum(run_history.expected_duration(item, history) for item in selected)
+            notes.append(f'shard {index + 1}/{count}: {len(selected)} tests, {expected:.1f}s expected')
+        chosen = {id(item) for item in selected}
+        config.hook.pytest_deselected(items=[item for item in items if id(item) not in chosen])
+        items[:] = selected
+    if history is not None:
+        schedule = config.getoption('--schedule')
+        if schedule == 'longest-first':
+            run_history.order_longest_first(items, history)
+        elif schedule == 'failed-first':
+            run_history.order_failed_first(items, history)
+        if schedule != 'collection':
+            notes.append(f'order: {schedule}')
+        workerinput = getattr(config, 'workerinput', None)
+        if workerinput and config.getoption('dist', default='no') == 'loadgroup':
+            shards = run_history.lpt_shards(items, history, workerinput['workercount'])
+            for index, shard in enumerate(shards):
+                for item in shard:
+                    item.add_marker(pytest.mark.xdist_group(f'history-shard-{index}'))
+    config._schedule_note = '; '.join(notes) or None
+
+
+def pytest_generate_tests(metafunc):
+    # Benchmarks are parametrized by task list size from --benchmark-sizes
+    if 'list_size' in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption('--benchmark-sizes').split(',') if size.strip()]
+        metafunc.parametrize('list_size', sizes)
+
+
+@pytest.fixture(scope='session')
+def benchmark_rounds(request):
+    return request.config.getoption('--benchmark-rounds')
+
+
+@pytest.fixture
+def soak_plan(request):
+    # Limits and seed of a soak run; a random seed is chosen (and reported) when none is given
+    iterations, duration = request.config.getoption('--soak-iterations'), request.config.getoption('--soak-duration')
+    if iterations <= 0 and duration <= 0:
+        raise pytest.UsageError('--soak needs --soak-iterations or --soak-duration above 0')
+    seed = request.config.getoption('--soak-seed')
+    return {
+        'test': request.node.nodeid,
+        'seed': seed if seed is not None else random.randrange(1_000_000),
+        'iterations': iterations,
+        'duration': duration,
+        'max_drift': request.config.getoption('--soak-max-drift'),
+    }
 
 
 @pytest.fixture(scope='session')
@@ -52,8 +473,52 @@ def platform(request):
 
 
 @pytest.fixture(scope='session')
-def device(request):
-    # Device id or any/any_active from --device CLI option
+def device_lease(request, platform, xdist_worker):
+    # Exclusive device for this worker when running from the device pool, else None.
+    # Pool is used for --device pool, and for any/any_active/default under xdist.
+    requested = request.config.getoption('--device', default='').strip().lower()
+    use_pool = requested == 'pool' or (
+        xdist_worker != 'master' and requested in ('', 'any', 'any_active')
+    )
+    if platform.lower() != 'android' or not use_pool or _offline(request.config):
+        yield None
+        return
+    lease = lease_device(_device_pool(request.config), xdist_worker)
+    yield lease
+    lease.release()
+
+
+def _device_pool(config) -> list:
+    # Healthy devices the lease slots (systemPort, Appium port) are numbered over.  Under xdist
+    # the controller discovers them once for all workers: a device flapping between two workers'
+    # own probes would shift the slots and hand two devices the same port.
+    workerinput = getattr(config, 'workerinput', None)
+    if workerinput is not None and 'device_pool' in workerinput:
+        return workerinput['device_pool']
+    return settings.healthy_android_devices()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    # xdist controller, before each worker starts: pass it the device pool
+    requested = node.config.getoption('--device', default='').strip().lower()
+    if (node.config.getoption('--platform').lower() == 'android' and not _offline(node.config)
+            and requested in ('pool', '', 'any', 'any_active')):
+        node.workerinput['device_pool'] = settings.healthy_android_devices()
+
+
+@pytest.fixture(scope='session')
+def xdist_worker(request):
+    # xdist worker id ("gw0", "gw1", ...) or "master" when not running in parallel
+    workerinput = getattr(request.config, 'workerinput', None)
+    return workerinput['workerid'] if workerinput else 'master'
+
+
+@pytest.fixture(scope='session')
+def device(request, device_lease):
+    # Device id or any/any_active from --device CLI option (leased id in pool mode)
+    if device_lease is not None:
+        return device_lease.device
     return request.config.getoption('--device', default='')
 
 
@@ -63,20 +528,243 @@ def locators(platform):
     return get_locators(platform)
 
 
+@pytest.fixture(scope='session')
+def isolation(request):
+    # Test isolation strategy from --isolation CLI option
+    return request.config.getoption('--isolation')
+
+
+@pytest.fixture(scope='session')
+def shared_session(platform, device, device_lease, isolation):
+    # Appium session kept alive for the whole run (app-reset / snapshot isolation)
+    if isolation not in ('app-reset', 'snapshot'):
+        yield None
+        return
+    session_class = SnapshotSession if isolation == 'snapshot' else SharedSession
+    session = session_class(platform, device, device_lease)
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope='session')
+def prewarmer(request, platform, device, device_lease, isolation, xdist_worker):
+    # Background creation of the next test's session (--prewarm, new-session isolation only).
+    # Appium runs one session per device, so a second device is leased for the warm sessions.
+    if not request.config.getoption('--prewarm') or isolation != 'new-session':
+        yield None
+        return
+    if platform.lower() != 'android':
+        warnings.warn('--prewarm needs two Android devices; running without prewarming')
+        yield None
+        return
+    leases = []  # taken here, released at the end
+    if _offline(request.config):
+        targets = [('fake-device-1', None), ('fake-device-2', None)]
+    else:
+        pool = _device_pool(request.config)
+        first = sessions.target_device(platform, device)
+        try:
+            # Both sessions run on one Appium server at once, so both need their own systemPort:
+            # a first device not leased from the pool would get the server's default (base + slot 0)
+            if device_lease is None:
+                leases.append(lease_device([first], xdist_worker, wait=0, pool=pool))
+            leases.append(lease_device([d for d in pool if d != first], xdist_worker, wait=0, pool=pool))
+        except NoDeviceAvailable as e:
+            for lease in leases:
+                lease.release()
+            warnings.warn(f'--prewarm needs a second device, running without prewarming: {e}')
+            yield None
+            return
+        targets = [(first, device_lease or leases[0]), (leases[-1].device, leases[-1])]
+    prewarm = SessionPrewarmer(platform, targets)
+    yield prewarm
+    prewarm.close()
+    for lease in leases:
+        lease.release()
+
+
 @pytest.fixture(scope='function', autouse=True)
-def mobile_management(platform, device):
-    # Set up the Appium driver via selene's browser before each test and quit after.
-    remote_url = (
-        config.ANDROID_REMOTE_URL
-        if platform.lower() == 'android'
-        else config.IOS_REMOTE_URL
-    )
-    browser.config.driver = webdriver.Remote(
-        remote_url,
-        options=config.todo_driver_options(platform, device_override=device or None),
+def latency_timings():
+    # Collect command/wait/helper latencies of this test and attach them to Allure
+    instrumentation.TIMINGS.start_test()
+    yield
+    allure.attach(
+        json.dumps(instrumentation.TIMINGS.test_summary(), indent=2),
+        name='latency',
+        attachment_type=allure.attachment_type.JSON,
     )
+
+
+@pytest.fixture(scope='function', autouse=True)
+def mobile_management(request, platform, device, device_lease, shared_session, prewarmer, latency_timings):
+    # Set up the Appium driver via selene's browser before each test and quit after.
+    # With a shared session the app is reset in place instead and the driver is kept.
+    # Known before the session starts, except with prewarming (sessions alternate devices)
+    expected = sessions.target_device(platform, device, device_lease) if prewarmer is None else ''
+    if expected:
+        health.check_quarantine(expected)
+    start = time.perf_counter()
+    if shared_session is not None:
+        browser.config.driver = shared_session.acquire()
+        instrumentation.TIMINGS.record('session', 'acquire shared', time.perf_counter() - start)
+    elif prewarmer is not None:
+        browser.config.driver = prewarmer.take()
+        instrumentation.TIMINGS.record('session', 'prewarmed', time.perf_counter() - start)
+    else:
+        browser.config.driver = new_driver(platform, device, device_lease)
+        instrumentation.TIMINGS.record('session', 'new', time.perf_counter() - start)
+    target = sessions.device_serial(browser.config.driver) or expected
+    request.node.user_properties.append((results_sink.DEVICE_PROPERTY, target))
+    try:
+        health.check_quarantine(target)
+    except BaseException:
+        if shared_session is None:
+            browser.quit()
+        raise
+    locator_compiler.install(browser.config.driver)
+    instrumentation.install(browser.config.driver)
+    failure_artifacts.install(browser.config.driver)
+    health.install(browser.config.driver, platform, adb=not _offline(request.config))
+    failure_artifacts.COMMANDS.start_test()
+    scrolling.reset()
+    # _wait_decorator / _build_wait_strategy are private Selene API: requirements.txt pins
+    # selene==2.0.0rc10, re-check both hooks before moving the pin
+    browser.config._wait_decorator = instrumentation.wait_decorator
+    browser.config._build_wait_strategy = waits.build_wait_strategy
+    # With Allure, failed tests are captured once by failure_artifacts, not on every failed wait;
+    # without it Selene's own screenshot/page source on failure stay on
+    browser.config.save_screenshot_on_failure = not failure_artifacts.active()
+    browser.config.save_page_source_on_failure = not failure_artifacts.active()
     browser.config.timeout = float(os.getenv('timeout', '10.0'))
+    device_metrics.start_test(browser.config.driver, platform, adb=not _offline(request.config))
 
     yield
 
-    browser.quit()
+    device_metrics.stop()
+    if shared_session is None:
+        browser.quit()
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    # Device metrics of the test body; over budget fails a test that passed
+    try:
+        result = yield
+    finally:
+        summary, exceeded = _finish_device_metrics(item)
+    if exceeded:
+        pytest.fail(f'Device metric budget exceeded: {"; ".join(exceeded)}', pytrace=False)
+    return result
+
+
+def _finish_device_metrics(item):
+    marker = item.get_closest_marker('perf_budget')
+    summary, exceeded = device_metrics.finish_test(
+        item.nodeid,
+        tasks_created=len(instrumentation.TIMINGS.test_samples.get('helper:create_task', [])),
+        budgets=marker.kwargs if marker else None,
+    )
+    if summary is not None:
+        allure.attach(json.dumps(summary, indent=2), name='device metrics', attachment_type=allure.attachment_type.JSON)
+        item.add_report_section('call', 'device metrics', json.dumps(summary, indent=2))
+    return summary, exceeded
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    # Failed test body: capture artifacts before teardown resets or quits the session
+    outcome = yield
+    report = outcome.get_result()
+    if report.when == 'call' and item.config.getoption('--results-jsonl'):
+        # Helper steps travel with the reports to the process writing the results
+        steps = results_sink.steps_of(instrumentation.TIMINGS.test_samples)
+        item.user_properties.append((results_sink.STEPS_PROPERTY, steps))
+    if report.when != 'call' or not report.failed:
+        return
+    driver = browser.config.driver
+    commands = failure_artifacts.capture(
+        driver,
+        item.config.getoption('--platform'),
+        logcat=not _offline(item.config),
+        live=health.failure(driver) is None,
+    )
+    if commands:
+        report.sections.append(('last commands', commands))
+
+
+# Run-wide stats printed in the terminal summary: (section title, stats object).
+# Stats objects provide as_dict()/merge() so xdist workers can report to the controller.
+RUN_STATS = {
+    'sync layer': sync.STATS,
+    'snapshot assertions': snapshot.STATS,
+    'scroll lookup': scrolling.STATS,
+    'locator compiler': locator_compiler.STATS,
+    'waits': waits.STATS,
+    'text entry': text_entry.STATS,
+    'appium transport': transport.STATS,
+    'cassette': cassette.STATS,
+    'session prewarm': sessions.STATS,
+    'failure artifacts': failure_artifacts.STATS,
+    'session health': health.STATS,
+    'device metrics': device_metrics.STATS,
+    'latency': instrumentation.TIMINGS,
+    'benchmarks': BENCH,
+    'soak': soak.SOAK,
+}
+
+
+def pytest_sessionfinish(session):
+    failure_artifacts.flush()
+    if cassette.MODE == 'record':
+        cassette.save(session.config._cassette_path)
+    # xdist workers hand their stats to the controller
+    workeroutput = getattr(session.config, 'workeroutput', None)
+    if workeroutput is not None:
+        workeroutput['run_stats'] = {title: stats.as_dict() for title, stats in RUN_STATS.items()}
+        return
+    history = session.config._run_history
+    if history is not None:
+        session.config._history_recorded = history.commit()
+        history.save(session.config.cache)
+        session.config.cache.set(session.config._wait_history_key, waits.history_to_save())
+    timings_json = session.config.getoption('--timings-json')
+    if timings_json and instrumentation.TIMINGS:
+        instrumentation.TIMINGS.write_json(timings_json)
+    if soak.SOAK:
+        soak.SOAK.write_json(
+            session.config.getoption('--soak-json'),
+            platform=session.config.getoption('--platform'),
+            device=session.config.getoption('--device'),
+            fake_appium=session.config.getoption('--fake-appium'),
+        )
+    if BENCH:
+        BENCH.write_json(
+            session.config.getoption('--benchmark-json'),
+            platform=session.config.getoption('--platform'),
+            device=session.config.getoption('--device'),
+            fake_appium=session.config.getoption('--fake-appium'),
+        )
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    # xdist controller: collect stats of a finished worker
+    for title, data in getattr(node, 'workeroutput', {}).get('run_stats', {}).items():
+        RUN_STATS[title].merge(data)
+
+
+def pytest_terminal_summary(terminalreporter):
+    for title, stats in RUN_STATS.items():
+        if stats:
+            terminalreporter.write_sep('-', title)
+            terminalreporter.write_line(stats.summary())
+    config = terminalreporter.config
+    if getattr(config, '_history_recorded', 0) or getattr(config, '_schedule_note', None):
+        terminalreporter.write_sep('-', 'duration history')
+        if config._schedule_note:
+            terminalreporter.write_line(config._schedule_note)
+        if getattr(config, '_history_recorded', 0):
+            terminalreporter.write_line(
+                f'history: {config._history_recorded} tests recorded '
+                f'({len(config._run_history.data)} known, pytest cache {config._run_history.key})'
+            )
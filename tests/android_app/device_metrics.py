@@ -0,0 +1,258 @@
+"""
+Device-side metrics of the app under test, sampled during each test.
+
+With ``--device-metrics`` a ``Sampler`` runs next to each test body:
+
+- memory and CPU: ``mobile: getPerformanceData`` (UiAutomator2; ``dumpsys
+  meminfo`` / ``cpuinfo`` on the device) for the app package, once at the
+  start, every ``config.METRICS_INTERVAL`` seconds on a background thread
+  and once at the end.  Memory is the app's total PSS, CPU its user +
+  kernel share.  The requests go to the command executor directly, past
+  the driver wrappers (they are not test commands and must not be counted,
+  captured or retried).
+- frames (Android device with adb): ``dumpsys gfxinfo <package> reset``
+  at the start, the total and janky frames rendered at the end.
+
+A server without the endpoint (XCUITest) disables the sampler for the
+session; what could be measured is still reported.  The per-test summary
+(memory start / end / peak / growth, growth per task created, CPU mean /
+max, frames, janky frames) is attached to Allure and the report, and the
+test fails when it exceeds a budget: ``config.METRICS_MAX_*`` (0: no
+budget), overridden per test by ``@pytest.mark.perf_budget(...)`` with the
+keys of ``BUDGETS``.  The growth per task is the budget for "memory after
+creating N tasks": the memory growth divided by the ``create_task`` calls
+of the test.
+"""
+
+import re
+import subprocess
+import threading
+
+from selenium.common.exceptions import WebDriverException
+
+import config
+import sessions
+
+ENABLED = False
+
+# Budget key -> summary field it limits
+BUDGETS = {
+    'memory_growth_kb': 'memory_growth_kb',
+    'memory_per_task_kb': 'memory_per_task_kb',
+    'cpu_percent': 'cpu_max_percent',
+    'jank_percent': 'jank_percent',
+}
+
+
+def default_budgets() -> dict:
+    """Budgets from config (env), 0 meaning none."""
+    return {
+        'memory_growth_kb': config.METRICS_MAX_MEMORY_GROWTH_KB,
+        'memory_per_task_kb': config.METRICS_MAX_MEMORY_PER_TASK_KB,
+        'cpu_percent': config.METRICS_MAX_CPU_PERCENT,
+        'jank_percent': config.METRICS_MAX_JANK_PERCENT,
+    }
+
+
+def violations(summary: dict, budgets: dict) -> list:
+    """Descriptions of the budgets `summary` exceeds; unmeasured fields pass."""
+    unknown = set(budgets) - set(BUDGETS)
+    if unknown:
+        raise ValueError(f'Unknown device metric budgets: {", ".join(sorted(unknown))} (known: {", ".join(BUDGETS)})')
+    found = []
+    for key, limit in budgets.items():
+        value = summary.get(BUDGETS[key])
+        if limit and value is not None and value > limit:
+            found.append(f'{BUDGETS[key]} {value:g} > {limit:g}')
+    return found
+
+
+class MetricsStats:
+    def __init__(self):
+        self.tests = 0
+        self.samples = 0
+        self.unsupported = 0     # tests on sessions without the performance endpoint
+        self.max_growth_kb = 0.0
+        self.max_cpu_percent = 0.0
+        self.violations = []     # 'test: budget' lines
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def merge(self, data: dict) -> None:
+        for name in ('tests', 'samples', 'unsupported'):
+            setattr(self, name, getattr(self, name) + data[name])
+        self.max_growth_kb = max(self.max_growth_kb, data['max_growth_kb'])
+        self.max_cpu_percent = max(self.max_cpu_percent, data['max_cpu_percent'])
+        self.violations.extend(data['violations'])
+
+    def __bool__(self):
+        return self.tests > 0
+
+    def summary(self) -> str:
+        lines = [
+            f'device metrics: {self.tests} tests sampled ({self.samples} samples, {self.unsupported} without '
+            f'memory/CPU data); max memory growth {self.max_growth_kb:.0f} kB, max CPU {self.max_cpu_percent:.1f}%; '
+            f'{len(self.violations)} budgets exceeded'
+        ]
+        lines += [f'  {violation}' for violation in self.violations]
+        return '\n'.join(lines)
+
+
+STATS = MetricsStats()
+
+
+def _table(value) -> dict:
+    # getPerformanceData: [[header, ...], [value, ...]] -> {header: float}
+    if not isinstance(value, list) or len(value) < 2:
+        return {}
+    row = {}
+    for name, item in zip(value[0], value[1]):
+        try:
+            row[name] = float(item)
+        except (TypeError, ValueError):
+            continue
+    return row
+
+
+class Sampler:
+    """Samples the app's memory and CPU on a background thread during one test."""
+
+    def __init__(self, driver, platform: str, adb: bool = True):
+        self.driver = driver
+        self.package = sessions.app_id_for(platform)
+        self.adb = adb and platform.lower() == 'android'
+        self.serial = sessions.device_serial(driver) if self.adb else ''
+        self.supported = True
+        self.error = None
+        self.memory = []   # total PSS kB per sample
+        self.cpu = []      # user + kernel percent per sample
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def _perf(self, data_type: str) -> dict:
+        response = self.driver.command_executor.execute('w3cExecuteScript', {
+            'sessionId': self.driver.session_id,
+            'script': 'mobile: getPerformanceData',
+            'args': [{'packageName': self.package, 'dataType': data_type, 'dataReadTimeout': 10}],
+        })
+        self.driver.error_handler.check_response(response)
+        return _table(response.get('value'))
+
+    def sample(self) -> None:
+        if not self.supported:
+            return
+        try:
+            memory, cpu = self._perf('memoryinfo'), self._perf('cpuinfo')
+        except WebDriverException as e:
+            self.supported = False
+            self.error = f'getPerformanceData: {e.msg or type(e).__name__}'
+            return
+        with self.lock:
+            if 'totalPss' in memory:
+                self.memory.append(memory['totalPss'])
+            if cpu:
+                self.cpu.append(cpu.get('user', 0.0) + cpu.get('kernel', 0.0))
+
+    def start(self) -> 'Sampler':
+        self._gfxinfo('reset')
+        self.sample()
+        if self.supported:
+            self.thread = threading.Thread(target=self._run, name='device-metrics', daemon=True)
+            self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopped.wait(config.METRICS_INTERVAL):
+            self.sample()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def finish(self, tasks_created: int = 0) -> dict:
+        """Stop sampling, take the final sample and return the test's summary."""
+        if self.stopped.is_set():
+            return {}
+        self.stop()
+        self.sample()
+        summary = {'samples': len(self.memory), 'error': self.error}
+        if self.memory:
+            growth = self.memory[-1] - self.memory[0]
+            summary.update(
+                memory_start_kb=self.memory[0], memory_end_kb=self.memory[-1], memory_peak_kb=max(self.memory),
+                memory_growth_kb=growth,
+                memory_per_task_kb=round(growth / tasks_created, 1) if tasks_created else None,
+            )
+        if self.cpu:
+            summary.update(
+                cpu_mean_percent=round(sum(self.cpu) / len(self.cpu), 1), cpu_max_percent=max(self.cpu),
+            )
+        summary['tasks_created'] = tasks_created
+        summary.update(self._frames())
+        return summary
+
+    def _frames(self) -> dict:
+        out = self._gfxinfo()
+        total = re.search(r'Total frames rendered:\s*(\d+)', out or '')
+        janky = re.search(r'Janky frames:\s*(\d+)', out or '')
+        if not total or not janky:
+            return {}
+        frames, jank = int(total.group(1)), int(janky.group(1))
+        return {
+            'frames': frames, 'janky_frames': jank,
+            'jank_percent': round(100.0 * jank / frames, 1) if frames else 0.0,
+        }
+
+    def _gfxinfo(self, *args):
+        # `dumpsys gfxinfo` output, or None without adb
+        if not self.adb:
+            return None
+        try:
+            out = subprocess.run(
+                ['adb', '-s', self.serial, 'shell', 'dumpsys', 'gfxinfo', self.package, *args],
+                capture_output=True, text=True, timeout=10,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            self.adb = False
+            return None
+        return out.stdout
+
+
+_current = None  # Sampler of the running test
+
+
+def start_test(driver, platform: str, adb: bool = True) -> None:
+    """Start sampling for the test about to run (no-op unless ENABLED)."""
+    global _current
+    stop()
+    if ENABLED:
+        _current = Sampler(driver, platform, adb).start()
+
+
+def finish_test(name: str, tasks_created: int = 0, budgets: dict = None):
+    """(summary, exceeded budgets) of the running test `name`, or (None, [])."""
+    if _current is None:
+        return None, []
+    summary = _current.finish(tasks_created)
+    if not summary:
+        return None, []
+    exceeded = violations(summary, {**default_budgets(), **(budgets or {})})
+    STATS.tests += 1
+    STATS.samples += summary['samples']
+    STATS.unsupported += summary['error'] is not None
+    STATS.max_growth_kb = max(STATS.max_growth_kb, summary.get('memory_growth_kb') or 0.0)
+    STATS.max_cpu_percent = max(STATS.max_cpu_percent, summary.get('cpu_max_percent') or 0.0)
+    STATS.violations.extend(f'{name}: {violation}' for violation in exceeded)
+    return summary, exceeded
+
+
+def stop() -> None:
+    """Stop the running sampler, if any (teardown; idempotent)."""
+    global _current
+    if _current is not None:
+        _current.stop()
+        _current = None
@@ -0,0 +1,139 @@
+"""
+Device leasing for parallel runs (pytest-xdist).
+
+Every worker leases one distinct device from the pool of healthy devices
+(config.healthy_android_devices(): booted, app installed, Appium reachable).
+A lease is an exclusive OS lock (flock; msvcrt on Windows) on a per-device
+lock file that stays in place.  Taking it is one atomic call, and the OS
+drops it when the owner releases it, exits or crashes, so a crashed
+worker's device is free again without any stale-lease detection.  The file
+holds the owner's pid for information only.
+
+Each device gets a stable slot (its index in the sorted pool), used to derive
+a unique UiAutomator2 systemPort and, optionally, a per-device Appium port.
+The slots are only unique when every worker passes the same pool: under
+xdist the controller discovers it once and hands it to the workers
+(conftest.py ``_device_pool``).
+"""
+
+import atexit
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+import config
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+LEASE_DIR = Path(os.getenv('device_leaseDir', Path(tempfile.gettempdir()) / 'todo_app_device_leases'))
+
+
+class NoDeviceAvailable(RuntimeError):
+    pass
+
+
+def _lease_path(device: str) -> Path:
+    return LEASE_DIR / f'{device.replace(":", "_").replace("/", "_")}.lease'
+
+
+def _worker_index(worker_id: str) -> int:
+    # "gw3" -> 3; "master" (no xdist) -> 0
+    digits = ''.join(ch for ch in worker_id if ch.isdigit())
+    return int(digits) if digits else 0
+
+
+class DeviceLease:
+    """A device held exclusively by this process until release()."""
+
+    def __init__(self, device: str, slot: int, path: Path, fd: int):
+        self.device = device
+        self.slot = slot
+        self.path = path
+        self.fd = fd
+        self.system_port = config.ANDROID_SYSTEM_PORT_BASE + slot
+        self.remote_url = _remote_url_for_slot(slot)
+        atexit.register(self.release)
+
+    def release(self) -> None:
+        if self.fd is None:
+            return
+        fd, self.fd = self.fd, None
+        _unlock(fd)
+        os.close(fd)
+
+    def __repr__(self):
+        return f'DeviceLease({self.device!r}, slot={self.slot}, systemPort={self.system_port})'
+
+
+def _remote_url_for_slot(slot: int) -> str:
+    if not config.APPIUM_BASE_PORT:
+        return config.ANDROID_REMOTE_URL
+    parts = urlsplit(config.ANDROID_REMOTE_URL)
+    netloc = f'{parts.hostname}:{int(config.APPIUM_BASE_PORT) + slot}'
+    return urlunsplit((parts.scheme, netloc, parts.path, parts.query, parts.fragment))
+
+
+def _try_lock(path: Path):
+    """File descriptor holding the lock on `path`, or None when another process holds it."""
+    # The lock file is never removed: unlinking it would let two processes lock different files
+    fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        if sys.platform == 'win32':
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:  # held by a live process (the OS released those of dead ones)
+        os.close(fd)
+        return None
+    os.ftruncate(fd, 0)
+    os.lseek(fd, 0, os.SEEK_SET)
+    os.write(fd, str(os.getpid()).encode())
+    return fd
+
+
+def _unlock(fd: int) -> None:
+    if sys.platform == 'win32':
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def lease_device(devices, worker_id: str = 'master', wait: float = 30.0, pool=None) -> DeviceLease:
+    """Lease one device from `devices` for this worker.
+
+    Slots are numbered over `pool` (default: `devices`).  When leasing from
+    part of the pool, pass the whole pool so the lease cannot get the slot
+    (systemPort) of a device left out.  Workers start probing at their own
+    index so that they usually get different devices without contention.
+    Waits up to `wait` seconds for a device to become free before raising
+    NoDeviceAvailable.
+    """
+    slots = sorted(set(devices) | set(pool or ()))
+    pool = sorted(devices)
+    if not pool:
+        raise NoDeviceAvailable(
+            'No devices to lease: none is connected, booted, has the app installed '
+            'and reaches Appium (see config.discover_android_devices())'
+        )
+    LEASE_DIR.mkdir(parents=True, exist_ok=True)
+    start = _worker_index(worker_id) % len(pool)
+    order = pool[start:] + pool[:start]
+    deadline = time.monotonic() + wait
+    while True:
+        for device in order:
+            path = _lease_path(device)
+            fd = _try_lock(path)
+            if fd is not None:
+                return DeviceLease(device, slots.index(device), path, fd)
+        if time.monotonic() > deadline:
+            raise NoDeviceAvailable(
+                f'All {len(pool)} devices are leased by other workers: {", ".join(pool)}'
+            )
+        time.sleep(0.5)
@@ -0,0 +1,75 @@
+"""
+Emulator snapshots of the clean app state (``--isolation snapshot``).
+
+Right after the first session of the run has launched the freshly reset
+app, the emulator state is saved as a snapshot; before every following test
+it is restored through the emulator console (``adb emu avd snapshot ...``).
+A restore brings back the whole device -- app data, app process and the
+UiAutomator2 server of the running session -- in a few seconds, without
+clearing data or reinstalling anything, so the Appium session stays usable.
+
+Snapshots need an Android emulator started with snapshot support; physical
+devices, ``-no-snapshot`` emulators and a missing adb are reported by
+``unsupported_reason()`` and the session falls back to the in-place app reset.
+"""
+
+import subprocess
+
+import config
+
+
+class SnapshotError(RuntimeError):
+    """An emulator console snapshot command failed."""
+
+
+def _snapshot_command(device: str, *args, timeout: float = None) -> str:
+    command = ['adb', '-s', device, 'emu', 'avd', 'snapshot', *args]
+    try:
+        out = subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            timeout=config.EMULATOR_SNAPSHOT_TIMEOUT if timeout is None else timeout,
+        )
+    except (FileNotFoundError, subprocess.TimeoutExpired) as e:
+        raise SnapshotError(f'{" ".join(command)}: {e}') from e
+    output = (out.stdout + out.stderr).strip()
+    # The console answers "OK" or "KO: <reason>" (adb itself may still exit 0)
+    if out.returncode != 0 or any(line.startswith('KO') for line in output.splitlines()):
+        raise SnapshotError(f'{" ".join(command)}: {output or f"exit code {out.returncode}"}')
+    return output
+
+
+def unsupported_reason(device: str):
+    """None when `device` can save/load snapshots, else why not."""
+    if not device.startswith('emulator-'):
+        return f'{device or "device"} is not an Android emulator'
+    try:
+        _snapshot_command(device, 'list', timeout=10)
+    except SnapshotError as e:
+        return str(e)
+    return None
+
+
+def save(device: str, name: str) -> None:
+    _snapshot_command(device, 'save', name)
+
+
+def load(device: str, name: str) -> None:
+    """Restore snapshot `name` and wait until adb sees the device again."""
+    _snapshot_command(device, 'load', name)
+    try:
+        subprocess.run(
+            ['adb', '-s', device, 'wait-for-device'],
+            capture_output=True,
+            timeout=config.EMULATOR_SNAPSHOT_TIMEOUT,
+        )
+    except subprocess.TimeoutExpired as e:
+        raise SnapshotError(f'{device} did not come back after loading snapshot {name!r}') from e
+
+
+def delete(device: str, name: str) -> None:
+    try:
+        _snapshot_command(device, 'delete', name)
+    except SnapshotError:
+        pass
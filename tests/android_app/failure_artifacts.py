@@ -0,0 +1,249 @@
+"""
+Failure artifacts: what the app and the harness were doing when a test failed.
+
+- ``install(driver)`` wraps the driver's ``execute`` and appends every
+  WebDriver command (name, parameters, duration, error) to ``COMMANDS``, a
+  ring buffer of the last ``artifacts_commands`` commands of the current
+  test.  On a passing test that is one deque append per command (repeats of
+  the same command, e.g. a polling find, are counted on one entry);
+  parameters are only formatted when a test fails.
+- ``capture(driver, ...)`` runs when the body of a test fails, before
+  teardown resets or quits the session.  Only the screenshot and the page
+  source need the live session in its failure state, so only they are taken
+  right away; ``adb logcat``, compression and writing the files happen on a
+  background thread, so neither teardown nor the next test waits for them.
+- The screenshot and a zip of page source, command log and logcat are
+  attached to the Allure result of the failed test.  The attachment entries
+  are added at capture time and their files are written to the results
+  directory when the background job finishes; ``flush()`` waits for pending
+  jobs at the end of the run.  Reserving the entries uses the reporter's
+  private ``_attach`` (requirements.txt pins allure-pytest); when it is
+  missing, the files are attached synchronously with ``allure.attach``.
+
+Without Allure (no ``--alluredir``) nothing is captured here (``active()``
+is False and Selene keeps saving its own screenshot and page source); the
+command log is still added to the failure report as a "last commands"
+section.
+"""
+
+import collections
+import io
+import json
+import subprocess
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait
+from uuid import uuid4
+
+import allure
+import allure_commons
+from selenium.common.exceptions import WebDriverException
+
+import config
+from sessions import device_serial
+
+PARAMS_MAX_CHARS = 200
+
+
+class CommandLog:
+    """Ring buffer of the last WebDriver commands of the current test."""
+
+    def __init__(self, size: int):
+        self.entries = collections.deque(maxlen=size)
+        self.start = time.perf_counter()
+
+    def start_test(self) -> None:
+        self.entries.clear()
+        self.start = time.perf_counter()
+
+    def record(self, start: float, command: str, params, duration: float, error) -> None:
+        last = self.entries[-1] if self.entries else None
+        if last is not None and last[1] == command and last[4] == error and last[2] == params:
+            last[3] += duration
+            last[5] += 1
+            return
+        self.entries.append([start, command, params, duration, error, 1])
+
+    def format(self) -> str:
+        lines = []
+        for start, command, params, duration, error, count in self.entries:
+            line = (
+                f'{start - self.start:8.3f}s {duration * 1000:8.1f} ms {f"x{count}" if count > 1 else "":>5}  '
+                f'{command} {_short(params)}'
+            )
+            lines.append(f'{line}  !! {error}' if error else line)
+        return '\n'.join(lines)
+
+
+def _short(params) -> str:
+    params = {k: v for k, v in (params or {}).items() if k != 'sessionId'}
+    if not params:
+        return ''
+    text = json.dumps(params, default=str)
+    return text if len(text) <= PARAMS_MAX_CHARS else text[:PARAMS_MAX_CHARS] + '...'
+
+
+class ArtifactStats:
+    def __init__(self):
+        self.captured = 0
+        self.capture_time = 0.0
+        self.written = 0
+        self.background_time = 0.0
+        self.errors = 0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def merge(self, data: dict) -> None:
+        for name, value in data.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def __bool__(self):
+        return self.captured > 0
+
+    def summary(self) -> str:
+        return (
+            f'failure artifacts: {self.captured} failures captured '
+            f'({self.capture_time:.2f}s in tests, {self.background_time:.2f}s in the background), '
+            f'{self.written} files written to Allure, {self.errors} errors'
+        )
+
+
+COMMANDS = CommandLog(config.ARTIFACTS_COMMANDS)
+STATS = ArtifactStats()
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='failure-artifacts')
+_pending = []
+
+
+def install(driver):
+    """Log every WebDriver command sent through `driver` into COMMANDS (instance-level wrap)."""
+    if getattr(driver, '_command_log_installed', False):
+        return driver
+    execute = driver.execute
+
+    def logged_execute(driver_command, params=None):
+        start = time.perf_counter()
+        error = None
+        try:
+            return execute(driver_command, params)
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            COMMANDS.record(start, driver_command, params, time.perf_counter() - start, error)
+
+    driver.execute = logged_execute
+    driver._command_log_installed = True
+    return driver
+
+
+def capture(driver, platform: str, logcat: bool = True, live: bool = True) -> str:
+    """Collect the artifacts of the failing test; return its command log.
+
+    Call while the failed test is still the current Allure test.  logcat:
+    also dump the device log (Android devices; off for the fake server).
+    live: False when the session is known to be dead (no screenshot/page source).
+    """
+    commands = COMMANDS.format()
+    reporter = _allure_reporter()
+    if reporter is None:
+        return commands
+    start = time.perf_counter()
+    files = {'commands.txt': commands}
+    errors = []
+    if live:
+        _from_session(driver, files, errors)
+    else:
+        errors.append('session is dead: no screenshot or page source')
+    targets = {'bundle': ('failure artifacts', allure.attachment_type.ZIP)}
+    if 'screenshot.png' in files:
+        targets['screenshot'] = ('screenshot', allure.attachment_type.PNG)
+    serial = device_serial(driver) if logcat and platform.lower() == 'android' else None
+    if hasattr(reporter, '_attach'):
+        targets = {key: (*target, _reserve(reporter, *target)) for key, target in targets.items()}
+        _pending.append(_executor.submit(_write, targets, files, errors, serial))
+    else:  # allure's private API changed: attach from the test thread instead
+        _write({key: (*target, None) for key, target in targets.items()}, files, errors, serial)
+    STATS.captured += 1
+    STATS.capture_time += time.perf_counter() - start
+    return commands
+
+
+def _from_session(driver, files: dict, errors: list) -> None:
+    for name, take in (
+        ('screenshot.png', driver.get_screenshot_as_png),
+        ('page_source.xml', lambda: driver.page_source),
+    ):
+        try:
+            files[name] = take()
+        except WebDriverException as e:  # keep what we have
+            errors.append(f'{name}: {type(e).__name__}: {e}'.splitlines()[0])
+
+
+def flush(timeout: float = None) -> None:
+    """Wait for the pending background jobs (end of the run)."""
+    wait(_pending, timeout=config.ARTIFACTS_FLUSH_TIMEOUT if timeout is None else timeout)
+    _pending.clear()
+
+
+def active() -> bool:
+    """Whether failures are captured (Allure reporting is on)."""
+    return _allure_reporter() is not None
+
+
+def _allure_reporter():
+    # allure-pytest's reporter; only registered when --alluredir is given
+    for plugin in allure_commons.plugin_manager.get_plugins():
+        reporter = getattr(plugin, 'allure_logger', None)
+        if reporter is not None:
+            return reporter
+    return None
+
+
+def _reserve(reporter, name: str, attachment_type) -> str:
+    # allure.attach() is _attach() (entry on the current test) followed by
+    # report_attached_data() (the file); split so the file can follow later
+    return reporter._attach(
+        uuid4(), name=name, attachment_type=attachment_type.mime_type, extension=attachment_type.extension
+    )
+
+
+def _write(targets: dict, files: dict, errors: list, serial) -> None:
+    # targets: key -> (name, attachment type, reserved file name or None)
+    start = time.perf_counter()
+    try:
+        if serial:
+            files['logcat.txt'] = _logcat(serial)
+        if errors:
+            files['errors.txt'] = '\n'.join(errors)
+        screenshot = files.pop('screenshot.png', None)
+        if screenshot is not None:
+            _attach_data(screenshot, targets['screenshot'])
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            for name, body in files.items():
+                bundle.writestr(name, body)
+        _attach_data(buffer.getvalue(), targets['bundle'])
+    except Exception:  # never let artifact collection affect the run
+        STATS.errors += 1
+    finally:
+        STATS.background_time += time.perf_counter() - start
+
+
+def _attach_data(body: bytes, target) -> None:
+    name, attachment_type, file_name = target
+    if file_name is None:
+        allure.attach(body, name=name, attachment_type=attachment_type)
+    else:
+        allure_commons.plugin_manager.hook.report_attached_data(body=body, file_name=file_name)
+    STATS.written += 1
+
+
+def _logcat(serial: str) -> str:
+    command = ['adb', '-s', serial, 'logcat', '-d', '-v', 'threadtime', '-t', str(config.ARTIFACTS_LOGCAT_LINES)]
+    try:
+        out = subprocess.run(command, capture_output=True, text=True, timeout=30)
+    except (FileNotFoundError, subprocess.TimeoutExpired) as e:
+        return f'{" ".join(command)}: {e}'
+    return out.stdout if out.returncode == 0 else f'{" ".join(command)}: {out.stderr.strip()}'
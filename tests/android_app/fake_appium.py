@@ -0,0 +1,742 @@
+"""
+In-process fake Appium server simulating the Todo app.
+
+A small WebDriver-protocol HTTP server that models the Todo app's screens
+(task list with filters, new task, overflow menu, navigation drawer and
+statistics) and answers the locators in locators.py for both platforms.
+Each app state is rendered as an Android (UiAutomator2) or iOS (XCUITest)
+page source; finds are resolved against it with the snapshot engine, so
+accessibility ids, UiSelectors and the XPath subset all work.  Like the
+real Compose list, the task list only renders the rows in its viewport
+(VIEWPORT_ROWS); it scrolls with ``mobile: scrollGesture`` / ``mobile:
+scroll`` and UiScrollable ``scrollIntoView`` finds.
+
+Used for framework development and CI smoke runs without a device:
+
+    pytest tests/android_app/test_todo_app.py --fake-appium
+    pytest tests/android_app/test_todo_app.py --fake-appium --platform ios
+
+or standalone (then point remote_url at it):
+
+    python tests/android_app/fake_appium.py --port 4723
+"""
+
+import base64
+import json
+import re
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from snapshot import ScreenSnapshot, Unsupported, is_displayed, parse_uiselector
+
+# 1x1 transparent PNG
+_PNG = base64.b64encode(
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89'
+    b'\x00\x00\x00\rIDATx\x9cc\xf8\x0f\x00\x00\x01\x01\x00\x05\x18\xd8N\x00\x00\x00\x00IEND\xaeB`\x82'
+).decode()
+
+_ELEMENT_KEY = 'element-6066-11e4-a52e-4f735466cecf'
+_UISCROLLABLE = re.compile(r'new UiScrollable\((new UiSelector\(\).*?)\)\.scrollIntoView\((new UiSelector\(\).*)\)$')
+
+_FILTER_TITLES = {'all': 'All Tasks', 'active': 'Active Tasks', 'completed': 'Completed Tasks'}
+_EMPTY_TEXTS = {
+    'all': 'You have no tasks!',
+    'active': 'You have no active tasks!',
+    'completed': 'You have no completed tasks!',
+}
+
+
+class WebDriverError(Exception):
+    def __init__(self, status: int, error: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.error = error
+        self.message = message
+
+
+class TodoAppModel:
+    """State machine of the Todo app; render() produces the current page source."""
+
+    # Rows composed by the lazy task list at once (the rest is off screen)
+    VIEWPORT_ROWS = 8
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self) -> None:
+        # Cleared app data + relaunch
+        self.tasks = []
+        self.running = True
+        self.screen = 'tasks'
+        self.overlay = None
+        self.filter = 'all'
+        self.fields = {'title': '', 'description': ''}
+        self.focus = None
+        self.keyboard = False
+        self.clipboard = ''
+        self.snackbar = None
+        self.scroll = 0
+        self.interactions = 0  # since the last cpuinfo query
+
+    # Rendering
+
+    def visible_tasks(self) -> list:
+        if self.filter == 'active':
+            return [t for t in self.tasks if not t['completed']]
+        if self.filter == 'completed':
+            return [t for t in self.tasks if t['completed']]
+        return list(self.tasks)
+
+    def _items(self) -> list:
+        # (key, role, text) in document order; role drives the platform widget
+        items = []
+        if not self.running:
+            return items
+        if self.screen == 'tasks':
+            items += [
+                ('open_drawer', 'button', 'Open Drawer'),
+                ('title', 'label', _FILTER_TITLES[self.filter]),
+                ('filter', 'button', 'Filter'),
+                ('more', 'button', 'More'),
+            ]
+            shown = self.visible_tasks()
+            if not shown:
+                items.append(('empty', 'label', _EMPTY_TEXTS[self.filter]))
+            else:
+                self.scroll = min(self.scroll, self._max_scroll())
+                rows = shown[self.scroll:self.scroll + self.VIEWPORT_ROWS]
+                items.append(('list', 'list', [(f'task:{task["id"]}', task) for task in rows]))
+            items.append(('new_task', 'button', 'New Task'))
+        elif self.screen == 'add_task':
+            items += [
+                ('back', 'button', 'Back'),
+                ('title', 'label', 'New Task'),
+                ('save', 'button', 'Save task'),
+                ('input:title', 'input', self.fields['title']),
+                ('input:description', 'textarea', self.fields['description']),
+            ]
+        elif self.screen == 'statistics':
+            items += [
+                ('open_drawer', 'button', 'Open Drawer'),
+                ('title', 'label', 'Statistics'),
+            ]
+            if self.tasks:
+                completed = sum(1 for t in self.tasks if t['completed'])
+                completed_pct = 100.0 * completed / len(self.tasks)
+                items += [
+                    ('stats:active', 'label', f'Active tasks: {100.0 - completed_pct:.1f}%'),
+                    ('stats:completed', 'label', f'Completed tasks: {completed_pct:.1f}%'),
+                ]
+            else:
+                items.append(('stats:empty', 'label', 'You have no tasks.'))
+        if self.overlay == 'filter_menu':
+            items += [(f'filter:{f}', 'menu', f.capitalize()) for f in ('all', 'active', 'completed')]
+        elif self.overlay == 'overflow_menu':
+            items += [('menu:clear', 'menu', 'Clear completed'), ('menu:refresh', 'menu', 'Refresh')]
+        elif self.overlay == 'drawer':
+            items += [('nav:tasks', 'menu', 'Task List'), ('nav:statistics', 'menu', 'Statistics')]
+        if self.snackbar:
+            items.append(('snackbar', 'label', self.snackbar))
+        return items
+
+    def render(self, platform: str):
+        """Return (page source root element, {node: key})."""
+        keys = {}
+        render = _render_ios if platform == 'ios' else _render_android
+        with self.lock:
+            root = render(self._items(), keys)
+        return root, keys
+
+    # Scrolling (the task list shows VIEWPORT_ROWS rows starting at self.scroll)
+
+    def _max_scroll(self) -> int:
+        return max(0, len(self.visible_tasks()) - self.VIEWPORT_ROWS)
+
+    def scroll_by(self, rows: int) -> bool:
+        """Scroll the task list; return whether it can scroll further that way."""
+        with self.lock:
+            self.scroll = min(max(0, self.scroll + rows), self._max_scroll())
+            if rows > 0:
+                return self.scroll < self._max_scroll()
+            return self.scroll > 0
+
+    def scroll_into_view(self, title: str) -> bool:
+        """Scroll until the row with `title` is composed (UiScrollable.scrollIntoView)."""
+        with self.lock:
+            titles = [t['title'] for t in self.visible_tasks()]
+            if self.screen != 'tasks' or title not in titles:
+                return False
+            index = titles.index(title)
+            if index < self.scroll:
+                self.scroll = index
+            elif index >= self.scroll + self.VIEWPORT_ROWS:
+                self.scroll = index - self.VIEWPORT_ROWS + 1
+            return True
+
+    # Actions
+
+    def click(self, key: str) -> None:
+        with self.lock:
+            self.interactions += 1
+            self.snackbar = None
+            if key.startswith('task:') and key.endswith(':checkbox'):
+                task_id = key.split(':')[1]
+                for task in self.tasks:
+                    if task['id'] == task_id:
+                        task['completed'] = not task['completed']
+                return
+            if self.overlay and key.split(':')[0] in ('filter', 'menu', 'nav'):
+                self._menu(key)
+                self.overlay = None
+                return
+            self.overlay = None
+            if key == 'new_task':
+                self.screen = 'add_task'
+                self.fields = {'title': '', 'description': ''}
+            elif key == 'filter':
+                self.overlay = 'filter_menu'
+            elif key == 'more':
+                self.overlay = 'overflow_menu'
+            elif key == 'open_drawer':
+                self.overlay = 'drawer'
+            elif key == 'back':
+                self.screen = 'tasks'
+                self.keyboard = False
+            elif key == 'save':
+                self._save()
+            elif key.startswith('input:'):
+                self.focus = key
+                self.keyboard = True
+
+    def _menu(self, key: str) -> None:
+        kind, value = key.split(':')
+        if kind == 'filter':
+            self.filter = value
+            self.scroll = 0
+        elif key == 'menu:clear':
+            self.tasks = [t for t in self.tasks if not t['completed']]
+            self.snackbar = 'Completed tasks cleared'
+        elif key == 'nav:tasks':
+            self.screen = 'tasks'
+            self.scroll = 0
+        elif key == 'nav:statistics':
+            self.screen = 'statistics'
+
+    def _save(self) -> None:
+        title, description = self.fields['title'], self.fields['description']
+        if not title or not description:
+            self.snackbar = 'Tasks cannot be empty'
+            return
+        self.add_task(title, description)
+        self.screen = 'tasks'
+        self.keyboard = False
+        self.snackbar = 'Task added'
+
+    def add_task(self, title: str, description: str = '', completed: bool = False) -> None:
+        with self.lock:
+            self.tasks.append({
+                'id': uuid.uuid4().hex[:12],
+                'title': title,
+                'description': description or title,
+                'completed': completed,
+            })
+
+    def type_text(self, key: str, text: str) -> None:
+        with self.lock:
+            field = key.split(':')[1]
+            self.fields[field] += text
+            self.focus = key
+            self.keyboard = True
+            self.interactions += 1
+
+    def set_text(self, key: str, text: str) -> None:
+        # UiAutomator2 replaceElementValue: set the text without focus or keyboard
+        with self.lock:
+            self.fields[key.split(':')[1]] = text
+
+    def clear_text(self, key: str) -> None:
+        with self.lock:
+            self.fields[key.split(':')[1]] = ''
+
+    # Device metrics: UiAutomator2 getPerformanceData tables (header row, value row)
+
+    BASE_PSS_KB = 42000
+    PSS_PER_TASK_KB = 4
+
+    def performance_data(self, data_type: str):
+        with self.lock:
+            if data_type == 'memoryinfo':
+                pss = self.BASE_PSS_KB + self.PSS_PER_TASK_KB * len(self.tasks)
+                return [['totalPrivateDirty', 'totalPss', 'totalRss'], [str(pss - 6000), str(pss), str(pss + 30000)]]
+            if data_type == 'cpuinfo':
+                busy, self.interactions = min(100, 1 + 2 * self.interactions), 0
+                return [['user', 'kernel'], [f'{busy * 0.7:.1f}', f'{busy * 0.3:.1f}']]
+        return None
+
+
+# Platform renderers
+
+def _bounds(index: int) -> str:
+    top = 100 + index * 120
+    return f'[0,{top}][1080,{top + 110}]'
+
+
+def _render_android(items, keys):
+    root = ET.Element('hierarchy', {'rotation': '0'})
+    content = ET.SubElement(root, 'android.widget.FrameLayout', _android_attrs(
+        'android.widget.FrameLayout', resource_id='android:id/content', index=0,
+    ))
+    inputs = 0
+    for index, (key, role, value) in enumerate(items, start=1):
+        if role == 'list':
+            # Compose LazyColumn: a scrollable container with the composed rows only
+            lazy = ET.SubElement(content, 'android.view.View', _android_attrs(
+                'android.view.View', index=index, scrollable=True,
+            ))
+            keys[lazy] = key
+            for row_index, (row_key, task) in enumerate(value, start=index):
+                row = ET.SubElement(lazy, 'android.view.View', _android_attrs('android.view.View', index=row_index))
+                keys[row] = row_key
+                checkbox = ET.SubElement(row, 'android.widget.CheckBox', _android_attrs(
+                    'android.widget.CheckBox', checked=task['completed'], index=row_index,
+                ))
+                keys[checkbox] = f'{row_key}:checkbox'
+                title = ET.SubElement(row, 'android.widget.TextView', _android_attrs(
+                    'android.widget.TextView', text=task['title'], index=row_index,
+                ))
+                keys[title] = f'{row_key}:title'
+            continue
+        if role == 'button':
+            cls, attrs = 'android.view.View', {'desc': value}
+        elif role in ('input', 'textarea'):
+            cls, attrs = 'android.widget.EditText', {'text': value}
+            inputs += 1
+        else:
+            cls, attrs = 'android.widget.TextView', {'text': value}
+        node = ET.SubElement(content, cls, _android_attrs(cls, index=index, **attrs))
+        keys[node] = key
+    return root
+
+
+def _android_attrs(cls, text='', desc='', resource_id='', checked=None, index=0, scrollable=False):
+    return {
+        'class': cls,
+        'text': text,
+        'content-desc': desc,
+        'resource-id': resource_id,
+        'checkable': 'false' if checked is None else 'true',
+        'checked': 'true' if checked else 'false',
+        'clickable': 'true',
+        'scrollable': 'true' if scrollable else 'false',
+        'enabled': 'true',
+        'displayed': 'true',
+        'bounds': _bounds(index),
+    }
+
+
+def _render_ios(items, keys):
+    root = ET.Element('AppiumAUT')
+    app = ET.SubElement(root, 'XCUIElementTypeApplication', _ios_attrs('XCUIElementTypeApplication', 'Todo', 0))
+    for index, (key, role, value) in enumerate(items, start=1):
+        if role == 'list':
+            table = ET.SubElement(app, 'XCUIElementTypeTable', _ios_attrs('XCUIElementTypeTable', None, index))
+            keys[table] = key
+            for row_index, (row_key, task) in enumerate(value, start=index):
+                cell = ET.SubElement(table, 'XCUIElementTypeCell', _ios_attrs('XCUIElementTypeCell', None, row_index))
+                keys[cell] = row_key
+                title = ET.SubElement(cell, 'XCUIElementTypeStaticText', _ios_attrs(
+                    'XCUIElementTypeStaticText', task['title'], row_index,
+                ))
+                keys[title] = f'{row_key}:title'
+                checkbox = ET.SubElement(cell, 'XCUIElementTypeButton', _ios_attrs(
+                    'XCUIElementTypeButton', 'checkbox', row_index, value='1' if task['completed'] else '0',
+                ))
+                keys[checkbox] = f'{row_key}:checkbox'
+            continue
+        cls = {
+            'button': 'XCUIElementTypeButton',
+            'input': 'XCUIElementTypeTextField',
+            'textarea': 'XCUIElementTypeTextView',
+            'menu': 'XCUIElementTypeButton',
+        }.get(role, 'XCUIElementTypeStaticText')
+        if role in ('input', 'textarea'):
+            node = ET.SubElement(app, cls, _ios_attrs(cls, None, index, value=value))
+        else:
+            node = ET.SubElement(app, cls, _ios_attrs(cls, value, index))
+        keys[node] = key
+    return root
+
+
+def _ios_attrs(cls, name, index, value=None):
+    attrs = {'type': cls, 'enabled': 'true', 'visible': 'true',
+             'x': '0', 'y': str(100 + index * 44), 'width': '390', 'height': '44'}
+    if name is not None:
+        attrs['name'] = name
+        attrs['label'] = name
+    if value is not None:
+        attrs['value'] = value
+    return attrs
+
+
+# WebDriver protocol
+
+class FakeAppiumServer:
+    """Threaded HTTP server speaking enough of the W3C/Appium protocol for the suite.
+
+    Every device (udid / deviceName capability) runs its own app; `app` is the
+    one of the first device that connects.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.app = TodoAppModel()
+        self.apps = {}
+        self.apps_lock = threading.Lock()
+        self.sessions = {}
+        self.element_ids = {}
+        self.element_keys = {}
+        self.httpd = ThreadingHTTPServer((host, port), _handler_for(self))
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeAppiumServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='fake-appium', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    # Command dispatch
+
+    def dispatch(self, method: str, path: str, body: dict):
+        parts = [p for p in path.split('/') if p]
+        if parts == ['status']:
+            return {'ready': True, 'message': 'Fake Appium server', 'build': {'version': 'fake'}}
+        if parts == ['session'] and method == 'POST':
+            return self._new_session(body)
+        if len(parts) < 2 or parts[0] != 'session':
+            raise WebDriverError(404, 'unknown command', f'Unknown command: {method} {path}')
+        session = self.sessions.get(parts[1])
+        if session is None:
+            raise WebDriverError(404, 'invalid session id', f'Session {parts[1]} does not exist')
+        command = parts[2:]
+        if not command and method == 'DELETE':
+            del self.sessions[parts[1]]
+            return None
+        handler = self._route(method, command)
+        if handler is None:
+            raise WebDriverError(404, 'unknown command', f'Unknown command: {method} {path}')
+        return handler(session, command, body)
+
+    def _route(self, method: str, command: list):
+        head = '/'.join(command[:1])
+        if command and command[0] == 'element' and len(command) >= 3:
+            # element/<id>/<action...>
+            action = '/'.join(command[2:])
+            if action.startswith('attribute/'):
+                action = 'attribute'
+            return {
+                ('POST', 'click'): self._click,
+                ('POST', 'value'): self._value,
+                ('POST', 'clear'): self._clear,
+                ('GET', 'displayed'): self._displayed,
+                ('GET', 'enabled'): lambda s, c, b: True,
+                ('GET', 'selected'): self._selected,
+                ('GET', 'text'): self._text,
+                ('GET', 'name'): self._tag_name,
+                ('GET', 'rect'): self._rect,
+                ('GET', 'attribute'): self._attribute,
+                ('POST', 'element'): self._find_from_element,
+                ('POST', 'elements'): self._find_from_element,
+            }.get((method, action))
+        return {
+            ('POST', 'element'): self._find,
+            ('POST', 'elements'): self._find,
+            ('GET', 'source'): lambda s, c, b: ET.tostring(self._render(s)[0], encoding='unicode'),
+            ('GET', 'screenshot'): lambda s, c, b: _PNG,
+            ('POST', 'timeouts'): self._set_timeouts,
+            ('GET', 'timeouts'): lambda s, c, b: s['timeouts'],
+            ('POST', 'execute'): self._execute,
+            ('POST', 'appium'): self._appium,
+            ('GET', 'appium'): self._appium,
+            ('GET', 'window'): lambda s, c, b: {'x': 0, 'y': 0, 'width': 1080, 'height': 2400},
+        }.get((method, head))
+
+    # Sessions
+
+    def _new_session(self, body: dict):
+        caps = dict(body.get('capabilities', {}).get('alwaysMatch', {}))
+        for first in body.get('capabilities', {}).get('firstMatch', [{}])[:1]:
+            caps.update(first)
+        caps = {k.split(':', 1)[-1]: v for k, v in caps.items()}
+        platform = str(caps.get('platformName', 'android')).lower()
+        app = self._app_for(caps)
+        if not caps.get('noReset', False):
+            app.reset()
+        elif caps.get('autoLaunch', True):
+            app.running = True
+        session_id = uuid.uuid4().hex
+        self.sessions[session_id] = {'platform': platform, 'caps': caps, 'app': app, 'timeouts': {'implicit': 0}}
+        return {'sessionId': session_id, 'capabilities': {**caps, 'platformName': platform}}
+
+    def _app_for(self, caps: dict) -> TodoAppModel:
+        device = caps.get('udid') or caps.get('deviceName') or ''
+        with self.apps_lock:
+            if device not in self.apps:
+                self.apps[device] = self.app if not self.apps else TodoAppModel()
+            return self.apps[device]
+
+    def _set_timeouts(self, session, command, body):
+        session['timeouts'].update({k: v for k, v in body.items() if v is not None})
+        return None
+
+    # Elements
+
+    def _render(self, session):
+        return session['app'].render(session['platform'])
+
+    def _element_id(self, key: str) -> str:
+        if key not in self.element_ids:
+            element_id = uuid.uuid4().hex
+            self.element_ids[key] = element_id
+            self.element_keys[element_id] = key
+        return self.element_ids[key]
+
+    def _lookup(self, session, command):
+        # -> (node, key) of a rendered element, or stale element error
+        key = self.element_keys.get(command[1])
+        root, keys = self._render(session)
+        for node, node_key in keys.items():
+            if node_key == key:
+                return node, key
+        raise WebDriverError(404, 'stale element reference',
+                             f'Element {command[1]} is no longer present on the screen')
+
+    def _resolve(self, session, using: str, value: str, scope=None):
+        if using == '-android uiautomator' and value.lstrip().startswith('new UiScrollable('):
+            value = self._scroll_into_view(session, value)
+            if value is None:
+                return []
+        root, keys = self._render(session)
+        try:
+            nodes = ScreenSnapshot(root).find_all((using, value))
+        except Unsupported as e:
+            raise WebDriverError(400, 'invalid selector', str(e))
+        found = []
+        for node in nodes:
+            key = keys.get(node)
+            if key is not None and (scope is None or key.startswith(scope)):
+                found.append(self._element_id(key))
+        return found
+
+    def _scroll_into_view(self, session, expression: str):
+        # 'new UiScrollable(<container>).scrollIntoView(<target>)': scroll the list
+        # until a row titled like the target is composed; return the target selector.
+        m = _UISCROLLABLE.match(expression.strip().rstrip(';'))
+        if not m:
+            raise WebDriverError(400, 'invalid selector', f'Unsupported UiScrollable: {expression!r}')
+        container, target = m.groups()
+        if not self._resolve(session, '-android uiautomator', container):
+            return None
+        try:
+            title = dict(parse_uiselector(target)).get('text')
+        except Unsupported as e:
+            raise WebDriverError(400, 'invalid selector', str(e))
+        if title is None or not session['app'].scroll_into_view(title):
+            return None
+        return target
+
+    def _find(self, session, command, body, scope=None):
+        # Implicit wait: keep looking until something matches or the wait is over
+        deadline = time.monotonic() + session['timeouts'].get('implicit', 0) / 1000
+        ids = self._resolve(session, body.get('using'), body.get('value'), scope)
+        while not ids and time.monotonic() < deadline:
+            time.sleep(0.01)
+            ids = self._resolve(session, body.get('using'), body.get('value'), scope)
+        if command[-1] == 'elements':
+            return [{_ELEMENT_KEY: i, 'ELEMENT': i} for i in ids]
+        if not ids:
+            raise WebDriverError(404, 'no such element',
+                                 f'An element could not be located using {body.get("using")}: {body.get("value")}')
+        return {_ELEMENT_KEY: ids[0], 'ELEMENT': ids[0]}
+
+    def _find_from_element(self, session, command, body):
+        node, key = self._lookup(session, command)
+        return self._find(session, command[2:], body, scope=key)
+
+    def _click(self, session, command, body):
+        node, key = self._lookup(session, command)
+        session['app'].click(key)
+
+    def _value(self, session, command, body):
+        node, key = self._lookup(session, command)
+        if not key.startswith('input:'):
+            raise WebDriverError(400, 'invalid element state', f'Element {key} is not editable')
+        session['app'].type_text(key, body.get('text') or ''.join(body.get('value', [])))
+
+    def _clear(self, session, command, body):
+        node, key = self._lookup(session, command)
+        if key.startswith('input:'):
+            session['app'].clear_text(key)
+
+    def _displayed(self, session, command, body):
+        node, key = self._lookup(session, command)
+        return is_displayed(node)
+
+    def _selected(self, session, command, body):
+        node, key = self._lookup(session, command)
+        return node.get('checked') == 'true' or node.get('value') == '1'
+
+    def _text(self, session, command, body):
+        node, key = self._lookup(session, command)
+        return node.get('text', node.get('label', node.get('value', '')))
+
+    def _tag_name(self, session, command, body):
+        node, key = self._lookup(session, command)
+        return node.tag
+
+    def _rect(self, session, command, body):
+        node, key = self._lookup(session, command)
+        if node.get('bounds'):
+            x1, y1, x2, y2 = map(int, re.findall(r'\d+', node.get('bounds')))
+            return {'x': x1, 'y': y1, 'width': x2 - x1, 'height': y2 - y1}
+        return {k: int(node.get(k, 0)) for k in ('x', 'y', 'width', 'height')}
+
+    def _attribute(self, session, command, body):
+        node, key = self._lookup(session, command)
+        return node.get(command[-1])
+
+    # Mobile commands
+
+    def _execute(self, session, command, body):
+        script = body.get('script', '')
+        args = (body.get('args') or [{}])[0] or {}
+        if not script.startswith('mobile:'):
+            raise WebDriverError(404, 'unknown method', f'Unsupported script: {script!r}')
+        return self._mobile(session, script.split(':', 1)[1].strip(), args)
+
+    def _appium(self, session, command, body):
+        # Legacy /appium/device/... endpoints
+        name = command[-1]
+        legacy = {
+            'hide_keyboard': 'hideKeyboard', 'is_keyboard_shown': 'isKeyboardShown',
+            'activate_app': 'activateApp', 'terminate_app': 'terminateApp',
+            'app_state': 'queryAppState', 'press_keycode': 'pressKey',
+        }
+        if name not in legacy:
+            raise WebDriverError(404, 'unknown command', f'Unknown command: {"/".join(command)}')
+        return self._mobile(session, legacy[name], body)
+
+    def _mobile(self, session, name: str, args: dict):
+        app = session['app']
+        with app.lock:
+            if name == 'hideKeyboard':
+                app.keyboard = False
+                return None
+            if name == 'isKeyboardShown':
+                return app.keyboard
+            if name == 'clearApp':
+                app.reset()
+                app.running = False
+                return None
+            if name == 'terminateApp':
+                was_running = app.running
+                app.running = False
+                return was_running
+            if name == 'activateApp':
+                if not app.running:
+                    app.running = True
+                    app.screen, app.overlay, app.snackbar = 'tasks', None, None
+                return None
+            if name == 'queryAppState':
+                return 4 if app.running else 1
+            if name == 'pressKey':
+                if int(args.get('keycode', 0)) == 279 and app.focus:  # KEYCODE_PASTE
+                    app.type_text(app.focus, app.clipboard)
+                return None
+            if name == 'setClipboard':
+                app.clipboard = base64.b64decode(args.get('content', '')).decode()
+                return None
+            if name == 'getClipboard':
+                return base64.b64encode(app.clipboard.encode()).decode()
+            if name == 'replaceElementValue':
+                node, key = self._lookup(session, ['element', args.get('elementId', '')])
+                if not key.startswith('input:'):
+                    raise WebDriverError(400, 'invalid element state', f'Element {key} is not editable')
+                app.set_text(key, args.get('text', ''))
+                return None
+            if name == 'getPerformanceData' and session['platform'] == 'android':
+                data = app.performance_data(args.get('dataType', ''))
+                if data is None:
+                    raise WebDriverError(400, 'invalid argument', f'Unknown data type: {args.get("dataType")}')
+                return data
+            if name in ('scrollGesture', 'scroll'):
+                # Android scrollGesture (percent of the area) / iOS scroll (one page)
+                rows = max(1, round(float(args.get('percent', 1.0)) * app.VIEWPORT_ROWS))
+                return app.scroll_by(-rows if args.get('direction') == 'up' else rows)
+        raise WebDriverError(404, 'unknown method', f'Unsupported mobile command: mobile: {name}')
+
+
+def _handler_for(server: FakeAppiumServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+        disable_nagle_algorithm = True
+
+        def _handle(self, method):
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b''
+            try:
+                body = json.loads(raw) if raw else {}
+                status, payload = 200, {'value': server.dispatch(method, self.path.split('?')[0], body)}
+            except WebDriverError as e:
+                status = e.status
+                payload = {'value': {'error': e.error, 'message': e.message, 'stacktrace': ''}}
+            except Exception as e:  # report server bugs as WebDriver errors instead of dropping the connection
+                status = 500
+                payload = {'value': {'error': 'unknown error', 'message': repr(e), 'stacktrace': ''}}
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def do_DELETE(self):
+            self._handle('DELETE')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Fake Appium server simulating the Todo app')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4723)
+    args = parser.parse_args()
+    fake = FakeAppiumServer(args.host, args.port)
+    print(f'Fake Appium server listening on {fake.url}')
+    try:
+        fake.httpd.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,226 @@
+"""
+Session health monitor: fail fast on a dead session instead of waiting out
+every timeout.
+
+When the UiAutomator2 server or the app crashes, or the device drops off
+adb, every following Selene wait retries its command until ``timeout`` runs
+out -- for every remaining step of every remaining test.
+``install(driver, platform)`` wraps the driver's ``execute`` and watches the
+commands the test sends anyway:
+
+- An error meaning the session is gone is fatal at once: invalid session
+  id, a crashed UiAutomator2 instrumentation or lost device
+  (``FATAL_MESSAGES``), or the Appium server unreachable after the
+  transport's retries.
+- Appium's proxy errors (``SUSPECT_MESSAGES``) also come with ordinary,
+  recoverable failures: they are fatal only when the app state query that
+  follows fails too or finds the app gone.
+- While finds keep failing with "no such element" for ``health_checkInterval``
+  seconds, the app state is queried (at most once per interval).  An app
+  that is no longer in the foreground has crashed or been closed.
+
+The app state query goes to the command executor directly, past the driver
+wrappers and this monitor, so it does not count as a command of the test.
+
+A successful command costs one attribute check.  On a fatal finding the
+device is checked with ``adb get-state`` (Android) to tell a lost device
+apart, it is quarantined for the rest of the run (``check_quarantine()``
+fails the setup of every later test on it) and ``SessionUnhealthy`` is
+raised.  It derives from BaseException, so neither Selene's waits nor the
+helpers' ``except Exception`` retry it: the test fails at once with the
+reason.  Later commands of the session raise it again, except ``quit``;
+after ``quit`` the session is no longer watched.
+"""
+
+import subprocess
+import time
+
+import pytest
+import urllib3
+from appium.webdriver.applicationstate import ApplicationState
+from selenium.common.exceptions import InvalidSessionIdException, NoSuchElementException, WebDriverException
+
+import config
+from sessions import app_id_for, device_serial
+
+# Appium errors (lowercase) only a crashed UiAutomator2 server or a lost device produces
+FATAL_MESSAGES = (
+    'instrumentation process is not running',
+    'econnrefused',
+    'device offline',
+    'could not find a connected android device',
+)
+# Proxy errors also seen on recoverable failures: fatal once the app state query confirms them
+SUSPECT_MESSAGES = (
+    'uiautomator2 server',
+    'could not proxy command',
+    'socket hang up',
+    'econnreset',
+)
+
+
+class SessionUnhealthy(BaseException):
+    """The session or its device is unusable; aborts the running test."""
+
+
+class HealthStats:
+    def __init__(self):
+        self.checks = 0
+        self.aborts = 0
+        self.quarantined = []
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def merge(self, data: dict) -> None:
+        for name, value in data.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def __bool__(self):
+        return self.checks > 0 or self.aborts > 0
+
+    def summary(self) -> str:
+        lines = [f'health: {self.checks} app state checks, {self.aborts} tests aborted on an unhealthy session']
+        lines += [f'quarantined {reason}' for reason in self.quarantined]
+        return '\n'.join(lines)
+
+
+STATS = HealthStats()
+
+QUARANTINE = {}  # device -> reason, for the rest of the run
+
+
+class HealthMonitor:
+    """Health state of one session."""
+
+    def __init__(self, driver, platform: str, adb: bool = True):
+        self.driver = driver
+        self.device = device_serial(driver)
+        self.app_id = app_id_for(platform)
+        self.adb = adb and platform.lower() == 'android'
+        self.reason = None
+        self.miss_since = None
+        self.last_check = 0.0
+        self.closed = False  # quit: no longer watched
+
+    def missed(self) -> None:
+        """A find failed: check the app once finds have kept failing for a while."""
+        __tracebackhide__ = True
+        now = time.monotonic()
+        if self.miss_since is None:
+            self.miss_since = now
+            return
+        interval = config.HEALTH_CHECK_INTERVAL
+        if now - self.miss_since < interval or now - self.last_check < interval:
+            return
+        self.last_check = now
+        self.check_app()
+
+    def app_state(self) -> int:
+        # mobile: queryAppState past the driver wrappers (not a test command; keeps miss_since)
+        response = self.driver.command_executor.execute('w3cExecuteScript', {
+            'sessionId': self.driver.session_id,
+            'script': 'mobile: queryAppState',
+            'args': [{'appId': self.app_id, 'bundleId': self.app_id}],
+        })
+        self.driver.error_handler.check_response(response)
+        return response.get('value')
+
+    def check_app(self, error: BaseException = None) -> None:
+        """Fail unless the app state can be queried and the app is in the foreground."""
+        __tracebackhide__ = True
+        STATS.checks += 1
+        try:
+            state = self.app_state()
+        except (WebDriverException, urllib3.exceptions.HTTPError) as e:
+            self.fail('the automation server on the device crashed or is unreachable', error or e)
+        if state != ApplicationState.RUNNING_IN_FOREGROUND:
+            self.fail(f'{self.app_id} is not in the foreground (app state {state}): it crashed or was closed', error)
+
+    def fail(self, reason: str, error: BaseException = None):
+        __tracebackhide__ = True
+        if self.adb:
+            problem = _adb_problem(self.device)
+            if problem:
+                reason = f'device lost (adb: {problem}); {reason}'
+        if error is not None:
+            reason += f' [{type(error).__name__}: {str(error).strip().splitlines()[0]}]'
+        self.reason = f'{self.device or "device"}: {reason}'
+        if self.device not in QUARANTINE:
+            QUARANTINE[self.device] = self.reason
+            STATS.quarantined.append(self.reason)
+        STATS.aborts += 1
+        raise SessionUnhealthy(self.reason) from error
+
+
+def install(driver, platform: str, adb: bool = True):
+    """Watch the health of the session behind `driver` (instance-level wrap).
+
+    adb: diagnose lost devices with adb (Android devices; off for the fake server).
+    """
+    if getattr(driver, '_health_monitor', None) is not None:
+        return driver
+    monitor = HealthMonitor(driver, platform, adb)
+    execute = driver.execute
+
+    def monitored_execute(driver_command, params=None):
+        __tracebackhide__ = True
+        if monitor.closed:
+            return execute(driver_command, params)
+        if driver_command == 'quit':
+            monitor.closed = True
+            try:
+                return execute(driver_command, params)
+            except (WebDriverException, urllib3.exceptions.HTTPError):
+                if monitor.reason is None:
+                    raise
+                return None  # already gone
+        if monitor.reason is not None:
+            raise SessionUnhealthy(monitor.reason)
+        try:
+            result = execute(driver_command, params)
+        except NoSuchElementException:
+            monitor.missed()
+            raise
+        except InvalidSessionIdException as e:
+            monitor.fail('the Appium session was terminated', e)
+        except WebDriverException as e:
+            message = str(e).lower()
+            if any(fatal in message for fatal in FATAL_MESSAGES):
+                monitor.fail('the automation server on the device crashed or is unreachable', e)
+            if any(suspect in message for suspect in SUSPECT_MESSAGES):
+                monitor.check_app(e)
+            raise
+        except urllib3.exceptions.HTTPError as e:
+            monitor.fail('the Appium server is unreachable', e)
+        monitor.miss_since = None
+        return result
+
+    driver.execute = monitored_execute
+    driver._health_monitor = monitor
+    return driver
+
+
+def failure(driver):
+    """Why the session behind `driver` was found unhealthy, or None."""
+    monitor = getattr(driver, '_health_monitor', None)
+    return monitor.reason if monitor is not None else None
+
+
+def check_quarantine(device: str) -> None:
+    """Fail the current test at once when `device` is quarantined."""
+    reason = QUARANTINE.get(device)
+    if reason is not None:
+        pytest.fail(f'Device quarantined for the rest of the run: {reason}', pytrace=False)
+
+
+def _adb_problem(serial: str):
+    # None when adb sees the device (or adb is missing), else what adb says
+    try:
+        out = subprocess.run(['adb', '-s', serial, 'get-state'], capture_output=True, text=True, timeout=10)
+    except FileNotFoundError:
+        return None
+    except subprocess.TimeoutExpired:
+        return 'get-state timed out'
+    state = out.stdout.strip()
+    return None if state == 'device' else (state or out.stderr.strip() or 'not found')
@@ -0,0 +1,143 @@
+"""
+Per-command and per-helper latency instrumentation.
+
+- ``install(driver)`` wraps the driver's ``execute`` so every WebDriver
+  command (finds included, element commands go through it too) is timed.
+- ``wait_decorator`` is plugged into ``browser.config._wait_decorator`` to
+  time every Selene wait (should / click / type ...), retries included.
+- ``@timed_helper`` times the app-level helpers in test_todo_app.py.
+
+Samples are plain float appends into per-run and per-test dicts keyed by
+``kind:name``.  At the end of the run the terminal summary lists the top
+time sinks and a latency histogram; the raw summary is also written as JSON.
+"""
+
+import functools
+import json
+import time
+from pathlib import Path
+
+from perf_stats import format_ms, summarize
+
+FIND_COMMANDS = {'findElement', 'findElements', 'findChildElement', 'findChildElements'}
+HISTOGRAM_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0]
+
+
+class LatencyRecorder:
+    """Latency samples of the run and of the current test."""
+
+    def __init__(self):
+        self.samples = {}
+        self.test_samples = {}
+
+    def record(self, kind: str, name: str, duration: float) -> None:
+        key = f'{kind}:{name}'
+        self.samples.setdefault(key, []).append(duration)
+        self.test_samples.setdefault(key, []).append(duration)
+
+    def start_test(self) -> None:
+        self.test_samples = {}
+
+    def test_summary(self) -> dict:
+        return {key: summarize(values) for key, values in self.test_samples.items()}
+
+    # Run summary (RUN_STATS protocol: as_dict / merge / bool / summary)
+
+    def as_dict(self) -> dict:
+        return self.samples
+
+    def merge(self, data: dict) -> None:
+        for key, values in data.items():
+            self.samples.setdefault(key, []).extend(values)
+
+    def __bool__(self):
+        return bool(self.samples)
+
+    def report(self) -> dict:
+        # Per key summary, sorted by total time spent
+        rows = {key: {**summarize(values), 'total': sum(values)} for key, values in self.samples.items()}
+        return dict(sorted(rows.items(), key=lambda item: item[1]['total'], reverse=True))
+
+    def histogram(self, kind: str) -> list:
+        # [(upper bound or None, count)] over all samples of one kind
+        values = [v for key, vs in self.samples.items() if key.startswith(f'{kind}:') for v in vs]
+        counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        for value in values:
+            for i, bound in enumerate(HISTOGRAM_BUCKETS):
+                if value < bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return list(zip(HISTOGRAM_BUCKETS + [None], counts))
+
+    def summary(self, top: int = 15) -> str:
+        lines = [f'{"top time sinks":<44} {"count":>6} {"total s":>8} {"p50 ms":>8} {"p95 ms":>8} {"max ms":>8}']
+        for key, row in list(self.report().items())[:top]:
+            lines.append(
+                f'{key[:44]:<44} {row["count"]:>6} {row["total"]:>8.2f} '
+                f'{format_ms(row["p50"]):>8} {format_ms(row["p95"]):>8} {format_ms(row["max"]):>8}'
+            )
+        for kind in ('command', 'find'):
+            buckets = self.histogram(kind)
+            total = sum(count for _, count in buckets)
+            if not total:
+                continue
+            lines.append('')
+            lines.append(f'{kind} latency histogram ({total} samples)')
+            for bound, count in buckets:
+                label = f'< {bound * 1000:.0f} ms' if bound else f'>= {HISTOGRAM_BUCKETS[-1] * 1000:.0f} ms'
+                bar = '#' * max(1 if count else 0, round(40 * count / total))
+                lines.append(f'  {label:>10} {count:>6} {bar}')
+        return '\n'.join(lines)
+
+    def write_json(self, path) -> None:
+        Path(path).write_text(json.dumps(self.report(), indent=2))
+
+
+TIMINGS = LatencyRecorder()
+
+
+def install(driver):
+    """Time every WebDriver command sent through `driver` (instance-level wrap)."""
+    if getattr(driver, '_latency_instrumented', False):
+        return driver
+    execute = driver.execute
+
+    def timed_execute(driver_command, params=None):
+        start = time.perf_counter()
+        try:
+            return execute(driver_command, params)
+        finally:
+            kind = 'find' if driver_command in FIND_COMMANDS else 'command'
+            TIMINGS.record(kind, driver_command, time.perf_counter() - start)
+
+    driver.execute = timed_execute
+    driver._latency_instrumented = True
+    return driver
+
+
+def wait_decorator(wait):
+    """Selene `_wait_decorator`: time each wait, named after its command/condition."""
+    def decorator(logic):
+        @functools.wraps(logic)
+        def timed(fn):
+            start = time.perf_counter()
+            try:
+                return logic(fn)
+            finally:
+                TIMINGS.record('wait', str(fn).split(':')[0], time.perf_counter() - start)
+        return timed
+    return decorator
+
+
+def timed_helper(func):
+    """Decorator for test helpers: record each call's duration under its name."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            TIMINGS.record('helper', func.__name__, time.perf_counter() - start)
+    return wrapper
@@ -0,0 +1,164 @@
+"""
+Locator latency benchmark for AndroidLocators / iOSLocators.
+
+Resolves every static locator and the dynamic task_by_title /
+task_checkbox_by_title helpers many times against the screen currently shown
+on the device and reports p50/p95/p99 find latency per locator and per
+strategy, slowest first.  The app is neither reset nor relaunched, so bring
+it to the screen state you want to measure before running.
+
+Run:
+    python tests/android_app/locator_bench.py --platform android
+    python tests/android_app/locator_bench.py --platform android --device emulator-5554 \\
+        --iterations 50 --title "Buy groceries" --json locator_bench.json
+    python tests/android_app/locator_bench.py --max-p95-ms 300   # exit 1 if any locator is slower
+    python tests/android_app/locator_bench.py --fake-appium      # framework check, no device
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+_project_root = Path(__file__).resolve().parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from appium import webdriver
+
+import config
+from locators import get_locators
+from perf_stats import format_ms, summarize
+from sessions import remote_url_for
+from transport import PooledAppiumConnection
+
+DEFAULT_TITLES = ['Buy groceries']
+
+
+def static_locators(locators) -> dict:
+    # NAME -> (by, value) for every class-level locator tuple
+    return {
+        name: value
+        for name, value in vars(locators).items()
+        if name.isupper() and isinstance(value, tuple) and len(value) == 2
+    }
+
+
+def dynamic_locators(locators, titles) -> dict:
+    named = {}
+    for title in titles:
+        named[f'task_by_title({title!r})'] = locators.task_by_title(title)
+        named[f'task_checkbox_by_title({title!r})'] = locators.task_checkbox_by_title(title)
+    return named
+
+
+def bench(driver, named_locators: dict, iterations: int, warmup: int = 1):
+    """Time find_elements for each locator; iterations are interleaved across locators.
+
+    Returns (per-locator summary rows, raw durations per locator).
+    """
+    durations = {name: [] for name in named_locators}
+    found = {}
+    for i in range(warmup + iterations):
+        for name, (by, value) in named_locators.items():
+            start = time.perf_counter()
+            elements = driver.find_elements(by, value)
+            elapsed = time.perf_counter() - start
+            if i >= warmup:
+                durations[name].append(elapsed)
+            found[name] = len(elements)
+    results = {
+        name: {
+            'strategy': named_locators[name][0],
+            'value': named_locators[name][1],
+            'found': found[name],
+            **summarize(durations[name]),
+        }
+        for name in named_locators
+    }
+    return results, durations
+
+
+def by_strategy(results: dict, durations: dict) -> dict:
+    grouped = {}
+    for name, row in results.items():
+        grouped.setdefault(row['strategy'], []).extend(durations[name])
+    return {strategy: summarize(values) for strategy, values in grouped.items()}
+
+
+def print_report(results: dict, strategies: dict) -> None:
+    print(f'{"locator":<48} {"strategy":<22} {"found":>5} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for name, row in sorted(results.items(), key=lambda item: item[1]['p95'], reverse=True):
+        print(
+            f'{name[:48]:<48} {row["strategy"]:<22} {row["found"]:>5} '
+            f'{format_ms(row["p50"]):>8} {format_ms(row["p95"]):>8} {format_ms(row["p99"]):>8}'
+        )
+    print()
+    print(f'{"strategy":<22} {"finds":>6} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for strategy, row in sorted(strategies.items(), key=lambda item: item[1]['p95'], reverse=True):
+        print(
+            f'{strategy:<22} {row["count"]:>6} '
+            f'{format_ms(row["p50"]):>8} {format_ms(row["p95"]):>8} {format_ms(row["p99"]):>8}'
+        )
+
+
+def attach_driver(platform: str, device: str = ''):
+    # Session that leaves the app exactly as it is on screen
+    options = config.todo_driver_options(platform, device_override=device or None)
+    options.set_capability('noReset', True)
+    options.set_capability('autoLaunch', False)
+    return webdriver.Remote(PooledAppiumConnection(remote_url_for(platform)), options=options)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--platform', default='android', choices=['android', 'ios'])
+    parser.add_argument('--device', default='', help='Device id (default: env / first from adb)')
+    parser.add_argument('--iterations', type=int, default=20, help='Finds per locator (default: 20)')
+    parser.add_argument('--title', action='append', dest='titles',
+                        help='Task title for the dynamic locators (repeatable)')
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+    parser.add_argument('--max-p95-ms', type=float,
+                        help='Exit with status 1 when any locator p95 exceeds this many ms')
+    parser.add_argument('--fake-appium', action='store_true', help='Run against the in-process fake Appium server')
+    args = parser.parse_args(argv)
+
+    locators = get_locators(args.platform)
+    named = {**static_locators(locators), **dynamic_locators(locators, args.titles or DEFAULT_TITLES)}
+
+    fake = None
+    if args.fake_appium:
+        from fake_appium import FakeAppiumServer
+        fake = FakeAppiumServer().start()
+        config.ANDROID_REMOTE_URL = config.IOS_REMOTE_URL = fake.url
+        config.ANDROID_DEVICE_DISCOVERY = False  # no device behind it: no adb (as in conftest)
+    try:
+        driver = attach_driver(args.platform, args.device)
+        try:
+            results, durations = bench(driver, named, args.iterations)
+        finally:
+            driver.quit()
+    finally:
+        if fake is not None:
+            fake.stop()
+    strategies = by_strategy(results, durations)
+    print_report(results, strategies)
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(
+            {'platform': args.platform, 'iterations': args.iterations,
+             'locators': results, 'strategies': strategies},
+            indent=2,
+        ))
+
+    if args.max_p95_ms is not None:
+        slow = [name for name, row in results.items() if row['p95'] * 1000 > args.max_p95_ms]
+        if slow:
+            print(f'\n{len(slow)} locator(s) over p95 budget of {args.max_p95_ms} ms: {", ".join(slow)}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+XPath -> UiSelector locator compiler (Android).
+
+An XPath find makes UiAutomator2 dump the whole view hierarchy to XML and
+evaluate the expression over it; on a long task list that is the most
+expensive find there is.  A UiSelector find is answered by UiAutomator from
+the accessibility tree directly.  ``compile_locators(AndroidLocators)``
+runs at configure time, before collection, and rewrites every XPath
+locator of the class it can translate: constant locators are replaced by
+their UiSelector form, locator methods (``task_checkbox_by_title``) are
+compiled once with placeholder arguments into a template that is filled
+in on each call.
+
+Supported patterns (``XPathQuery`` parses the expression):
+
+- ``//Tag[@attr="v"]...``: one selector; tag -> ``className``, ``@text`` /
+  ``@content-desc`` / ``@resource-id`` -> ``text`` / ``description`` /
+  ``resourceId`` (``contains()`` / ``starts-with()`` -> ``...Contains`` /
+  ``...StartsWith``), ``@checked="true"`` etc. -> boolean properties.
+- ``//A//B``: ``childSelector`` chain.
+- ``//P[./S][./C]/C`` (the element C in the same parent as S): S's selector
+  ``.fromParent(C)``.  UiSelector cannot constrain the parent itself, so P's
+  class is dropped.
+
+Anything else (positions, ``/`` paths from the root, ...) stays XPath and is
+listed in the run summary.  ``MODE`` (--compile-locators):
+
+- ``on`` (default): compiled locators are used.
+- ``check``: each find with a compiled locator is repeated with its XPath
+  (``install(driver)``) and the elements compared; on a mismatch the XPath
+  result is used and the locator reverted to XPath for the rest of the run.
+- ``off``: locators are left as written.
+"""
+
+import inspect
+
+from appium.webdriver.common.appiumby import AppiumBy
+from selenium.common.exceptions import NoSuchElementException
+
+from snapshot import BOOLEAN_PROPERTIES, Unsupported, XPathQuery
+
+MODE = 'on'
+
+# XPath attribute -> UiSelector method for =, contains() and starts-with()
+ATTRIBUTES = {
+    'text': ('text', 'textContains', 'textStartsWith'),
+    'content-desc': ('description', 'descriptionContains', 'descriptionStartsWith'),
+    'resource-id': ('resourceId', None, None),
+    'class': ('className', None, None),
+}
+_KINDS = ('eq', 'contains', 'starts-with')
+
+# Placeholders for the arguments of locator methods (private use characters)
+_PLACEHOLDER = '\ue000{}\ue001'
+
+_FIND_COMMANDS = ('findElement', 'findElements', 'findChildElement', 'findChildElements')
+
+
+class CompilerStats:
+    def __init__(self):
+        self.compiled = []      # locator names
+        self.kept = {}          # locator name -> why it stays XPath
+        self.checks = 0
+        self.mismatches = []    # first mismatch of each reverted locator
+        self.reverted = []      # locator names
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def merge(self, data: dict) -> None:
+        # Every worker compiles the same locators: only the checks add up
+        self.checks += data['checks']
+        self.mismatches.extend(data['mismatches'])
+        self.reverted.extend(name for name in data['reverted'] if name not in self.reverted)
+
+    def __bool__(self):
+        return bool(self.compiled or self.kept)
+
+    def summary(self) -> str:
+        lines = [
+            f'locator compiler ({MODE}): {len(self.compiled)} XPath locators compiled to UiSelector '
+            f'({", ".join(self.compiled) or "none"}), {len(self.kept)} kept as XPath'
+        ]
+        lines += [f'  kept {name}: {reason}' for name, reason in sorted(self.kept.items())]
+        if MODE == 'check':
+            lines.append(f'check: {self.checks} finds compared, {len(self.mismatches)} locators mismatched, '
+                         f'reverted to XPath: {", ".join(self.reverted) or "none"}')
+            lines += [f'  {mismatch}' for mismatch in self.mismatches]
+        return '\n'.join(lines)
+
+
+STATS = CompilerStats()
+
+_originals = {}  # locator name -> (class, attribute as written)
+_sources = {}    # compiled UiSelector -> (locator name, XPath), check mode
+
+
+def compile_xpath(expression: str) -> str:
+    """UiSelector equivalent of an XPath expression; raises Unsupported."""
+    steps = XPathQuery(expression).steps
+    if steps[0][0] != 'descendant':
+        raise Unsupported('path from the root')
+    if len(steps) == 2 and steps[1][0] == 'child':
+        return _sibling(*steps)
+    if any(axis != 'descendant' for axis, _, _ in steps):
+        raise Unsupported('child steps (/) outside the parent/sibling pattern')
+    selector = _selector(steps[-1])
+    for step in reversed(steps[:-1]):
+        selector = f'{_selector(step)}.childSelector({selector})'
+    return selector
+
+
+def _sibling(parent, target) -> str:
+    # //P[./S][./C]/C -> S.fromParent(C); [./C] is implied by the target
+    anchors = []
+    for predicate in parent[2]:
+        if predicate[0] != 'exists':
+            raise Unsupported('predicates on the parent step other than child paths')
+        path = predicate[1]
+        if len(path) != 1 or path[0][0] != 'child':
+            raise Unsupported('parent predicate is not a single child step')
+        if path[0][1:] != target[1:]:
+            anchors.append(path[0])
+    if len(anchors) != 1:
+        raise Unsupported(f'{len(anchors)} sibling anchors (1 supported)')
+    return f'{_selector(anchors[0])}.fromParent({_selector(target)})'
+
+
+def _selector(step) -> str:
+    axis, name, predicates = step
+    calls = [] if name == '*' else [f'.className({_quote(name)})']
+    for predicate in predicates:
+        kind = predicate[0]
+        if kind not in _KINDS:
+            raise Unsupported(f'{kind} predicate')
+        attribute, value = predicate[1], predicate[2]
+        if attribute in BOOLEAN_PROPERTIES and kind == 'eq' and value in ('true', 'false'):
+            calls.append(f'.{attribute}({value})')
+            continue
+        method = ATTRIBUTES.get(attribute, (None,) * 3)[_KINDS.index(kind)]
+        if method is None:
+            raise Unsupported(f'{kind} on @{attribute}')
+        calls.append(f'.{method}({_quote(value)})')
+    if not calls:
+        raise Unsupported('step without criteria')
+    return 'new UiSelector()' + ''.join(calls)
+
+
+def _quote(value: str) -> str:
+    return f'"{_escape(value)}"'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def compile_locators(cls) -> None:
+    """Replace the XPath locators of `cls` by their compiled form (MODE 'on' / 'check')."""
+    if MODE == 'off':
+        return
+    for name, attribute in list(vars(cls).items()):
+        if name.startswith('_') or name in _originals:
+            continue
+        try:
+            if isinstance(attribute, staticmethod):
+                compiled = _compile_method(name, attribute.__func__)
+            elif isinstance(attribute, tuple) and len(attribute) == 2 and attribute[0] == AppiumBy.XPATH:
+                compiled = (AppiumBy.ANDROID_UIAUTOMATOR, compile_xpath(attribute[1]))
+                _sources[compiled[1]] = (name, attribute[1])
+            else:
+                continue
+        except Unsupported as e:
+            STATS.kept[name] = str(e)
+            continue
+        if compiled is None:
+            continue
+        _originals[name] = (cls, attribute)
+        setattr(cls, name, compiled)
+        STATS.compiled.append(name)
+
+
+def _compile_method(name: str, function):
+    signature = inspect.signature(function)
+    placeholders = [_PLACEHOLDER.format(i) for i in range(len(signature.parameters))]
+    locator = function(*placeholders)
+    if not isinstance(locator, tuple) or locator[0] != AppiumBy.XPATH:
+        return None
+    template = compile_xpath(locator[1])
+    if not all(placeholder in template for placeholder in placeholders):
+        raise Unsupported('an argument is not used in a compared value')
+
+    def compiled_locator(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        value = template
+        for placeholder, arg in zip(placeholders, bound.arguments.values()):
+            value = value.replace(placeholder, _escape(str(arg)))
+        if MODE == 'check':
+            _sources[value] = (name, function(*args, **kwargs)[1])
+        return AppiumBy.ANDROID_UIAUTOMATOR, value
+
+    compiled_locator.__name__ = compiled_locator.__qualname__ = function.__name__
+    compiled_locator.__doc__ = function.__doc__
+    return staticmethod(compiled_locator)
+
+
+def revert(name: str) -> None:
+    """Use the locator `name` as written again."""
+    if name in _originals:
+        cls, attribute = _originals.pop(name)
+        setattr(cls, name, attribute)
+        STATS.reverted.append(name)
+
+
+def install(driver):
+    """Check mode: compare every find with a compiled locator against its XPath (instance-level wrap)."""
+    if MODE != 'check' or getattr(driver, '_locator_check_installed', False):
+        return driver
+    execute = driver.execute
+
+    def checked_execute(driver_command, params=None):
+        source = None
+        if driver_command in _FIND_COMMANDS and (params or {}).get('using') == AppiumBy.ANDROID_UIAUTOMATOR:
+            source = _sources.get(params.get('value'))
+        if source is None:
+            return execute(driver_command, params)
+        name, xpath = source
+        compiled = _find(execute, driver_command, params)
+        original = _find(execute, driver_command, {**params, 'using': AppiumBy.XPATH, 'value': xpath})
+        STATS.checks += 1
+        result = compiled
+        if not _same(execute, compiled[0], original[0]):
+            if name in _originals:  # first mismatch of the locator
+                STATS.mismatches.append(
+                    f'{name}: {len(compiled[0])} element(s) with {params["value"]!r}, '
+                    f'{len(original[0])} with {xpath!r}'
+                )
+                revert(name)
+            result = original
+        if result[2] is not None:
+            raise result[2]
+        return result[1]
+
+    driver.execute = checked_execute
+    driver._locator_check_installed = True
+    return driver
+
+
+def _find(execute, driver_command, params):
+    # -> (element ids, response, error)
+    try:
+        response = execute(driver_command, params)
+    except NoSuchElementException as e:
+        return [], None, e
+    value = response['value']
+    elements = value if isinstance(value, list) else [value]
+    return [element.id for element in elements], response, None
+
+
+def _same(execute, ids: list, other: list) -> bool:
+    # Same elements: same ids, or (ids differ per lookup on some servers) same rects
+    if len(ids) != len(other):
+        return False
+    return all(
+        a == b or execute('getElementRect', {'id': a})['value'] == execute('getElementRect', {'id': b})['value']
+        for a, b in zip(ids, other)
+    )
@@ -73,6 +73,12 @@ class AndroidLocators:
         'new UiSelector().textStartsWith("Completed tasks:")',
     )
 
+    # Title texts of the task rows on screen (rows are the views holding a checkbox)
+    TASK_ROW_TITLES = (
+        AppiumBy.XPATH,
+        '//android.view.View[./android.widget.CheckBox]/android.widget.TextView',
+    )
+
     # Validation snackbar
     # Shown when user tries to save a task with an empty title
     SNACKBAR_EMPTY_TASK = (
@@ -102,6 +108,15 @@ class AndroidLocators:
             ),
         )
 
+    @staticmethod
+    def task_by_title_scrollable(title: str) -> tuple:
+        # Let UiAutomator scroll the lazy task list until the row is composed
+        return (
+            AppiumBy.ANDROID_UIAUTOMATOR,
+            'new UiScrollable(new UiSelector().scrollable(true))'
+            f'.scrollIntoView(new UiSelector().text("{title}"))',
+        )
+
 
 # Mocked iOS locators
 class iOSLocators:
@@ -144,6 +159,9 @@ class iOSLocators:
         '//XCUIElementTypeStaticText[contains(@name, "Completed tasks:")]',
     )
 
+    # Title texts of the task rows on screen
+    TASK_ROW_TITLES = (AppiumBy.XPATH, '//XCUIElementTypeCell//XCUIElementTypeStaticText')
+
     # Validation
     SNACKBAR_EMPTY_TASK = (
         AppiumBy.XPATH,
@@ -166,6 +184,11 @@ class iOSLocators:
             ),
         )
 
+    @staticmethod
+    def task_by_title_scrollable(title: str):
+        # No server-side scroll search on XCUITest; scrolling.py scans instead
+        return None
+
 
 def get_locators(platform: str):
     # Return the locator class for the given platform name
@@ -0,0 +1,35 @@
+"""
+Small statistics helpers shared by the timing/benchmark tools.
+"""
+
+
+def percentile(values, pct: float) -> float:
+    """Return the pct-th percentile (0-100) of values, linearly interpolated."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values) -> dict:
+    """count/mean/min/p50/p95/p99/max of a list of durations."""
+    if not values:
+        return {'count': 0, 'mean': 0.0, 'min': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values),
+        'min': min(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values),
+    }
+
+
+def format_ms(seconds: float) -> str:
+    return f'{seconds * 1000:.1f}'
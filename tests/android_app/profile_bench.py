@@ -0,0 +1,162 @@
+"""
+Capability profile comparison (config.CAPABILITY_PROFILES).
+
+Runs a short fixed scenario under each profile -- start a session, create
+two tasks, complete one, check the Completed filter and Statistics, quit --
+and reports the median time per phase and the difference to the first
+profile.  Profiles are interleaved round by round so that device drift
+affects all of them alike.  A profile whose scenario fails is reported as
+unsafe and never recommended.
+
+Run:
+    python tests/android_app/profile_bench.py --platform android --device emulator-5554
+    python tests/android_app/profile_bench.py --rounds 5 --profile isolated --profile fast \\
+        --json profile_bench.json
+    python tests/android_app/profile_bench.py --fake-appium   # framework check, no device
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+_project_root = Path(__file__).resolve().parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from selene import browser, be
+
+import config
+from locators import get_locators
+from perf_stats import percentile
+from sessions import new_driver
+from test_todo_app import create_task, go_to_statistics, go_to_task_list, mark_task_complete, select_filter
+
+PHASES = ('session', 'scenario', 'quit')
+
+
+def scenario(locators) -> None:
+    create_task(locators, title='Profile task 1')
+    create_task(locators, title='Profile task 2')
+    mark_task_complete(locators, title='Profile task 2')
+    select_filter(locators, locators.FILTER_COMPLETED_OPTION)
+    browser.element(locators.task_by_title('Profile task 2')).should(be.visible)
+    go_to_statistics(locators)
+    browser.element(locators.STATS_COMPLETED).should(be.visible)
+    go_to_task_list(locators)
+
+
+def run_once(platform: str, device: str, profile: str) -> dict:
+    """Time each phase of one scenario run; raises when the scenario fails."""
+    locators = get_locators(platform)
+    timings = {}
+    start = time.perf_counter()
+    browser.config.driver = new_driver(platform, device, profile=profile)
+    timings['session'] = time.perf_counter() - start
+    try:
+        start = time.perf_counter()
+        scenario(locators)
+        timings['scenario'] = time.perf_counter() - start
+    finally:
+        start = time.perf_counter()
+        browser.quit()
+        timings['quit'] = time.perf_counter() - start
+    return timings
+
+
+def compare(platform: str, device: str, profiles, rounds: int, warmup: int = 1) -> dict:
+    """-> {profile: {'runs': [timings], 'error': str or None}}
+
+    warmup: untimed runs first (server/app caches, first install).
+    """
+    for _ in range(warmup):
+        try:
+            run_once(platform, device, profiles[0])
+        except Exception:  # reported by the measured runs
+            pass
+    results = {profile: {'runs': [], 'error': None} for profile in profiles}
+    for round_index in range(rounds):
+        # Rotate the order every round
+        shift = round_index % len(profiles)
+        for profile in profiles[shift:] + profiles[:shift]:
+            if results[profile]['error']:
+                continue
+            try:
+                results[profile]['runs'].append(run_once(platform, device, profile))
+            except Exception as e:  # any failure makes the profile unsafe; keep comparing the others
+                results[profile]['error'] = f'{type(e).__name__}: {e}'.splitlines()[0]
+    return results
+
+
+def medians(runs) -> dict:
+    phases = {phase: percentile([run[phase] for run in runs], 50) for phase in PHASES}
+    phases['total'] = sum(phases.values())
+    return phases
+
+
+def print_report(results: dict) -> str:
+    """Print the comparison; return the fastest safe profile (or None)."""
+    safe = {profile: medians(r['runs']) for profile, r in results.items() if not r['error'] and r['runs']}
+    baseline = next(iter(safe.values()), None)
+    print(f'{"profile":<10} {"session s":>10} {"scenario s":>11} {"quit s":>8} {"total s":>8} {"vs first":>9}')
+    for profile, result in results.items():
+        if profile not in safe:
+            print(f'{profile:<10} UNSAFE: {result["error"]}')
+            continue
+        row = safe[profile]
+        delta = f'{row["total"] - baseline["total"]:+.2f}s' if baseline else ''
+        print(
+            f'{profile:<10} {row["session"]:>10.2f} {row["scenario"]:>11.2f} '
+            f'{row["quit"]:>8.2f} {row["total"]:>8.2f} {delta:>9}'
+        )
+    fastest = min(safe, key=lambda profile: safe[profile]['total']) if safe else None
+    print()
+    print(f'fastest safe profile: {fastest or "none"}')
+    return fastest
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--platform', default='android', choices=['android', 'ios'])
+    parser.add_argument('--device', default='', help='Device id (default: env / first healthy from adb)')
+    parser.add_argument('--profile', action='append', dest='profiles',
+                        help='Profile to compare (repeatable; default: all, first is the reference)')
+    parser.add_argument('--rounds', type=int, default=3, help='Scenario runs per profile (default: 3)')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed runs before measuring (default: 1)')
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+    parser.add_argument('--fake-appium', action='store_true', help='Run against the in-process fake Appium server')
+    args = parser.parse_args(argv)
+
+    profiles = args.profiles or list(config.CAPABILITY_PROFILES[args.platform])
+    fake = None
+    if args.fake_appium:
+        from fake_appium import FakeAppiumServer
+        fake = FakeAppiumServer().start()
+        config.ANDROID_REMOTE_URL = config.IOS_REMOTE_URL = fake.url
+        config.ANDROID_DEVICE_DISCOVERY = False  # no device behind it: no adb (as in conftest)
+    browser.config.timeout = float(os.getenv('timeout', '10.0'))
+    try:
+        results = compare(args.platform, args.device, profiles, args.rounds, args.warmup)
+    finally:
+        if fake is not None:
+            fake.stop()
+    fastest = print_report(results)
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps({
+            'platform': args.platform,
+            'device': args.device,
+            'rounds': args.rounds,
+            'profiles': {
+                profile: {**r, 'medians': medians(r['runs']) if r['runs'] else None}
+                for profile, r in results.items()
+            },
+            'fastest_safe': fastest,
+        }, indent=2))
+    return 0 if fastest else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
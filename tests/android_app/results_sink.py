@@ -0,0 +1,112 @@
+"""
+Streaming JSONL result sink: one line per test and per step, as tests finish.
+
+``--results-jsonl <file>`` (off by default) appends to the file, so one
+file collects many runs; ``results_trend.py`` aggregates them.  Records
+(one JSON object per line, ``type`` first):
+
+- ``run``: run id, start time, platform, device option, variant (platform
+  plus ``-fake`` / ``-replay``, as in the duration history), xdist workers.
+- ``test``: run id, node id, ``test_case_id`` (the history key), platform,
+  device, worker, outcome (passed / failed / error / skipped / xfailed /
+  xpassed), duration (setup + call + teardown), per-phase durations and
+  retries (reruns reported by a rerun plugin such as pytest-rerunfailures).
+- ``step``: the app-level helpers of the test (``@timed_helper``), one record
+  per helper name: calls, total and max seconds.
+- ``run_end``: end time, tests and failures written.
+
+Written by the process that sees every report (the xdist controller, or the
+only process): workers pass device and steps along in the reports'
+``user_properties``.  A test costs one buffered write and flush at its
+teardown report.
+"""
+
+import json
+import os
+import time
+
+import run_history
+
+DEVICE_PROPERTY = 'device'
+STEPS_PROPERTY = 'steps'
+
+
+def steps_of(samples: dict) -> dict:
+    """Helper name -> [calls, total s, max s] from a test's latency samples."""
+    return {
+        key.split(':', 1)[1]: [len(values), round(sum(values), 4), round(max(values), 4)]
+        for key, values in samples.items()
+        if key.startswith('helper:') and values
+    }
+
+
+def _outcome(report) -> str:
+    if report.when == 'call' and hasattr(report, 'wasxfail'):
+        return 'xfailed' if report.skipped else 'xpassed'
+    if report.failed:
+        return 'failed' if report.when == 'call' else 'error'
+    return 'skipped' if report.skipped else 'passed'
+
+
+def _worker(report) -> str:
+    # xdist sets report.node (the worker's controller) on forwarded reports
+    gateway = getattr(getattr(report, 'node', None), 'gateway', None)
+    return gateway.id if gateway is not None else 'master'
+
+
+class ResultSink:
+    """pytest plugin appending test/step records to a JSONL file."""
+
+    def __init__(self, path: str, platform: str, variant: str, device: str = '', workers: int = 0):
+        self.path = path
+        self.platform = platform
+        self.variant = variant
+        self.run = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}'
+        self.tests = {}  # node id -> record being built
+        self.written = 0
+        self.failed = 0
+        self.file = open(path, 'a', encoding='utf-8')
+        self._write({
+            'type': 'run', 'run': self.run, 'ts': time.time(), 'platform': platform,
+            'device': device, 'variant': variant, 'workers': workers,
+        })
+
+    def _write(self, record: dict) -> None:
+        self.file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def pytest_runtest_logreport(self, report):
+        test = self.tests.setdefault(report.nodeid, {'phases': {}, 'outcome': 'passed', 'retries': 0})
+        if report.outcome == 'rerun':  # the next attempt starts over (no teardown report)
+            test['retries'] += 1
+            test['phases'], test['outcome'] = {}, 'passed'
+            return
+        test['phases'][report.when] = round(report.duration, 4)
+        outcome = _outcome(report)
+        if test['outcome'] == 'passed':  # the first phase that did not pass decides
+            test['outcome'] = outcome
+        if report.when != 'teardown':
+            return
+        del self.tests[report.nodeid]
+        self._finish(report, test)
+
+    def _finish(self, report, test: dict) -> None:
+        properties = dict(report.user_properties)
+        common = {'run': self.run, 'nodeid': report.nodeid,
+                  'test_case_id': properties.get(run_history.PROPERTY, report.nodeid)}
+        self._write({
+            'type': 'test', **common, 'ts': time.time(), 'platform': self.platform, 'variant': self.variant,
+            'device': properties.get(DEVICE_PROPERTY, ''), 'worker': _worker(report),
+            'outcome': test['outcome'], 'duration': round(sum(test['phases'].values()), 4),
+            'phases': test['phases'], 'retries': test['retries'],
+        })
+        for name, (calls, total, longest) in properties.get(STEPS_PROPERTY, {}).items():
+            self._write({'type': 'step', **common, 'name': name, 'calls': calls, 'total': total, 'max': longest})
+        self.file.flush()
+        self.written += 1
+        self.failed += test['outcome'] in ('failed', 'error')
+
+    def close(self) -> None:
+        self._write({
+            'type': 'run_end', 'run': self.run, 'ts': time.time(), 'tests': self.written, 'failed': self.failed,
+        })
+        self.file.close()
@@ -0,0 +1,181 @@
+"""
+Cross-run performance trends from results_sink JSONL files.
+
+Reads one or more files written with ``--results-jsonl`` (each may hold many
+runs), keeps the last ``--runs`` runs of one variant (platform plus
+``-fake`` / ``-replay``; default: the variant of the newest run) and prints:
+
+- the runs: date, tests, failures, total test time;
+- per test (``test_case_id``): duration over the runs, median, and the
+  newest run against the median of the earlier ones;
+- regressions: tests whose newest duration exceeds that baseline by more
+  than ``--threshold`` (relative) and ``--min-delta`` seconds;
+- the slowest steps (helpers) of the newest run, per call, against their
+  earlier per-call mean.
+
+Skipped tests are ignored; failed tests count (their durations are real).
+Exits with 1 when there are regressions, so CI can flag them.
+
+Run:
+    python tests/android_app/results_trend.py ci/*.jsonl --runs 20 --threshold 0.3
+    python tests/android_app/results_trend.py results.jsonl --variant android --json trend.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+
+TIMED_OUTCOMES = ('passed', 'failed', 'error', 'xfailed', 'xpassed')
+
+
+def load_runs(paths) -> dict:
+    """Run id -> {'run': header, 'tests': [...], 'steps': [...]}, oldest run first."""
+    runs = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:  # e.g. a line cut off by a killed run
+                    continue
+                run = runs.setdefault(record.get('run'), {'run': {}, 'tests': [], 'steps': []})
+                kind = record.get('type')
+                if kind == 'run':
+                    run['run'] = record
+                elif kind in ('test', 'step'):
+                    run[f'{kind}s'].append(record)
+    runs = {run_id: run for run_id, run in runs.items() if run['run']}
+    return dict(sorted(runs.items(), key=lambda item: item[1]['run']['ts']))
+
+
+def select_runs(runs: dict, variant: str = None, count: int = 10) -> list:
+    """The last `count` runs of `variant` (default: the newest run's variant) that ran tests."""
+    if not runs:
+        return []
+    variant = variant or list(runs.values())[-1]['run']['variant']
+    chosen = [run for run in runs.values() if run['run']['variant'] == variant and _timed(run)]
+    return chosen[-count:]
+
+
+def _timed(run) -> list:
+    return [test for test in run['tests'] if test['outcome'] in TIMED_OUTCOMES]
+
+
+def test_trends(runs: list) -> dict:
+    """test_case_id -> durations per run (None where the test did not run), oldest first."""
+    trends = {}
+    for index, run in enumerate(runs):
+        for test in _timed(run):
+            durations = trends.setdefault(test['test_case_id'], [None] * len(runs))
+            durations[index] = (durations[index] or 0.0) + test['duration']
+    return trends
+
+
+def regressions(trends: dict, threshold: float, min_delta: float) -> list:
+    """[(test id, baseline, newest)] for tests slower in the newest run than their earlier median."""
+    found = []
+    for test_id, durations in trends.items():
+        newest, earlier = durations[-1], [d for d in durations[:-1] if d is not None]
+        if newest is None or not earlier:
+            continue
+        baseline = statistics.median(earlier)
+        if newest > baseline * (1 + threshold) and newest - baseline > min_delta:
+            found.append((test_id, baseline, newest))
+    return sorted(found, key=lambda row: row[2] - row[1], reverse=True)
+
+
+def step_stats(runs: list) -> dict:
+    """Step name -> {'calls', 'total', 'max'} summed over `runs`."""
+    steps = {}
+    for run in runs:
+        for step in run['steps']:
+            row = steps.setdefault(step['name'], {'calls': 0, 'total': 0.0, 'max': 0.0})
+            row['calls'] += step['calls']
+            row['total'] += step['total']
+            row['max'] = max(row['max'], step['max'])
+    return steps
+
+
+def _fmt(value) -> str:
+    return f'{value:.2f}' if value is not None else '-'
+
+
+def print_report(runs: list, trends: dict, found: list, top: int) -> None:
+    print(f'{"run":<24} {"variant":<16} {"tests":>6} {"failed":>7} {"test s":>8}')
+    for run in runs:
+        tests = _timed(run)
+        failed = sum(test['outcome'] in ('failed', 'error') for test in tests)
+        print(f'{run["run"]["run"]:<24} {run["run"]["variant"]:<16} {len(tests):>6} {failed:>7} '
+              f'{sum(test["duration"] for test in tests):>8.2f}')
+
+    print()
+    print(f'{"test":<24} {"runs":>5} {"median s":>9} {"newest s":>9} {"change":>8}  durations (oldest first)')
+    rows = sorted(trends.items(), key=lambda item: -(item[1][-1] or 0.0))
+    for test_id, durations in rows:
+        known = [d for d in durations if d is not None]
+        earlier = [d for d in durations[:-1] if d is not None]
+        newest = durations[-1]
+        change = ''
+        if newest is not None and earlier and statistics.median(earlier) > 0:
+            change = f'{newest / statistics.median(earlier) - 1:+.0%}'
+        print(f'{test_id[:24]:<24} {len(known):>5} {statistics.median(known):>9.2f} {_fmt(newest):>9} '
+              f'{change:>8}  {" ".join(_fmt(d) for d in durations[-8:])}')
+
+    print()
+    if found:
+        print(f'regressions ({len(found)}):')
+        for test_id, baseline, newest in found:
+            print(f'  {test_id}: {baseline:.2f}s -> {newest:.2f}s ({newest / baseline - 1:+.0%})')
+    else:
+        print('regressions: none')
+
+    newest_steps = step_stats(runs[-1:])
+    earlier_steps = step_stats(runs[:-1])
+    if newest_steps:
+        print()
+        print(f'{"slowest steps (newest run)":<28} {"calls":>6} {"total s":>8} {"ms/call":>8} {"max ms":>8} {"before":>8}')
+        for name, row in sorted(newest_steps.items(), key=lambda item: item[1]['total'], reverse=True)[:top]:
+            before = earlier_steps.get(name)
+            before_ms = f'{before["total"] / before["calls"] * 1000:.1f}' if before and before['calls'] else '-'
+            print(f'{name[:28]:<28} {row["calls"]:>6} {row["total"]:>8.2f} '
+                  f'{row["total"] / row["calls"] * 1000:>8.1f} {row["max"] * 1000:>8.1f} {before_ms:>8}')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('files', nargs='+', help='JSONL files written with --results-jsonl')
+    parser.add_argument('--variant', help='Variant to report, e.g. android or android-fake (default: newest run\'s)')
+    parser.add_argument('--runs', type=int, default=10, help='Newest runs to include (default: 10)')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown that counts as a regression (default: 0.2)')
+    parser.add_argument('--min-delta', type=float, default=0.1,
+                        help='Smallest slowdown in seconds that counts as a regression (default: 0.1)')
+    parser.add_argument('--top', type=int, default=10, help='Steps to list (default: 10)')
+    parser.add_argument('--json', dest='json_path', help='Also write trends and regressions to this JSON file')
+    args = parser.parse_args(argv)
+
+    runs = select_runs(load_runs(args.files), args.variant, args.runs)
+    if not runs:
+        print('no runs with timed tests found')
+        return 0
+    trends = test_trends(runs)
+    found = regressions(trends, args.threshold, args.min_delta)
+    print_report(runs, trends, found, args.top)
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps({
+            'variant': runs[-1]['run']['variant'],
+            'runs': [run['run']['run'] for run in runs],
+            'trends': trends,
+            'regressions': [
+                {'test_case_id': test_id, 'baseline': baseline, 'newest': newest} for test_id, baseline, newest in found
+            ],
+            'steps': step_stats(runs[-1:]),
+        }, indent=2))
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
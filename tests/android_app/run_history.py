@@ -0,0 +1,164 @@
+"""
+Per-test duration and outcome history, and scheduling based on it.
+
+Each run records, for every test, its total duration (setup + call +
+teardown) and outcome under a stable key: the ``test_case_id`` marker, plus
+the parameter id for parametrized tests, so the history survives renames
+and reordering.  The last ``--history-runs`` results per test are kept in the
+pytest cache (``.pytest_cache``, key ``todo_app/history/<platform>``, with
+a ``-fake`` suffix for fake Appium runs); skipped tests are not recorded.
+
+The history drives:
+
+- ``--schedule longest-first``: longest expected duration first.  With
+  xdist's default load distribution that is dynamic longest-processing-time
+  scheduling: long tests do not end up as stragglers at the end of the run.
+- ``--schedule failed-first``: tests that failed last time, then flaky ones
+  (mixed outcomes, most failures first), then the rest longest-first, to
+  shorten the time to the first failure.
+- ``--shard i/n``: split the suite into n shards of about equal expected time
+  (greedy LPT bin packing) and run shard i, e.g. one per CI job.  Under
+  ``--dist loadgroup`` the same packing assigns one xdist_group per worker.
+
+Tests without history are expected to take the median of the known tests;
+tests marked skip are expected to take no time.
+"""
+
+import statistics
+
+import pytest
+
+CACHE_KEY = 'todo_app/history'
+PROPERTY = 'history_key'
+
+
+def history_key(item) -> str:
+    marker = item.get_closest_marker('test_case_id')
+    if marker is None or not marker.args:
+        return item.nodeid
+    callspec = getattr(item, 'callspec', None)
+    return f'{marker.args[0]}[{callspec.id}]' if callspec else str(marker.args[0])
+
+
+class RunHistory:
+    """Durations/outcomes per test key across runs, plus the results of this run."""
+
+    def __init__(self, data=None, keep: int = 10, key: str = CACHE_KEY):
+        self.data = data or {}
+        self.keep = keep
+        self.key = key
+        self.current = {}
+
+    @classmethod
+    def load(cls, cache, variant: str, keep: int = 10) -> 'RunHistory':
+        key = f'{CACHE_KEY}/{variant}'
+        return cls(cache.get(key, {}), keep, key)
+
+    def save(self, cache) -> None:
+        cache.set(self.key, self.data)
+
+    # Recording (controller side; xdist forwards every worker report)
+
+    def add_report(self, report) -> None:
+        key = dict(report.user_properties).get(PROPERTY)
+        if key is None:
+            return
+        entry = self.current.setdefault(report.nodeid, {'key': key, 'duration': 0.0, 'outcome': 'passed'})
+        entry['duration'] += report.duration
+        if report.failed:
+            entry['outcome'] = 'failed'
+        elif report.skipped and entry['outcome'] == 'passed':
+            entry['outcome'] = 'skipped'
+
+    def commit(self) -> int:
+        """Fold this run's results into the history; return the number of tests recorded."""
+        recorded = 0
+        for entry in self.current.values():
+            if entry['outcome'] == 'skipped':
+                continue
+            past = self.data.setdefault(entry['key'], {'durations': [], 'outcomes': []})
+            past['durations'] = (past['durations'] + [round(entry['duration'], 3)])[-self.keep:]
+            past['outcomes'] = (past['outcomes'] + [entry['outcome']])[-self.keep:]
+            recorded += 1
+        self.current = {}
+        return recorded
+
+    # Queries
+
+    def expected(self, key: str) -> float:
+        past = self.data.get(key)
+        if past and past['durations']:
+            return statistics.median(past['durations'])
+        known = [statistics.median(p['durations']) for p in self.data.values() if p['durations']]
+        return statistics.median(known) if known else 1.0
+
+    def failures(self, key: str) -> int:
+        return self.data.get(key, {}).get('outcomes', []).count('failed')
+
+    def last_failed(self, key: str) -> bool:
+        outcomes = self.data.get(key, {}).get('outcomes', [])
+        return bool(outcomes) and outcomes[-1] == 'failed'
+
+    def flaky(self, key: str) -> bool:
+        return len(set(self.data.get(key, {}).get('outcomes', []))) > 1
+
+
+class HistoryRecorder:
+    """pytest plugin feeding every test report into a RunHistory."""
+
+    def __init__(self, history: RunHistory):
+        self.history = history
+
+    def pytest_runtest_logreport(self, report):
+        self.history.add_report(report)
+
+
+# Scheduling
+
+def expected_duration(item, history: RunHistory) -> float:
+    if item.get_closest_marker('skip'):
+        return 0.0
+    return history.expected(history_key(item))
+
+
+def order_longest_first(items, history: RunHistory) -> None:
+    # Stable: ties keep their collection order
+    items.sort(key=lambda item: -expected_duration(item, history))
+
+
+def order_failed_first(items, history: RunHistory) -> None:
+    def rank(item):
+        key = history_key(item)
+        return (
+            not history.last_failed(key),
+            not history.flaky(key),
+            -history.failures(key),
+            -expected_duration(item, history),
+        )
+    items.sort(key=rank)
+
+
+def lpt_shards(items, history: RunHistory, count: int) -> list:
+    """Greedy LPT: longest tests first, each into the currently lightest shard.
+
+    Returns `count` lists of items (collection order kept inside each shard).
+    """
+    shards = [[] for _ in range(count)]
+    loads = [0.0] * count
+    order = {id(item): i for i, item in enumerate(items)}
+    for item in sorted(items, key=lambda i: -expected_duration(i, history)):
+        lightest = loads.index(min(loads))
+        shards[lightest].append(item)
+        loads[lightest] += expected_duration(item, history)
+    return [sorted(shard, key=lambda i: order[id(i)]) for shard in shards]
+
+
+def parse_shard(value: str):
+    """'2/4' -> (1, 4): zero-based shard index and shard count."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise pytest.UsageError(f'--shard expects INDEX/COUNT (e.g. 1/4), got {value!r}')
+    if not 1 <= index <= count:
+        raise pytest.UsageError(f'--shard index must be between 1 and {count}, got {index}')
+    return index - 1, count
@@ -0,0 +1,195 @@
+"""
+Scroll-aware task lookup for long task lists.
+
+The Compose task list is lazy: only the rows inside the viewport exist in the
+accessibility tree, so ``task_by_title`` / ``task_checkbox_by_title`` cannot
+find an off-screen row and just time out.  ``scroll_to_task`` brings the row
+on screen first:
+
+1. Server-side search (Android): one UiScrollable ``scrollIntoView`` find;
+   UiAutomator scrolls on the device until the row is composed.
+2. Scroll-and-scan (iOS, or when the server-side search misses): swipe the
+   list page by page and parse each page source once.  Every title seen is
+   recorded with the page it was on, and a scan stops at the end of the list
+   (a page without new titles) or after ``scroll_maxSwipes`` swipes.  It
+   continues downwards from the current page first, then from the top.
+
+The recorded pages are the position cache: a repeated lookup swipes straight
+to the title's last known page instead of rescanning from the top.  Pages are
+counted in swipes from the top of the list; ``reset()`` forgets them at the
+start of every test.
+
+``MODE`` ('screen' by default, 'scroll' with --lookup scroll) decides whether
+the helpers scroll before every row lookup.
+"""
+
+from selene import browser
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+import config
+from locators import get_locators
+from snapshot import ScreenSnapshot, is_displayed
+
+MODE = 'screen'
+
+
+class ScrollStats:
+    def __init__(self):
+        self.lookups = 0
+        self.server_side = 0
+        self.on_screen = 0
+        self.cache_hits = 0
+        self.scans = 0
+        self.swipes = 0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def merge(self, data: dict) -> None:
+        for name, value in data.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def __bool__(self):
+        return self.lookups > 0
+
+    def summary(self) -> str:
+        return (
+            f'scroll lookup: {self.lookups} lookups ({self.server_side} server-side, '
+            f'{self.on_screen} on screen, {self.cache_hits} from position cache, '
+            f'{self.scans} scans), {self.swipes} swipes'
+        )
+
+
+STATS = ScrollStats()
+
+_positions = {}   # title -> page (swipes from the top) it was last seen on
+_page = 0         # current page of the list, None when unknown
+_areas = {}       # session id -> scrollGesture area
+
+
+def reset() -> None:
+    """Forget cached positions; the list is at its top (new session / app reset)."""
+    global _page
+    _positions.clear()
+    _page = 0
+
+
+def scroll_to_task(locators, title: str) -> None:
+    """Bring the row of task `title` on screen.
+
+    Raises NoSuchElementException when no row with that title exists.
+    """
+    global _page
+    driver = browser.driver
+    STATS.lookups += 1
+    scrollable = locators.task_by_title_scrollable(title)
+    if scrollable is not None:
+        try:
+            driver.find_element(*scrollable)
+            STATS.server_side += 1
+            _page = None  # UiAutomator scrolled by an unknown amount
+            return
+        except WebDriverException:
+            pass
+    if driver.find_elements(*locators.task_by_title(title)):
+        STATS.on_screen += 1
+        return
+    page = _positions.get(title)
+    if page is not None:
+        _swipe_to(driver, page)
+        if title in _record_visible(driver):
+            STATS.cache_hits += 1
+            return
+    _scan(driver, title)
+
+
+def scroll_to_top(driver=None) -> None:
+    """Scroll the task list back to its first row."""
+    global _page
+    driver = driver or browser.driver
+    previous = None
+    for _ in range(config.SCROLL_MAX_SWIPES):
+        more = _swipe(driver, 'up')
+        if more is False:
+            break
+        if more is None:
+            # No "can scroll more" result (iOS): stop once the page stops changing
+            current = _visible_titles(driver)
+            if current == previous:
+                break
+            previous = current
+    _page = 0
+
+
+def _scan(driver, title: str) -> None:
+    STATS.scans += 1
+    seen = set()
+    if _page != 0 and _scan_down(driver, title, seen):
+        return
+    scroll_to_top(driver)
+    if _scan_down(driver, title, seen):
+        return
+    raise NoSuchElementException(f'Task {title!r} not found after scanning the list ({len(seen)} titles seen)')
+
+
+def _scan_down(driver, title: str, seen: set) -> bool:
+    more = True
+    for _ in range(config.SCROLL_MAX_SWIPES + 1):
+        titles = _record_visible(driver)
+        if title in titles:
+            return True
+        if not more or titles <= seen:
+            return False
+        seen |= titles
+        more = _swipe(driver, 'down') is not False
+    return False
+
+
+def _swipe_to(driver, page: int) -> None:
+    if _page is None:
+        scroll_to_top(driver)
+    for _ in range(abs(page - _page)):
+        _swipe(driver, 'down' if page > _page else 'up')
+
+
+def _swipe(driver, direction: str):
+    """Scroll the list by one page; return False when it cannot scroll further, None if unknown."""
+    global _page
+    STATS.swipes += 1
+    if str(driver.capabilities.get('platformName', '')).lower() == 'ios':
+        driver.execute_script('mobile: scroll', {'direction': direction})
+        result = None
+    else:
+        result = bool(driver.execute_script('mobile: scrollGesture', {
+            **_list_area(driver), 'direction': direction, 'percent': config.SCROLL_PERCENT,
+        }))
+    if _page is not None:
+        _page += 1 if direction == 'down' else -1
+    return result
+
+
+def _list_area(driver) -> dict:
+    # Middle of the screen, clear of the toolbar and the New Task button
+    if driver.session_id not in _areas:
+        size = driver.get_window_size()
+        _areas[driver.session_id] = {
+            'left': int(size['width'] * 0.1), 'top': int(size['height'] * 0.2),
+            'width': int(size['width'] * 0.8), 'height': int(size['height'] * 0.6),
+        }
+    return _areas[driver.session_id]
+
+
+def _visible_titles(driver) -> set:
+    # Titles of the task rows on screen only: a toolbar or menu label equal to a title must not count
+    snapshot = ScreenSnapshot(driver.page_source)
+    platform = str(driver.capabilities.get('platformName', 'android'))
+    rows = {node for node in snapshot.find_all(get_locators(platform).TASK_ROW_TITLES) if is_displayed(node)}
+    return {text for text, nodes in snapshot.by_text.items() if text and any(node in rows for node in nodes)}
+
+
+def _record_visible(driver) -> set:
+    titles = _visible_titles(driver)
+    if _page is not None:
+        for title in titles:
+            _positions[title] = _page
+    return titles
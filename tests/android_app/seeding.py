@@ -0,0 +1,104 @@
+"""
+Bulk task seeding through a non-UI channel.
+
+The Todo app stores tasks in a Room (SQLite) database.  On debuggable builds
+we can write to it directly with ``adb shell run-as <package> sqlite3``:
+the app is stopped, all tasks are inserted in one transaction and the app is
+relaunched -- a handful of round trips regardless of the number of tasks.
+
+``seed_via_adb`` returns False when that channel is not available (iOS,
+no adb, release build, no sqlite3 on the device, unexpected schema, or
+``ENABLED`` off for an offline transport); callers then fall back to the UI
+helpers.
+"""
+
+import subprocess
+import uuid
+
+import config
+from sessions import device_serial
+
+ENABLED = True
+_channel_ok = {}
+
+
+def normalize_tasks(tasks) -> list:
+    """Accept titles or dicts; return dicts with title/description/completed.
+
+    As in create_task, an empty description defaults to the title.
+    """
+    normalized = []
+    for task in tasks:
+        if isinstance(task, str):
+            task = {'title': task}
+        normalized.append({
+            'title': task['title'],
+            'description': task.get('description') or task['title'],
+            'completed': bool(task.get('completed', False)),
+        })
+    return normalized
+
+
+def _sqlite(device: str, sql: str, timeout: float = 30) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ['adb', '-s', device, 'shell', 'run-as', config.ANDROID_APP_PACKAGE,
+         'sqlite3', f'databases/{config.ANDROID_TASKS_DB}'],
+        input=sql,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def channel_available(driver) -> bool:
+    """True when the app database is reachable over adb (cached per device)."""
+    if not ENABLED or driver.capabilities.get('platformName', '').lower() != 'android':
+        return False
+    device = device_serial(driver)
+    if device not in _channel_ok:
+        try:
+            out = _sqlite(device, f'SELECT count(*) FROM {config.ANDROID_TASKS_TABLE};\n', timeout=10)
+            _channel_ok[device] = out.returncode == 0 and out.stdout.strip().isdigit()
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            _channel_ok[device] = False
+    return _channel_ok[device]
+
+
+def seed_via_adb(driver, tasks) -> bool:
+    """Insert all tasks in one transaction and relaunch the app.
+
+    Returns False if the channel is unavailable or the insert was rejected
+    (the single INSERT is atomic, so nothing is half-seeded in that case).
+    """
+    tasks = normalize_tasks(tasks)
+    if not tasks:
+        return True
+    if not channel_available(driver):
+        return False
+    rows = ',\n'.join(
+        f'({_quote(str(uuid.uuid4()))}, {_quote(t["title"])}, '
+        f'{_quote(t["description"])}, {int(t["completed"])})'
+        for t in tasks
+    )
+    sql = (
+        'BEGIN;\n'
+        f'INSERT INTO {config.ANDROID_TASKS_TABLE} (id, title, description, isCompleted) VALUES\n'
+        f'{rows};\n'
+        'COMMIT;\n'
+    )
+    device = device_serial(driver)
+    driver.terminate_app(config.ANDROID_APP_PACKAGE)
+    try:
+        out = _sqlite(device, sql)
+    except subprocess.TimeoutExpired:
+        out = None
+    finally:
+        driver.activate_app(config.ANDROID_APP_PACKAGE)
+    if out is None or out.returncode != 0 or out.stderr.strip():
+        _channel_ok[device] = False
+        return False
+    return True
@@ -0,0 +1,277 @@
+"""
+Appium session lifecycle for the Todo-app tests.
+
+Three isolation strategies are supported (selected with ``--isolation``):
+
+- ``new-session``: a brand-new Appium session per test; Appium clears and
+  relaunches the app on session start (``noReset=False``).
+- ``app-reset``: one Appium session is kept alive for the whole run and the
+  Todo app is reset in place between tests (clear app data + relaunch).
+  When the in-place reset fails, the session is replaced by a new one.
+- ``snapshot``: like ``app-reset``, but the clean state is restored from an
+  emulator snapshot saved after the first launch (emulator_snapshots.py);
+  falls back to the in-place reset where snapshots are unsupported.
+
+With ``--prewarm`` (new-session isolation), ``SessionPrewarmer`` starts the
+next test's session on a background thread while the current test runs.
+Appium allows one session per device, so sessions alternate between two
+devices: the next test's session warms up on the device the current test
+is not using.
+"""
+
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from appium import webdriver
+from appium.webdriver.applicationstate import ApplicationState
+from selenium.common.exceptions import WebDriverException
+
+import cassette
+import config
+import emulator_snapshots
+from emulator_snapshots import SnapshotError
+
+
+def remote_url_for(platform: str) -> str:
+    # Appium server URL for the given platform
+    return config.ANDROID_REMOTE_URL if platform.lower() == 'android' else config.IOS_REMOTE_URL
+
+
+def app_id_for(platform: str) -> str:
+    # Package name (Android) or bundle id (iOS) of the app under test
+    return config.ANDROID_APP_PACKAGE if platform.lower() == 'android' else config.IOS_BUNDLE_ID
+
+
+def device_serial(driver) -> str:
+    # adb serial (or iOS udid) of the device a session runs on
+    caps = driver.capabilities
+    return caps.get('udid') or caps.get('deviceUDID') or caps.get('deviceName') or ''
+
+
+def target_device(platform: str, device: str = '', lease=None) -> str:
+    # Device a new session will run on, as device_serial() will report it
+    if platform.lower() != 'android':
+        return config.IOS_DEVICE_NAME
+    if lease is not None:
+        return lease.device
+    if device.strip().lower() in ('', 'any', 'any_active'):
+        return config.get_android_device_name()
+    return device.strip()
+
+
+def new_driver(platform: str, device: str = '', lease=None, profile=None):
+    """Start a new Appium session for the Todo app.
+
+    lease: optional DeviceLease; its systemPort and Appium URL are used.
+    profile: capability profile (default: config.CAPABILITY_PROFILE).
+    Commands go through the shared keep-alive connection pool (or a cassette).
+    """
+    return webdriver.Remote(
+        cassette.connection(lease.remote_url if lease else remote_url_for(platform)),
+        options=config.todo_driver_options(
+            platform,
+            device_override=device or None,
+            system_port=lease.system_port if lease else None,
+            profile=profile,
+        ),
+    )
+
+
+def reset_app(driver, platform: str) -> None:
+    """Bring the app back to a clean state without restarting the session.
+
+    Clears the app data (which also stops the app) and relaunches it.
+    Raises WebDriverException when the app does not come back to the foreground.
+    """
+    app_id = app_id_for(platform)
+    arg_name = 'appId' if platform.lower() == 'android' else 'bundleId'
+    driver.execute_script('mobile: clearApp', {arg_name: app_id})
+    driver.activate_app(app_id)
+    _check_foreground(driver, platform, 'reset')
+
+
+def _check_foreground(driver, platform: str, after: str) -> None:
+    app_id = app_id_for(platform)
+    state = driver.query_app_state(app_id)
+    if state != ApplicationState.RUNNING_IN_FOREGROUND:
+        raise WebDriverException(f'{app_id} is not in foreground after {after} (state={state})')
+
+
+class SharedSession:
+    """One Appium session reused across tests, reset in place between them."""
+
+    def __init__(self, platform: str, device: str = '', lease=None):
+        self.platform = platform
+        self.device = device
+        self.lease = lease
+        self.driver = None
+        self.resets = 0
+        self.fallbacks = 0
+
+    def acquire(self):
+        """Return a driver with the app in a clean state.
+
+        The first call starts the session (Appium performs the initial reset).
+        Later calls reset the app in place and fall back to a new session
+        if that fails.
+        """
+        if self.driver is None:
+            self.driver = new_driver(self.platform, self.device, self.lease)
+            return self.driver
+        try:
+            reset_app(self.driver, self.platform)
+            self.resets += 1
+        except WebDriverException:
+            self.fallbacks += 1
+            self.close()
+            self.driver = new_driver(self.platform, self.device, self.lease)
+        return self.driver
+
+    def close(self) -> None:
+        if self.driver is None:
+            return
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+        self.driver = None
+
+
+class SnapshotSession(SharedSession):
+    """Shared session whose clean state is restored from an emulator snapshot.
+
+    The snapshot is (re)saved whenever a new session has just launched the
+    app; it also captures that session's UiAutomator2 server, so it is only
+    valid for that session.  Without snapshot support it behaves exactly like
+    SharedSession (in-place app reset).
+    """
+
+    def __init__(self, platform: str, device: str = '', lease=None):
+        super().__init__(platform, device, lease)
+        self.name = config.EMULATOR_SNAPSHOT_NAME
+        self.serial = None  # device of the saved snapshot, None: no valid snapshot
+        self.unsupported = None
+        self.restores = 0
+        self.restore_failures = 0
+
+    def acquire(self):
+        if self.driver is not None and self.serial is not None:
+            try:
+                emulator_snapshots.load(self.serial, self.name)
+                _check_foreground(self.driver, self.platform, 'snapshot restore')
+                self.restores += 1
+                return self.driver
+            except (SnapshotError, WebDriverException):
+                self.restore_failures += 1
+        previous = self.driver
+        driver = super().acquire()
+        if driver is not previous:
+            self._save(driver)
+        return driver
+
+    def _save(self, driver) -> None:
+        self.serial = None
+        if self.unsupported is not None:
+            return
+        serial = device_serial(driver) if self.platform.lower() == 'android' else ''
+        reason = emulator_snapshots.unsupported_reason(serial) if serial else 'snapshots need an Android emulator'
+        if reason is None:
+            try:
+                emulator_snapshots.save(serial, self.name)
+                self.serial = serial
+                return
+            except SnapshotError as e:
+                reason = str(e)
+        self.unsupported = reason
+        warnings.warn(f'Emulator snapshots unavailable, using in-place app reset instead: {reason}')
+
+    def close(self) -> None:
+        super().close()
+        if self.serial is not None:
+            emulator_snapshots.delete(self.serial, self.name)
+            self.serial = None
+
+
+class PrewarmStats:
+    """Session hand-overs of the prewarmer: creation time hidden behind test runs."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.ready = 0
+        self.created = 0.0
+        self.waited = 0.0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def merge(self, data: dict) -> None:
+        for name, value in data.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def __bool__(self):
+        return self.sessions > 0
+
+    def summary(self) -> str:
+        return (
+            f'prewarm: {self.sessions} sessions handed over ({self.ready} already ready), '
+            f'{self.created:.2f}s of session starts, {self.waited:.2f}s waited at hand-over '
+            f'({self.created - self.waited:.2f}s hidden)'
+        )
+
+
+STATS = PrewarmStats()
+
+
+class SessionPrewarmer:
+    """Hands out fresh sessions, creating the next one in the background.
+
+    targets: [(device, lease)] of two devices; sessions alternate between them.
+    The driver handed to a test must be quit before the next take() (the
+    device it ran on is used for the session after next).
+    """
+
+    def __init__(self, platform: str, targets):
+        self.platform = platform
+        self.targets = list(targets)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prewarm')
+        self.turn = 0
+        self.pending = None
+
+    def _create(self, device, lease):
+        start = time.perf_counter()
+        driver = new_driver(self.platform, device, lease)
+        return driver, time.perf_counter() - start
+
+    def _start_next(self) -> None:
+        device, lease = self.targets[self.turn % len(self.targets)]
+        self.turn += 1
+        self.pending = self.executor.submit(self._create, device, lease)
+
+    def take(self):
+        """Return a new session for this test and start warming up the next one."""
+        if self.pending is None:
+            self._start_next()
+        future, self.pending = self.pending, None
+        ready = future.done()
+        start = time.perf_counter()
+        try:
+            driver, created = future.result()
+        finally:
+            self._start_next()
+        STATS.sessions += 1
+        STATS.ready += ready
+        STATS.created += created
+        STATS.waited += time.perf_counter() - start
+        return driver
+
+    def close(self) -> None:
+        """Quit the warm session nobody took and stop the background thread."""
+        future, self.pending = self.pending, None
+        if future is not None and not future.cancel():
+            try:
+                driver, _ = future.result()
+                driver.quit()
+            except WebDriverException:
+                pass
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,417 @@
+"""
+Snapshot-based multi-assertion engine.
+
+``check_screen`` evaluates a batch of presence/absence checks for one screen
+state.  In ``snapshot`` mode the page source is fetched once, parsed locally
+into a tree indexed by text, content-desc, resource-id and class, and every
+check is evaluated against it; the source is re-fetched only when a check
+fails and the batch is retried.  That is one round trip per screen state
+instead of one (or more) per assertion.
+
+In ``remote`` mode (the default) the same checks run as regular Selene
+assertions, one remote find per check.
+
+Supported locators: accessibility id, the UiSelector forms used in
+locators.py (including ``fromParent`` / ``childSelector`` chains) and an XPath subset (steps with ``*``/tag names, ``[n]``,
+``[@a="v"]``, ``contains()``/``starts-with()`` and ``./`` / ``.//`` child
+predicates).  Anything else is checked with a remote find.
+"""
+
+import re
+import time
+import xml.etree.ElementTree as ET
+
+from appium.webdriver.common.appiumby import AppiumBy
+from selene import browser, be, have
+
+MODE = 'remote'
+
+
+class Unsupported(Exception):
+    """The locator cannot be resolved against a local snapshot."""
+
+
+class SnapshotStats:
+    def __init__(self):
+        self.checks = 0
+        self.fetches = 0
+        self.fallback_finds = 0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def merge(self, data: dict) -> None:
+        for name, value in data.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def __bool__(self):
+        return self.fetches > 0
+
+    def summary(self) -> str:
+        return (
+            f'snapshot: {self.checks} checks over {self.fetches} page-source fetches '
+            f'({self.fallback_finds} remote fallback finds)'
+        )
+
+
+STATS = SnapshotStats()
+
+
+# Node attribute access (Android UiAutomator2 / iOS XCUITest page source)
+
+def _text(node):
+    return node.get('text') if node.get('text') is not None else node.get('label', node.get('value'))
+
+
+def _desc(node):
+    return node.get('content-desc') if node.get('content-desc') is not None else node.get('name')
+
+
+def _class(node):
+    return node.get('class') or node.get('type') or node.tag
+
+
+def is_displayed(node) -> bool:
+    flag = node.get('displayed', node.get('visible'))
+    return flag is None or flag == 'true'
+
+
+class ScreenSnapshot:
+    """Parsed page source with lookups by text, content-desc, resource-id and class.
+
+    source: page source XML, or an already parsed root element.
+    """
+
+    def __init__(self, source):
+        self.root = ET.fromstring(source) if isinstance(source, str) else source
+        self.nodes = []
+        self.by_text = {}
+        self.by_desc = {}
+        self.by_resource_id = {}
+        self.by_class = {}
+        for node in self.root.iter():
+            self.nodes.append(node)
+            self.by_text.setdefault(_text(node), []).append(node)
+            self.by_desc.setdefault(_desc(node), []).append(node)
+            self.by_resource_id.setdefault(node.get('resource-id'), []).append(node)
+            self.by_class.setdefault(_class(node), []).append(node)
+        self._parents = None
+
+    @classmethod
+    def capture(cls, driver=None) -> 'ScreenSnapshot':
+        STATS.fetches += 1
+        return cls((driver or browser.driver).page_source)
+
+    def find_all(self, locator) -> list:
+        by, value = locator
+        if by == AppiumBy.ACCESSIBILITY_ID:
+            return list(self.by_desc.get(value, []))
+        if by == AppiumBy.ANDROID_UIAUTOMATOR:
+            return self._uiselector(value)
+        if by == AppiumBy.XPATH:
+            return XPathQuery(value).evaluate(self)
+        raise Unsupported(f'Locator strategy {by!r} is not supported by snapshots')
+
+    def parent(self, node):
+        if self._parents is None:
+            self._parents = {child: parent for parent in self.nodes for child in parent}
+        return self._parents.get(node)
+
+    def _uiselector(self, expression: str) -> list:
+        return self._select(parse_uiselector(expression))
+
+    def _select(self, calls, scope=None) -> list:
+        # scope: the nodes searched (document order), None for the whole screen
+        indexed = {
+            'text': self.by_text,
+            'description': self.by_desc,
+            'resourceId': self.by_resource_id,
+            'className': self.by_class,
+        }
+        exact = {'text': _text, 'description': _desc, 'className': _class,
+                 'resourceId': lambda n: n.get('resource-id')}
+        instance = None
+        candidates = None  # None: every node (not narrowed yet)
+        for name, arg in calls:
+            if name == 'instance':
+                instance = arg
+                continue
+            if name in indexed and candidates is None and scope is None:
+                candidates = list(indexed[name].get(arg, []))
+                continue
+            nodes = (self.nodes if scope is None else scope) if candidates is None else candidates
+            if name in ('fromParent', 'childSelector'):
+                # Search the subtree of each match's parent (fromParent) or of the match
+                found, seen = [], set()
+                for node in nodes:
+                    base = self.parent(node) if name == 'fromParent' else node
+                    if base is None:
+                        continue
+                    for match in self._select(arg, list(base.iter())[1:]):
+                        if id(match) not in seen:
+                            seen.add(id(match))
+                            found.append(match)
+                candidates = found
+            elif name in exact:
+                candidates = [n for n in nodes if exact[name](n) == arg]
+            elif name == 'textStartsWith':
+                candidates = [n for n in nodes if (_text(n) or '').startswith(arg)]
+            elif name == 'textContains':
+                candidates = [n for n in nodes if arg in (_text(n) or '')]
+            elif name == 'textMatches':
+                candidates = [n for n in nodes if re.fullmatch(arg, _text(n) or '')]
+            elif name == 'descriptionContains':
+                candidates = [n for n in nodes if arg in (_desc(n) or '')]
+            elif name == 'descriptionStartsWith':
+                candidates = [n for n in nodes if (_desc(n) or '').startswith(arg)]
+            elif name in BOOLEAN_PROPERTIES:
+                candidates = [n for n in nodes if n.get(name) == str(arg).lower()]
+            else:
+                raise Unsupported(f'UiSelector method {name!r} is not supported by snapshots')
+        if candidates is None:
+            candidates = list(self.nodes if scope is None else scope)
+        if instance is not None:
+            return candidates[instance:instance + 1]
+        return candidates
+
+
+_CALL = re.compile(r'\.(\w+)\(\s*("(?:[^"\\]|\\.)*"|true|false|-?\d+)?\s*\)')
+_NESTED = re.compile(r'\.(fromParent|childSelector)\(\s*new UiSelector\(\)')
+
+# UiSelector boolean properties, named like the page source attributes
+BOOLEAN_PROPERTIES = ('checkable', 'checked', 'clickable', 'enabled', 'focusable', 'focused', 'scrollable', 'selected')
+
+
+def parse_uiselector(expression: str) -> list:
+    """'new UiSelector().text("A").instance(1)' -> [('text', 'A'), ('instance', 1)].
+
+    fromParent / childSelector take the calls of the nested selector:
+    ('fromParent', [('className', 'X')]).
+    """
+    expression = expression.strip()
+    if not expression.startswith('new UiSelector()'):
+        raise Unsupported(f'Not a plain UiSelector: {expression!r}')
+    rest = expression[len('new UiSelector()'):].rstrip(';')
+    calls, pos = _parse_calls(expression, rest, 0)
+    if pos != len(rest):
+        raise Unsupported(f'Cannot parse UiSelector: {expression!r}')
+    return calls
+
+
+def _parse_calls(expression: str, rest: str, pos: int):
+    # -> (calls, position of the first character not parsed: end or ')')
+    calls = []
+    while pos < len(rest) and rest[pos] != ')':
+        nested = _NESTED.match(rest, pos)
+        if nested:
+            inner, pos = _parse_calls(expression, rest, nested.end())
+            if not rest.startswith(')', pos):
+                raise Unsupported(f'Cannot parse UiSelector: {expression!r}')
+            calls.append((nested.group(1), inner))
+            pos += 1
+            continue
+        m = _CALL.match(rest, pos)
+        if not m:
+            raise Unsupported(f'Cannot parse UiSelector: {expression!r}')
+        raw = m.group(2)
+        if raw is None:
+            arg = None
+        elif raw.startswith('"'):
+            arg = re.sub(r'\\(.)', r'\1', raw[1:-1])
+        elif raw in ('true', 'false'):
+            arg = raw == 'true'
+        else:
+            arg = int(raw)
+        calls.append((m.group(1), arg))
+        pos = m.end()
+    return calls, pos
+
+
+class XPathQuery:
+    """Evaluator for the XPath subset used by the locators.
+
+    Grammar::
+
+        path      := ('/' | '//') step (('/' | '//') step)*
+        step      := ('*' | name) ('[' predicate ']')*
+        predicate := integer | '@attr' '=' literal
+                   | ('contains' | 'starts-with') '(' '@attr' ',' literal ')'
+                   | ('./' | './/') step ...          (relative path exists)
+    """
+
+    _TOKEN = re.compile(r'\s*(//|/|\[|\]|\(|\)|,|=|\.//|\./|@[\w:-]+|"[^"]*"|\'[^\']*\'|\d+|[\w.:*-]+)')
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = self._tokenize(expression)
+        self.pos = 0
+        self.steps = self._path(absolute=True)
+        if self.pos != len(self.tokens):
+            raise Unsupported(f'Unsupported XPath: {expression!r}')
+
+    def _tokenize(self, expression):
+        tokens, pos = [], 0
+        expression = expression.strip()
+        while pos < len(expression):
+            m = self._TOKEN.match(expression, pos)
+            if not m:
+                raise Unsupported(f'Unsupported XPath: {expression!r}')
+            tokens.append(m.group(1))
+            pos = m.end()
+        return tokens
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _take(self, expected=None):
+        token = self._peek()
+        if token is None or (expected is not None and token != expected):
+            raise Unsupported(f'Unsupported XPath: {self.expression!r}')
+        self.pos += 1
+        return token
+
+    def _path(self, absolute: bool):
+        # -> [(axis, name, predicates)], axis is 'child' or 'descendant'
+        steps = []
+        first = True
+        while True:
+            token = self._peek()
+            if token in ('/', '//') or (not absolute and first and token in ('./', './/')):
+                self._take()
+                axis = 'descendant' if token in ('//', './/') else 'child'
+            elif first:
+                raise Unsupported(f'Unsupported XPath: {self.expression!r}')
+            else:
+                return steps
+            name = self._take()
+            predicates = []
+            while self._peek() == '[':
+                self._take('[')
+                predicates.append(self._predicate())
+                self._take(']')
+            steps.append((axis, name, predicates))
+            first = False
+
+    def _predicate(self):
+        token = self._peek()
+        if token is None:
+            raise Unsupported(f'Unsupported XPath: {self.expression!r}')
+        if token.isdigit():
+            return ('index', int(self._take()))
+        if token.startswith('@'):
+            attr = self._take()[1:]
+            self._take('=')
+            return ('eq', attr, self._literal())
+        if token in ('contains', 'starts-with'):
+            self._take()
+            self._take('(')
+            attr = self._take()
+            if not attr.startswith('@'):
+                raise Unsupported(f'Unsupported XPath: {self.expression!r}')
+            self._take(',')
+            literal = self._literal()
+            self._take(')')
+            return (token, attr[1:], literal)
+        if token in ('./', './/'):
+            return ('exists', self._path(absolute=False))
+        raise Unsupported(f'Unsupported XPath: {self.expression!r}')
+
+    def _literal(self):
+        token = self._take()
+        if token[0] not in '"\'':
+            raise Unsupported(f'Unsupported XPath: {self.expression!r}')
+        return token[1:-1]
+
+    # Evaluation
+
+    def evaluate(self, snapshot: ScreenSnapshot) -> list:
+        # The root element is the document element (<hierarchy> / <AppiumAUT>)
+        document = ET.Element('#document')
+        document.append(snapshot.root)
+        try:
+            return self._run(self.steps, [document])
+        finally:
+            document.remove(snapshot.root)
+
+    def _run(self, steps, context) -> list:
+        for axis, name, predicates in steps:
+            matched, seen = [], set()
+            for node in context:
+                # '//x' is '/descendant-or-self::node()/x': predicates apply per parent
+                parents = [node] if axis == 'child' else node.iter()
+                for parent in parents:
+                    candidates = [c for c in parent if name == '*' or c.tag == name]
+                    for predicate in predicates:
+                        candidates = self._filter(predicate, candidates)
+                    for candidate in candidates:
+                        if id(candidate) not in seen:
+                            seen.add(id(candidate))
+                            matched.append(candidate)
+            context = matched
+        return context
+
+    def _filter(self, predicate, candidates):
+        kind = predicate[0]
+        if kind == 'index':
+            index = predicate[1] - 1
+            return candidates[index:index + 1]
+        if kind == 'eq':
+            return [c for c in candidates if c.get(predicate[1]) == predicate[2]]
+        if kind == 'contains':
+            return [c for c in candidates if predicate[2] in (c.get(predicate[1]) or '')]
+        if kind == 'starts-with':
+            return [c for c in candidates if (c.get(predicate[1]) or '').startswith(predicate[2])]
+        if kind == 'exists':
+            return [c for c in candidates if self._run(predicate[1], [c])]
+        raise Unsupported(f'Unsupported XPath: {self.expression!r}')
+
+
+def _evaluate(snapshot, visible, absent):
+    """Return a list of failure descriptions for the batch."""
+    failures = []
+    for locator in visible:
+        try:
+            nodes = snapshot.find_all(locator)
+            ok = any(is_displayed(n) for n in nodes)
+        except Unsupported:
+            STATS.fallback_finds += 1
+            ok = any(e.is_displayed() for e in browser.driver.find_elements(*locator))
+        if not ok:
+            failures.append(f'expected visible: {locator}')
+    for locator in absent:
+        try:
+            count = len(snapshot.find_all(locator))
+        except Unsupported:
+            STATS.fallback_finds += 1
+            count = len(browser.driver.find_elements(*locator))
+        if count:
+            failures.append(f'expected absent, found {count}: {locator}')
+    return failures
+
+
+def check_screen(visible=(), absent=(), timeout: float = None) -> None:
+    """Assert that all `visible` locators are shown and all `absent` ones have no match.
+
+    Runs as individual Selene assertions in remote mode; in snapshot mode the
+    whole batch is evaluated against one page source, re-fetched on retry
+    until `timeout` (default: browser.config.timeout).
+    """
+    STATS.checks += len(visible) + len(absent)
+    if MODE != 'snapshot':
+        for locator in visible:
+            browser.element(locator).should(be.visible)
+        for locator in absent:
+            browser.all(locator).should(have.size(0))
+        return
+
+    timeout = browser.config.timeout if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    while True:
+        failures = _evaluate(ScreenSnapshot.capture(), visible, absent)
+        if not failures:
+            return
+        if time.monotonic() >= deadline:
+            raise AssertionError(
+                f'Screen checks failed after {timeout}s:\n  ' + '\n  '.join(failures)
+            )
+        time.sleep(0.2)
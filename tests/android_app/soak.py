@@ -0,0 +1,121 @@
+"""
+Result store for the soak test (test_todo_app_soak.py).
+
+A soak run is a long, seeded random sequence of app operations.  Each run
+keeps the duration of every operation in order (``op -> [seconds]``), so
+slowdowns that only build up over thousands of operations show as drift:
+the series is cut into ``config.SOAK_WINDOWS`` equal windows and the
+median of the last window is compared with the median of the first.  A
+drift of 1.0 is flat, 2.0 means the operation got twice as slow over the
+run; above ``--soak-max-drift`` the run fails.  The summary prints the
+window medians per operation and the seed to replay the run with
+(``--soak-seed``).
+"""
+
+import json
+import time
+from pathlib import Path
+
+import config
+from perf_stats import percentile
+
+# Fewer samples per window than this: too noisy to report drift
+MIN_WINDOW_SAMPLES = 3
+
+
+def window_medians(values, windows: int) -> list:
+    """Medians of `values` cut into `windows` consecutive windows of equal size."""
+    size = len(values) / windows
+    return [
+        percentile(values[round(i * size):round((i + 1) * size)], 50)
+        for i in range(windows)
+    ]
+
+
+def drift(values, windows: int):
+    """Median of the last window / median of the first, or None with too few samples."""
+    if windows < 2 or len(values) < windows * MIN_WINDOW_SAMPLES:
+        return None
+    medians = window_medians(values, windows)
+    return medians[-1] / medians[0] if medians[0] > 0 else None
+
+
+class SoakResults:
+
+    def __init__(self):
+        self.runs = []  # one dict per soak test
+
+    def start(self, test: str, seed: int) -> dict:
+        run = {
+            'test': test, 'seed': seed, 'operations': 0, 'checks': 0, 'elapsed': 0.0,
+            'failed_at': None, 'series': {},
+        }
+        self.runs.append(run)
+        return run
+
+    @staticmethod
+    def add(run: dict, op: str, seconds: float) -> None:
+        run['series'].setdefault(op, []).append(seconds)
+        run['operations'] += 1
+
+    @staticmethod
+    def drifts(run: dict) -> dict:
+        """op -> drift (None: too few samples)."""
+        return {op: drift(values, config.SOAK_WINDOWS) for op, values in run['series'].items()}
+
+    # RUN_STATS protocol
+
+    def as_dict(self) -> dict:
+        return {'runs': self.runs}
+
+    def merge(self, data: dict) -> None:
+        self.runs.extend(data['runs'])
+
+    def __bool__(self):
+        return bool(self.runs)
+
+    def summary(self) -> str:
+        lines = []
+        for run in self.runs:
+            failed = f', failed at operation {run["failed_at"]}' if run['failed_at'] is not None else ''
+            lines.append(
+                f'{run["test"]} (--soak-seed {run["seed"]}): {run["operations"]} operations in '
+                f'{run["elapsed"]:.1f}s, {run["checks"]} invariant checks{failed}'
+            )
+            lines.append(f'  {"operation":<16} {"count":>6} {"p50 ms":>8} {"max ms":>8} {"drift":>7}  '
+                         f'window medians ms ({config.SOAK_WINDOWS} windows)')
+            drifts = self.drifts(run)
+            for op, values in sorted(run['series'].items()):
+                shown = f'x{drifts[op]:.2f}' if drifts[op] is not None else '-'
+                windows = ' '.join(
+                    f'{median * 1000:.0f}' for median in window_medians(values, config.SOAK_WINDOWS)
+                ) if len(values) >= config.SOAK_WINDOWS else ''
+                lines.append(f'  {op:<16} {len(values):>6} {percentile(values, 50) * 1000:>8.1f} '
+                             f'{max(values) * 1000:>8.1f} {shown:>7}  {windows}')
+        return '\n'.join(lines)
+
+    def write_json(self, path, **metadata) -> None:
+        Path(path).write_text(json.dumps({
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            **metadata,
+            'windows': config.SOAK_WINDOWS,
+            'runs': [
+                {
+                    **{key: value for key, value in run.items() if key != 'series'},
+                    'operations_by_type': {
+                        op: {
+                            'count': len(values),
+                            'window_medians': window_medians(values, config.SOAK_WINDOWS)
+                            if len(values) >= config.SOAK_WINDOWS else [],
+                            'drift': drift(values, config.SOAK_WINDOWS),
+                        }
+                        for op, values in run['series'].items()
+                    },
+                    'series': run['series'],
+                }
+                for run in self.runs
+            ],
+        }, indent=2))
+
+
+SOAK = SoakResults()
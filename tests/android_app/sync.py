@@ -0,0 +1,92 @@
+"""
+State-driven synchronization for the UI helpers.
+
+Instead of sleeping for a fixed time after an action, helpers wait for the
+real signal (e.g. a checkbox reporting ``checked``) by polling it at a short
+interval, bounded by an explicit timeout.  Every wait records how long it
+actually took and how long the fixed delay it replaces would have taken, so
+the run summary can report the wall time saved.
+"""
+
+import time
+
+from selene.core.exceptions import TimeoutException
+from selenium.common.exceptions import WebDriverException
+
+import config
+
+
+class SyncStats:
+    """Totals of all waits done by the sync layer in this process."""
+
+    def __init__(self):
+        self.waits = 0
+        self.spent = 0.0
+        self.replaced = 0.0
+
+    @property
+    def saved(self) -> float:
+        return self.replaced - self.spent
+
+    def add(self, spent: float, replaced: float) -> None:
+        self.waits += 1
+        self.spent += spent
+        self.replaced += replaced
+
+    def merge(self, data: dict) -> None:
+        self.waits += data['waits']
+        self.spent += data['spent']
+        self.replaced += data['replaced']
+
+    def as_dict(self) -> dict:
+        return {'waits': self.waits, 'spent': self.spent, 'replaced': self.replaced}
+
+    def __bool__(self):
+        return self.waits > 0
+
+    def summary(self) -> str:
+        return (
+            f'sync: {self.waits} waits, {self.spent:.2f}s waiting, '
+            f'{self.saved:.2f}s saved vs {self.replaced:.2f}s of fixed sleeps'
+        )
+
+
+STATS = SyncStats()
+
+
+def wait_until(predicate, description: str, replaces: float = 0.0,
+               timeout: float = None, interval: float = None):
+    """Poll `predicate` until it returns a truthy value and return that value.
+
+    replaces: duration of the fixed sleep this wait stands in for (for stats).
+    Driver errors while polling (e.g. stale element) count as "not yet".
+    Raises selene's TimeoutException after `timeout` seconds.
+    """
+    timeout = config.SYNC_TIMEOUT if timeout is None else timeout
+    interval = config.SYNC_POLL_INTERVAL if interval is None else interval
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        try:
+            result = predicate()
+        except WebDriverException:
+            result = None
+        if result:
+            STATS.add(time.monotonic() - start, replaces)
+            return result
+        if time.monotonic() >= deadline:
+            STATS.add(time.monotonic() - start, replaces)
+            raise TimeoutException(f'Timed out after {timeout}s waiting for {description}')
+        time.sleep(interval)
+
+
+def is_checked(element) -> bool:
+    """True when a checkbox element reports the checked state.
+
+    Android exposes ``checked="true"``; XCUITest buttons/switches use ``value="1"``.
+    """
+    web_element = element.locate()
+    checked = web_element.get_attribute('checked')
+    if checked is not None:
+        return checked == 'true'
+    return web_element.get_attribute('value') in ('1', 'true')
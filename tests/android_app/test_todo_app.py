@@ -7,58 +7,97 @@ Run:
 """
 
 import re
-import time
 
 import pytest
 from selene import browser, be, have
 
+import scrolling
+import seeding
+import sync
+import text_entry
+from instrumentation import timed_helper
+from snapshot import check_screen
 
 
 # App-level helpers
+@timed_helper
 def create_task(locators, title: str, description: str = '') -> None:
-    """Open New Task screen, fill both fields, dismiss keyboard, and save.
+    """Open New Task screen, fill both fields, dismiss the keyboard if open, and save.
 
     Both fields are always filled; when no description is supplied it defaults
     to the title text, preventing the 'Tasks cannot be empty' validation error.
     """
     browser.element(locators.NEW_TASK_BUTTON).click()
-    browser.element(locators.TASK_TITLE_INPUT).type(title)
-    browser.element(locators.TASK_DESC_INPUT).type(description if description else title)
-    try:
-        browser.driver.hide_keyboard()
-    except Exception:
-        pass
+    text_entry.fill(locators.TASK_TITLE_INPUT, title)
+    text_entry.fill(locators.TASK_DESC_INPUT, description if description else title)
+    text_entry.hide_keyboard()
     browser.element(locators.SAVE_TASK_BUTTON).click()
 
 
-def mark_task_complete(locators, title: str) -> None:
+@timed_helper
+def mark_task_complete(locators, title: str, scroll: bool = None) -> None:
     """Tick the checkbox next to the given task title.
 
-    A short pause after tapping lets the Compose UI commit the completion
-    state before any subsequent action (e.g. 'Clear completed') reads it.
+    Waits until the checkbox reports the checked state, so the Compose UI has
+    committed the completion before any subsequent action (e.g. 'Clear
+    completed') reads it.  Replaces the former fixed 1 s pause.
+
+    scroll: scroll the row on screen first (long lists); defaults to --lookup scroll.
     """
-    browser.element(locators.task_checkbox_by_title(title)).click()
-    time.sleep(1)
+    if scroll is None:
+        scroll = scrolling.MODE == 'scroll'
+    if scroll:
+        scrolling.scroll_to_task(locators, title)
+    checkbox = browser.element(locators.task_checkbox_by_title(title))
+    checkbox.click()
+    sync.wait_until(
+        lambda: sync.is_checked(checkbox),
+        description=f'task {title!r} to be checked',
+        replaces=1.0,
+    )
+
 
+@timed_helper
+def seed_tasks(locators, tasks) -> None:
+    """Create many tasks at once as test preconditions.
 
+    tasks: titles or dicts with 'title', optional 'description' and 'completed'.
+    Uses a single batched database insert over adb when available and falls
+    back to create_task / mark_task_complete through the UI otherwise.
+    """
+    tasks = seeding.normalize_tasks(tasks)
+    if seeding.seed_via_adb(browser.driver, tasks):
+        return
+    for task in tasks:
+        create_task(locators, title=task['title'], description=task['description'])
+    for task in tasks:
+        if task['completed']:
+            mark_task_complete(locators, title=task['title'], scroll=True)
+    scrolling.scroll_to_top()
+
+
+@timed_helper
 def select_filter(locators, filter_locator) -> None:
     """Open the filter (pyramid) menu and pick an option."""
     browser.element(locators.FILTER_BUTTON).click()
     browser.element(filter_locator).click()
 
 
+@timed_helper
 def open_overflow(locators, option_locator) -> None:
     """Open the overflow (three-dots) menu and select a menu item."""
     browser.element(locators.MORE_BUTTON).click()
     browser.element(option_locator).click()
 
 
+@timed_helper
 def go_to_statistics(locators) -> None:
     """Open the navigation drawer and navigate to Statistics."""
     browser.element(locators.OPEN_DRAWER).click()
     browser.element(locators.NAV_STATISTICS).click()
 
 
+@timed_helper
 def go_to_task_list(locators) -> None:
     """Open the navigation drawer and navigate back to Task List."""
     browser.element(locators.OPEN_DRAWER).click()
@@ -79,8 +118,10 @@ def test_tc1_create_task_happy_path(locators):
 
     create_task(locators, title='Buy groceries', description='Milk, eggs, bread')
 
-    browser.element(locators.task_by_title('Buy groceries')).should(be.visible)
-    browser.all(locators.EMPTY_STATE_TEXT).should(have.size(0))
+    check_screen(
+        visible=[locators.task_by_title('Buy groceries')],
+        absent=[locators.EMPTY_STATE_TEXT],
+    )
 
 
 
@@ -130,16 +171,22 @@ def test_tc4_filter_all_active_completed(locators):
     mark_task_complete(locators, title='Done task')
 
     select_filter(locators, locators.FILTER_ALL)
-    browser.element(locators.task_by_title('Active task')).should(be.visible)
-    browser.element(locators.task_by_title('Done task')).should(be.visible)
+    check_screen(visible=[
+        locators.task_by_title('Active task'),
+        locators.task_by_title('Done task'),
+    ])
 
     select_filter(locators, locators.FILTER_ACTIVE)
-    browser.element(locators.task_by_title('Active task')).should(be.visible)
-    browser.all(locators.task_by_title('Done task')).should(have.size(0))
+    check_screen(
+        visible=[locators.task_by_title('Active task')],
+        absent=[locators.task_by_title('Done task')],
+    )
 
     select_filter(locators, locators.FILTER_COMPLETED_OPTION)
-    browser.element(locators.task_by_title('Done task')).should(be.visible)
-    browser.all(locators.task_by_title('Active task')).should(have.size(0))
+    check_screen(
+        visible=[locators.task_by_title('Done task')],
+        absent=[locators.task_by_title('Active task')],
+    )
 
 
 @pytest.mark.name('Clear completed tasks')
@@ -156,8 +203,10 @@ def test_tc5_clear_completed_tasks(locators):
 
     open_overflow(locators, locators.MENU_CLEAR_COMPLETED)
 
-    browser.all(locators.task_by_title('Remove me')).should(have.size(0))
-    browser.element(locators.task_by_title('Keep me')).should(be.visible)
+    check_screen(
+        visible=[locators.task_by_title('Keep me')],
+        absent=[locators.task_by_title('Remove me')],
+    )
 
 
 @pytest.mark.name('Refresh keeps current state')
@@ -173,8 +222,10 @@ def test_tc6_refresh_keeps_state(locators):
 
     open_overflow(locators, locators.MENU_REFRESH)
 
-    browser.element(locators.task_by_title('Still active')).should(be.visible)
-    browser.element(locators.task_by_title('Already done')).should(be.visible)
+    check_screen(visible=[
+        locators.task_by_title('Still active'),
+        locators.task_by_title('Already done'),
+    ])
 
     select_filter(locators, locators.FILTER_COMPLETED_OPTION)
     browser.element(locators.task_by_title('Already done')).should(be.visible)
@@ -192,8 +243,7 @@ def test_tc7_navigate_to_statistics_and_back(locators):
     create_task(locators, title='Navigation test task')
 
     go_to_statistics(locators)
-    browser.element(locators.STATS_ACTIVE).should(be.visible)
-    browser.element(locators.STATS_COMPLETED).should(be.visible)
+    check_screen(visible=[locators.STATS_ACTIVE, locators.STATS_COMPLETED])
 
     go_to_task_list(locators)
     browser.element(locators.task_by_title('Navigation test task')).should(be.visible)
@@ -254,6 +304,23 @@ def test_tc9_cannot_save_empty_task(locators):
 
 
 
+@pytest.mark.name('Complete a task far down a long list')
+@pytest.mark.test_case_id('id11')
+def test_tc11_complete_task_in_long_list(locators):
+    """
+    Given more tasks than fit on one screen, the last task can be found by
+    scrolling and marked as completed; it is then shown under Completed.
+    """
+    titles = [f'Long list task {i:02d}' for i in range(30)]
+    seed_tasks(locators, titles)
+
+    mark_task_complete(locators, title=titles[-1], scroll=True)
+
+    select_filter(locators, locators.FILTER_COMPLETED_OPTION)
+    browser.element(locators.task_by_title(titles[-1])).should(be.visible)
+
+
+
 @pytest.mark.name('Regression: known white-screen bug')
 @pytest.mark.test_case_id('id10')
 @pytest.mark.xfail(
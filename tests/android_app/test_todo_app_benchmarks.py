@@ -0,0 +1,92 @@
+"""
+Scalability benchmarks for the Todo app: how the app and the harness behave
+as the task list grows (10 / 100 / 1000 tasks by default).
+
+Skipped unless --run-benchmarks is given.  Results are written to
+benchmark_results.json (--benchmark-json) and can be compared with a
+previous run (--benchmark-compare).
+
+Run:
+    pytest tests/android_app/test_todo_app_benchmarks.py --platform android --run-benchmarks
+    pytest tests/android_app/test_todo_app_benchmarks.py --run-benchmarks --benchmark-sizes 10,100 \\
+        --benchmark-compare previous_benchmark_results.json
+"""
+
+import time
+
+import pytest
+from selene import browser, be, have
+
+from bench_results import BENCH
+from test_todo_app import (
+    create_task,
+    go_to_statistics,
+    go_to_task_list,
+    open_overflow,
+    seed_tasks,
+    select_filter,
+)
+
+# Tasks created through the UI on top of the seeded list (creation throughput)
+CREATED_PER_SIZE = 5
+
+
+def _title(i: int) -> str:
+    return f'Bench task {i:04d}'
+
+
+def _timed(metric: str, size: int, action) -> None:
+    start = time.perf_counter()
+    action()
+    BENCH.add(metric, size, time.perf_counter() - start)
+
+
+@pytest.mark.benchmark
+@pytest.mark.name('Benchmark: task list operations scale with list size')
+@pytest.mark.test_case_id('bench1')
+def test_bench_task_list_scalability(locators, list_size, benchmark_rounds):
+    """
+    Given a list of `list_size` tasks (odd ones completed), measure the time
+    per created task, filter switches, Refresh, Statistics rendering and
+    Clear completed.  Every timing includes waiting for the resulting screen.
+    """
+    seed_tasks(locators, [
+        {'title': _title(i), 'completed': i % 2 == 1} for i in range(list_size)
+    ])
+    first_active = locators.task_by_title(_title(0))
+    first_completed = locators.task_by_title(_title(1)) if list_size > 1 else first_active
+    browser.element(first_active).should(be.visible)
+
+    start = time.perf_counter()
+    for i in range(CREATED_PER_SIZE):
+        create_task(locators, title=f'Bench new {i}')
+    browser.element(locators.NEW_TASK_BUTTON).should(be.visible)
+    BENCH.add('create task', list_size, (time.perf_counter() - start) / CREATED_PER_SIZE)
+
+    for _ in range(benchmark_rounds):
+        for name, option, expected in (
+            ('filter All', locators.FILTER_ALL, first_active),
+            ('filter Active', locators.FILTER_ACTIVE, first_active),
+            ('filter Completed', locators.FILTER_COMPLETED_OPTION, first_completed),
+        ):
+            _timed(name, list_size, lambda: (
+                select_filter(locators, option),
+                browser.element(expected).should(be.visible),
+            ))
+        select_filter(locators, locators.FILTER_ALL)
+
+        _timed('refresh', list_size, lambda: (
+            open_overflow(locators, locators.MENU_REFRESH),
+            browser.element(first_active).should(be.visible),
+        ))
+
+        _timed('statistics', list_size, lambda: (
+            go_to_statistics(locators),
+            browser.element(locators.STATS_ACTIVE).should(be.visible),
+        ))
+        go_to_task_list(locators)
+
+    _timed('clear completed', list_size, lambda: (
+        open_overflow(locators, locators.MENU_CLEAR_COMPLETED),
+        browser.all(first_completed).should(have.size(0)),
+    ))
@@ -0,0 +1,175 @@
+"""
+Soak test for the Todo app: a long, seeded random mix of the task list
+workflows, to surface leaks and slowdowns that only show after thousands of
+operations.
+
+Operations (weights in OPERATIONS): create a task, complete one, Clear
+completed, Refresh, and Statistics and back.  The test keeps a model of
+the expected tasks, and after every operation the screen is checked
+against it.  Statistics must report the model's percentages, as in TC8.
+The list is kept at SOAK_MAX_TASKS tasks or fewer (rows on screen), so
+later operations are not slower only because the list grew.
+
+Skipped unless --soak is given.  The run ends after --soak-iterations
+operations or --soak-duration seconds, whichever comes first.  The same
+--soak-seed replays the same sequence.  Each operation's latency drift over
+the run is printed in the summary and written to soak_results.json
+(--soak-json).  With --soak-max-drift the test fails when an operation got
+slower than that factor.
+
+Run:
+    pytest tests/android_app/test_todo_app_soak.py --platform android --soak --soak-duration 3600
+    pytest tests/android_app/test_todo_app_soak.py --soak --soak-iterations 2000 --soak-seed 1234 \\
+        --soak-max-drift 1.5
+"""
+
+import random
+import re
+import time
+
+import pytest
+from selene import browser, be
+
+import config
+from soak import SOAK
+from snapshot import check_screen
+from test_todo_app import (
+    create_task,
+    go_to_statistics,
+    go_to_task_list,
+    mark_task_complete,
+    open_overflow,
+)
+
+# Operation -> relative weight in the random mix
+OPERATIONS = {
+    'create': 4,
+    'complete': 3,
+    'clear completed': 1,
+    'refresh': 1,
+    'statistics': 1,
+}
+
+
+def _percent(locator) -> float:
+    element = browser.element(locator)
+    element.should(be.visible)
+    text = element.locate().text
+    match = re.search(r'(\d+\.?\d*)%', text)
+    assert match, f'Could not parse percentage from: {text!r}'
+    return float(match.group(1))
+
+
+class TaskListModel:
+    """The tasks the app should show: title -> completed, in creation order."""
+
+    def __init__(self):
+        self.tasks = {}
+        self.created = 0
+
+    def active(self) -> list:
+        return [title for title, completed in self.tasks.items() if not completed]
+
+    def completed(self) -> list:
+        return [title for title, completed in self.tasks.items() if completed]
+
+    def allowed(self) -> list:
+        # Operations possible in the current state
+        allowed = ['refresh', 'statistics']
+        if len(self.tasks) < config.SOAK_MAX_TASKS:
+            allowed.append('create')
+        if self.active():
+            allowed.append('complete')
+        if self.completed():
+            allowed.append('clear completed')
+        return allowed
+
+
+def _run(op: str, locators, model: TaskListModel, rng: random.Random) -> int:
+    """Run `op` and check the screen against the model; return the checks made."""
+    if op == 'create':
+        model.created += 1
+        title = f'Soak task {model.created:05d}'
+        create_task(locators, title=title)
+        model.tasks[title] = False
+        browser.element(locators.task_by_title(title)).should(be.visible)
+        return 1
+    if op == 'complete':
+        title = rng.choice(model.active())
+        mark_task_complete(locators, title=title)  # waits for the checked state
+        model.tasks[title] = True
+        return 1
+    if op == 'clear completed':
+        removed = model.completed()
+        open_overflow(locators, locators.MENU_CLEAR_COMPLETED)
+        for title in removed:
+            del model.tasks[title]
+        check_screen(
+            visible=[locators.task_by_title(title) for title in model.tasks],
+            absent=[locators.task_by_title(title) for title in removed],
+        )
+        return 1
+    if op == 'refresh':
+        open_overflow(locators, locators.MENU_REFRESH)
+        if model.tasks:
+            check_screen(visible=[locators.task_by_title(title) for title in model.tasks])
+        else:
+            browser.element(locators.EMPTY_STATE_TEXT).should(be.visible)
+        return 1
+    # statistics
+    go_to_statistics(locators)
+    checks = 0
+    if model.tasks:
+        expected = 100.0 * len(model.completed()) / len(model.tasks)
+        active_pct, completed_pct = _percent(locators.STATS_ACTIVE), _percent(locators.STATS_COMPLETED)
+        assert abs(completed_pct - expected) < 1.0, f'Expected {expected:.1f} % completed tasks, got {completed_pct} %'
+        assert abs(active_pct - (100.0 - expected)) < 1.0, (
+            f'Expected {100.0 - expected:.1f} % active tasks, got {active_pct} %'
+        )
+        checks = 2
+    go_to_task_list(locators)
+    return checks
+
+
+@pytest.mark.soak
+@pytest.mark.name('Soak: seeded random task list workflows')
+@pytest.mark.test_case_id('soak1')
+def test_soak_task_list_workflows(locators, soak_plan):
+    """
+    Run a seeded random sequence of create / complete / clear completed /
+    refresh / statistics operations for the configured iterations or
+    duration.  Every operation is checked against the model of the expected
+    tasks, and no operation may drift past --soak-max-drift.
+    """
+    rng = random.Random(soak_plan['seed'])
+    model = TaskListModel()
+    run = SOAK.start(soak_plan['test'], soak_plan['seed'])
+    start = time.perf_counter()
+    deadline = start + soak_plan['duration'] if soak_plan['duration'] else None
+    iteration = 0
+    try:
+        while not soak_plan['iterations'] or iteration < soak_plan['iterations']:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            allowed = model.allowed()
+            op = rng.choices(allowed, weights=[OPERATIONS[name] for name in allowed])[0]
+            op_start = time.perf_counter()
+            try:
+                run['checks'] += _run(op, locators, model, rng)
+            except BaseException:
+                run['failed_at'] = f'{iteration + 1} ({op})'
+                raise
+            SOAK.add(run, op, time.perf_counter() - op_start)
+            iteration += 1
+    finally:
+        run['elapsed'] = time.perf_counter() - start
+
+    if soak_plan['max_drift']:
+        drifted = {
+            op: value for op, value in SOAK.drifts(run).items()
+            if value is not None and value > soak_plan['max_drift']
+        }
+        assert not drifted, (
+            f'Operations slowed down over the run (last / first window median, seed {soak_plan["seed"]}): '
+            + ', '.join(f'{op} x{value:.2f}' for op, value in sorted(drifted.items()))
+        )
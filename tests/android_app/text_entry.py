@@ -0,0 +1,155 @@
+"""
+Text entry: set a field's text in one command instead of typing it.
+
+Selene's ``type()`` sends the text with ``send_keys``; through the soft
+keyboard UiAutomator2 / XCUITest may deliver it key by key, so entry time
+grows with the text length.  It also opens the keyboard, which ``create_task``
+then has to dismiss.  ``fill(locator, text)`` tries the strategies of the
+platform in order and uses the first one that works:
+
+- ``replace`` (Android): ``mobile: replaceElementValue`` sets the text of the
+  EditText directly, bypassing the IME; the keyboard is not opened.
+- ``paste`` (Android): put the text on the clipboard, focus the field and
+  press KEYCODE_PASTE; one key event whatever the length.
+- ``type``: ``send_keys``, as Selene does (the only strategy on iOS: XCUITest
+  has no IME bypass).
+
+After each attempt the field's text is read back; on a mismatch the next
+strategy is tried (``paste`` and ``type`` clear the field first), and
+``TextEntryError`` is raised when none produces the text.  A strategy the
+server rejects is not tried again for the session.  ``fill`` runs inside
+Selene's wait, so a field that is not on screen yet is waited for as usual.
+
+``hide_keyboard()`` only sends the dismissal when a strategy that opens the
+keyboard was used since the last one.  ``MODE`` ('fast' by default, 'type'
+with --text-entry type) keeps Selene's ``type()`` for comparison.
+"""
+
+from selene import browser
+from selene.core.wait import Command
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, WebDriverException
+
+MODE = 'fast'
+
+STRATEGIES = {
+    'android': ('replace', 'paste', 'type'),
+    'ios': ('type',),
+}
+
+KEYCODE_PASTE = 279
+
+
+class TextEntryError(AssertionError):
+    """No strategy produced the expected text in the field."""
+
+
+class TextEntryStats:
+    def __init__(self):
+        self.fields = 0
+        self.chars = 0
+        self.strategies = {}  # strategy -> fields entered with it
+        self.fallbacks = 0
+        self.keyboard_hidden = 0
+        self.keyboard_skipped = 0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def merge(self, data: dict) -> None:
+        for name, value in data['strategies'].items():
+            self.strategies[name] = self.strategies.get(name, 0) + value
+        for name in ('fields', 'chars', 'fallbacks', 'keyboard_hidden', 'keyboard_skipped'):
+            setattr(self, name, getattr(self, name) + data[name])
+
+    def __bool__(self):
+        return self.fields > 0
+
+    def summary(self) -> str:
+        used = ', '.join(f'{count} {name}' for name, count in sorted(self.strategies.items())) or 'none'
+        return (
+            f'text entry ({MODE}): {self.fields} fields, {self.chars} chars ({used}), '
+            f'{self.fallbacks} fallbacks; keyboard dismissed {self.keyboard_hidden} times, '
+            f'{self.keyboard_skipped} dismissals skipped'
+        )
+
+
+STATS = TextEntryStats()
+
+_rejected = {}  # session id -> strategies the server does not support
+_keyboard = {}  # session id -> a strategy that opens the keyboard was used
+
+
+def fill(locator, text: str) -> None:
+    """Set the text of the field at `locator` to `text`."""
+    element = browser.element(locator)
+    if MODE == 'type':
+        element.type(text)
+        _keyboard[browser.driver.session_id] = True
+        STATS.fields += 1
+        STATS.chars += len(text)
+        STATS.strategies['type'] = STATS.strategies.get('type', 0) + 1
+        return
+    element.wait.for_(Command('fill', lambda entity: _enter(entity.locate(), text)))
+
+
+def hide_keyboard() -> None:
+    """Dismiss the soft keyboard if a text entry may have opened it."""
+    driver = browser.driver
+    if not _keyboard.pop(driver.session_id, False):
+        STATS.keyboard_skipped += 1
+        return
+    STATS.keyboard_hidden += 1
+    try:
+        driver.hide_keyboard()
+    except WebDriverException:  # already hidden (XCUITest reports an error)
+        pass
+
+
+def _enter(web_element, text: str) -> None:
+    driver = web_element.parent
+    session = driver.session_id
+    platform = str(driver.capabilities.get('platformName', '')).lower()
+    rejected = _rejected.setdefault(session, set())
+    strategies = [name for name in STRATEGIES.get(platform, ('type',)) if name not in rejected]
+    attempted = False
+    for name in strategies:
+        try:
+            _STRATEGIES[name](driver, web_element, text, attempted)
+        except (NoSuchElementException, StaleElementReferenceException):
+            raise  # the field is gone: let the wait find it again
+        except WebDriverException:
+            if name != 'type':
+                rejected.add(name)
+            continue
+        finally:
+            attempted = True
+        if name != 'replace':
+            _keyboard[session] = True
+        if web_element.text == text:
+            STATS.fields += 1
+            STATS.chars += len(text)
+            STATS.strategies[name] = STATS.strategies.get(name, 0) + 1
+            return
+        STATS.fallbacks += 1
+    raise TextEntryError(f'Field text is not {text!r} after trying {", ".join(strategies)}')
+
+
+def _replace(driver, web_element, text: str, clear: bool) -> None:
+    driver.execute_script('mobile: replaceElementValue', {'elementId': web_element.id, 'text': text})
+
+
+def _paste(driver, web_element, text: str, clear: bool) -> None:
+    driver.set_clipboard_text(text)
+    web_element.click()
+    if clear:
+        web_element.clear()
+    driver.press_keycode(KEYCODE_PASTE)
+
+
+def _type(driver, web_element, text: str, clear: bool) -> None:
+    if clear:
+        web_element.clear()
+    web_element.send_keys(text)
+
+
+_STRATEGIES = {'replace': _replace, 'paste': _paste, 'type': _type}
@@ -0,0 +1,138 @@
+"""
+Pooled keep-alive HTTP transport for Appium commands.
+
+By default every ``webdriver.Remote`` builds its own urllib3 pool, so each
+new session (one per test) opens fresh TCP connections to the Appium server
+and closes them on quit.  ``PooledAppiumConnection`` shares one pool per
+process across all sessions, with tunable connect/read timeouts.
+
+Connect failures are retried: the request never reached Appium.  Commands
+are not idempotent (new session, click, ``mobile:`` scripts, delete
+session), and re-sending them could create a second session or toggle a
+checkbox twice.  A connection that fails after sending can no longer tell
+whether the server ran the command.  urllib3 even swallows a reset or
+broken pipe while sending and reports it on the read.  So read errors are
+retried only for GETs, and only when the server closed a pooled keep-alive
+connection without any response.  A read timeout is never retried.
+urllib3 already drops pooled connections the server closed while idle
+before reusing them.
+
+Sessions behind an HTTP/SOCKS proxy keep Selenium's own connection
+manager, which handles the proxy; the shared pool verifies HTTPS servers
+against the same CA bundle as Selenium.
+
+Settings come from config.py (env): ``appium_connectTimeout``,
+``appium_readTimeout``, ``appium_retries``, ``appium_poolSize``,
+``appium_numPools``.
+"""
+
+import http.client
+import threading
+
+import urllib3
+from appium.webdriver.appium_connection import AppiumConnection
+
+import config
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Causes of a ProtocolError of a keep-alive connection the server had closed
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class StaleConnectionRetry(urllib3.Retry):
+    """Retry: read errors (GET only, allowed_methods) only for connections closed before answering."""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if error is not None and self._is_read_error(error) and not _stale_connection(error):
+            raise error.with_traceback(_stacktrace)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def _stale_connection(error) -> bool:
+    # urllib3 wraps the socket error: ProtocolError('Connection aborted.', RemoteDisconnected(...))
+    return isinstance(error, urllib3.exceptions.ProtocolError) and any(
+        isinstance(arg, _STALE_CONNECTION_ERRORS) for arg in error.args
+    )
+
+
+def shared_pool() -> urllib3.PoolManager:
+    """The process-wide connection pool (created on first use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            retries = StaleConnectionRetry(
+                total=config.APPIUM_RETRIES,
+                connect=config.APPIUM_RETRIES,
+                # A POST/DELETE that failed after sending may have run on the server
+                read=config.APPIUM_RETRIES,
+                status=0,
+                allowed_methods=frozenset({'GET'}),
+                backoff_factor=0.1,
+            )
+            _pool = urllib3.PoolManager(
+                num_pools=config.APPIUM_NUM_POOLS,
+                maxsize=config.APPIUM_POOL_SIZE,
+                timeout=urllib3.Timeout(
+                    connect=config.APPIUM_CONNECT_TIMEOUT,
+                    read=config.APPIUM_READ_TIMEOUT,
+                ),
+                retries=retries,
+                cert_reqs='CERT_REQUIRED',
+                ca_certs=AppiumConnection.get_certificate_bundle_path(),
+            )
+        return _pool
+
+
+class PooledAppiumConnection(AppiumConnection):
+    """AppiumConnection that uses the shared keep-alive pool."""
+
+    def __init__(self, remote_server_addr: str):
+        super().__init__(remote_server_addr, keep_alive=True)
+
+    def _get_connection_manager(self):
+        if self._proxy_url:
+            return super()._get_connection_manager()  # proxy handling of Selenium
+        return shared_pool()
+
+    def close(self):
+        # The shared pool outlives the session; it is reused by the next one.
+        if getattr(self, '_conn', None) is not _pool:
+            super().close()
+
+
+class TransportStats:
+    """Requests vs new TCP connections of the shared pool (plus xdist workers)."""
+
+    def __init__(self):
+        self.merged = {'requests': 0, 'connections': 0}
+
+    def as_dict(self) -> dict:
+        totals = dict(self.merged)
+        if _pool is not None:
+            for key in list(_pool.pools.keys()):
+                pool = _pool.pools.get(key)
+                if pool is not None:
+                    totals['requests'] += pool.num_requests
+                    totals['connections'] += pool.num_connections
+        return totals
+
+    def merge(self, data: dict) -> None:
+        for name, value in data.items():
+            self.merged[name] += value
+
+    def __bool__(self):
+        return self.as_dict()['requests'] > 0
+
+    def summary(self) -> str:
+        totals = self.as_dict()
+        reused = totals['requests'] - totals['connections']
+        ratio = reused / totals['requests'] if totals['requests'] else 0.0
+        return (
+            f'transport: {totals["requests"]} requests over {totals["connections"]} connections '
+            f'({ratio:.1%} reused)'
+        )
+
+
+STATS = TransportStats()
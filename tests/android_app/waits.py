@@ -0,0 +1,253 @@
+"""
+Wait engine: fewer polling round trips per Selene wait.
+
+Selene's wait loop retries a condition back to back until
+``browser.config.timeout``; every retry is a full HTTP round trip, so a row
+that takes two seconds to appear on a device costs dozens of them.  The
+engine replaces the loop (``browser.config._build_wait_strategy``), selected
+with ``--waits``.  That hook and ``Wait``'s internals are private Selene API:
+requirements.txt pins the Selene version they were written against.
+
+- ``selene``: Selene's schedule, back-to-back polls (counted only).
+- ``adaptive`` (default): the first poll runs at once (most waits pass on it).  After
+  a miss, the next poll is scheduled from the wait's history: the recent
+  times-to-pass of the same entity and condition.  The engine sleeps until
+  shortly before the typical time, then backs off exponentially
+  (``wait_pollMin`` doubling up to ``wait_pollMax``), never past the
+  deadline.
+- ``server`` (opt-in, it changes the session's implicit wait): like
+  ``adaptive``, but a poll that missed because
+  the element does not exist yet is followed by a find that waits on the
+  device: the session's implicit wait is raised for it (at most
+  ``wait_serverSlice`` seconds, so the timeout and the health monitor stay
+  responsive) and UiAutomator2 / XCUITest answer as soon as the element
+  exists -- one round trip instead of a polling series.  The implicit wait
+  is set back to 0 when the wait ends.
+
+Times-to-pass are kept in the pytest cache between runs, keyed by locator
+and condition.  Digits in the locator are normalized (``Soak task 00001``
+and ``Soak task 00002`` share one key), and only the ``wait_historyKeys``
+most recently used keys are saved, so generated titles cannot grow the
+cache without bound.  The run summary reports polls per wait (mean / p95 /
+max) per condition.
+"""
+
+import re
+import statistics
+import time
+
+from selene.common.fp import identity
+from selene.core.exceptions import TimeoutException
+from selene.core.wait import Query, Wait
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+import config
+from perf_stats import percentile
+
+MODE = 'adaptive'
+CACHE_KEY = 'todo_app/wait_history'
+
+# Wait key -> times-to-pass of earlier runs (loaded from the cache)
+HISTORY = {}
+
+# Times-to-pass run at this fraction of the typical one, to catch early passes
+EARLY = 0.8
+
+_implicit = {}  # session id -> implicit wait (s) currently set on the server
+
+
+class WaitStats:
+    """Polls per wait, plus the times-to-pass recorded in this run."""
+
+    def __init__(self):
+        self.polls = {}      # condition -> [polls of each wait]
+        self.server_polls = 0
+        self.timeouts = 0
+        self.learned = {}    # wait key -> [times-to-pass]
+
+    def add(self, name: str, polls: int) -> None:
+        self.polls.setdefault(name, []).append(polls)
+
+    def learn(self, key: str, elapsed: float) -> None:
+        times = self.learned.setdefault(key, [])
+        times.append(round(elapsed, 3))
+        del times[:-config.WAIT_HISTORY]
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def merge(self, data: dict) -> None:
+        for name, values in data['polls'].items():
+            self.polls.setdefault(name, []).extend(values)
+        self.server_polls += data['server_polls']
+        self.timeouts += data['timeouts']
+        for key, times in data['learned'].items():
+            merged = self.learned.setdefault(key, [])
+            merged.extend(times)
+            del merged[:-config.WAIT_HISTORY]
+
+    def __bool__(self):
+        return bool(self.polls)
+
+    def summary(self, top: int = 10) -> str:
+        counts = [polls for values in self.polls.values() for polls in values]
+        lines = [
+            f'waits ({MODE}): {len(counts)} waits, {sum(counts) / len(counts):.2f} polls per wait '
+            f'(p95 {percentile(counts, 95):.0f}, max {max(counts)}), '
+            f'{self.server_polls} server-side polls, {self.timeouts} timeouts'
+        ]
+        rows = sorted(self.polls.items(), key=lambda item: sum(item[1]), reverse=True)
+        for name, values in rows[:top]:
+            lines.append(
+                f'  {name[:40]:<40} {len(values):>6} waits {sum(values) / len(values):>6.2f} polls/wait '
+                f'p95 {percentile(values, 95):>4.0f} max {max(values):>4}'
+            )
+        return '\n'.join(lines)
+
+
+STATS = WaitStats()
+
+
+def load_history(data: dict) -> None:
+    HISTORY.clear()
+    HISTORY.update(data)
+
+
+def history_to_save() -> dict:
+    """Earlier runs' times-to-pass with this run's appended (last wait_history kept).
+
+    Keys used in this run move to the end; only the last wait_historyKeys keys are kept.
+    """
+    saved = {key: list(times) for key, times in HISTORY.items()}
+    for key, times in STATS.learned.items():
+        saved[key] = (saved.pop(key, []) + times)[-config.WAIT_HISTORY:]
+    return dict(list(saved.items())[-config.WAIT_HISTORY_KEYS:])
+
+
+def wait_key(entity, condition: str) -> str:
+    """History key of a wait: its locator with digit runs normalized, and the condition."""
+    return f'{re.sub(r"[0-9]+", "#", str(entity))} {condition}'
+
+
+def expected_time(key: str):
+    # Median time-to-pass of this wait (earlier runs and this one), None if unknown
+    times = HISTORY.get(key, []) + STATS.learned.get(key, [])
+    return statistics.median(times) if times else None
+
+
+def build_wait_strategy(selene_config):
+    """``browser.config._build_wait_strategy``: Selene's wait with the engine's loop."""
+    return lambda entity: EngineWait(
+        entity,
+        at_most=selene_config.timeout,
+        or_fail_with=selene_config._inject_screenshot_and_page_source_pre_hooks(selene_config.hook_wait_failure),
+        _decorator=selene_config._wait_decorator,
+        selene_config=selene_config,
+    )
+
+
+class EngineWait(Wait):
+    def __init__(self, entity, at_most, or_fail_with=None, _decorator=lambda _: identity, selene_config=None):
+        super().__init__(entity, at_most, or_fail_with, _decorator)
+        self._selene_config = selene_config
+
+    # Selene's versions build a plain Wait (and drop the decorator)
+
+    def at_most(self, timeout: float) -> 'EngineWait':
+        return EngineWait(self.entity, timeout, self._hook_failure, self._decorator, self._selene_config)
+
+    def or_fail_with(self, hook_failure) -> 'EngineWait':
+        return EngineWait(self.entity, self._timeout, hook_failure, self._decorator, self._selene_config)
+
+    def until(self, fn) -> bool:
+        try:
+            self.or_fail_with(identity).for_(fn)
+            return True
+        except TimeoutException:
+            return False
+
+    def for_(self, fn):
+        pacer = _Pacer(self, fn)
+        # Same description, so failure messages and latency names stay as they were
+        paced = Query(getattr(fn, '__qualname__', str(fn)), pacer.poll)
+        try:
+            return super().for_(paced)
+        except TimeoutException:
+            STATS.timeouts += 1
+            raise
+        finally:
+            pacer.finish()
+
+
+class _Pacer:
+    """Polling schedule of one wait."""
+
+    def __init__(self, wait: EngineWait, fn):
+        self.wait = wait
+        self.fn = fn
+        self.name = str(fn).split(':')[0]
+        self.key = wait_key(wait.entity, self.name)
+        self.start = time.perf_counter()
+        self.deadline = self.start + wait._timeout
+        self.expected = expected_time(self.key)
+        self.backoff = config.WAIT_POLL_MIN
+        self.polls = 0
+        self.server_next = False
+        self.driver = None
+        self.passed = False
+
+    def poll(self, entity):
+        if self.server_next:
+            self._raise_implicit_wait()
+            STATS.server_polls += 1
+        elif self.polls and MODE != 'selene':
+            time.sleep(self._delay())
+        self.polls += 1
+        try:
+            result = self.fn(entity)
+        except Exception as e:
+            self.server_next = MODE == 'server' and _missing(e)
+            raise
+        self.passed = True
+        return result
+
+    def _delay(self) -> float:
+        now = time.perf_counter()
+        elapsed = now - self.start
+        if self.expected is not None and elapsed < EARLY * self.expected:
+            delay = EARLY * self.expected - elapsed
+        else:
+            delay = self.backoff
+            self.backoff = min(self.backoff * 2, config.WAIT_POLL_MAX)
+        return max(0.0, min(delay, self.deadline - now))
+
+    def _raise_implicit_wait(self) -> None:
+        self.driver = self.wait._selene_config.driver
+        remaining = max(0.0, self.deadline - time.perf_counter())
+        current = _implicit.get(self.driver.session_id, 0.0)
+        if current == 0.0 or current > remaining:
+            _set_implicit_wait(self.driver, min(config.WAIT_SERVER_SLICE, remaining))
+
+    def finish(self) -> None:
+        STATS.add(self.name, self.polls)
+        if self.passed:
+            STATS.learn(self.key, time.perf_counter() - self.start)
+        if self.driver is not None and _implicit.get(self.driver.session_id):
+            try:
+                _set_implicit_wait(self.driver, 0.0)
+            except WebDriverException:  # session gone; keep the wait's own error
+                _implicit.pop(self.driver.session_id, None)
+
+
+def _set_implicit_wait(driver, seconds: float) -> None:
+    driver.implicitly_wait(seconds)
+    _implicit[driver.session_id] = seconds
+
+
+def _missing(error: BaseException) -> bool:
+    # The poll failed because the element does not exist (yet)
+    while error is not None:
+        if isinstance(error, NoSuchElementException):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
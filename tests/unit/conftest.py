@@ -0,0 +1,16 @@
+"""
+Conftest for unit tests of the harness modules (no device, Appium or fake server).
+
+Run with:
+    pytest tests/unit
+"""
+
+import sys
+from pathlib import Path
+
+# Same import paths as the UI suite: project root (config) and the harness modules
+_project_root = Path(__file__).resolve().parent.parent.parent
+_android_app_dir = _project_root / 'tests' / 'android_app'
+for _path in (_project_root, _android_app_dir):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
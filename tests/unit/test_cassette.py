@@ -0,0 +1,20 @@
+"""
+Unit tests for cassette.py.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from cassette import cassette_path
+
+
+@pytest.mark.parametrize('path, worker, expected', [
+    ('run.json.gz', 'gw0', 'run.gw0.json.gz'),
+    ('./out/run.json.gz', 'gw0', 'out/run.gw0.json.gz'),
+    ('/tmp/my.dir/run.json.gz', 'gw1', '/tmp/my.dir/run.gw1.json.gz'),
+    ('../cassettes/run', 'gw2', '../cassettes/run.gw2'),
+    ('run.json.gz', None, 'run.json.gz'),
+])
+def test_cassette_path_inserts_worker_before_file_extensions(path, worker, expected):
+    assert Path(cassette_path(path, worker)) == Path(expected)
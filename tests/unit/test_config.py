@@ -0,0 +1,35 @@
+"""
+Unit tests for the Android device resolution of config.py.
+"""
+
+import pytest
+
+import config
+
+
+@pytest.fixture
+def no_adb(monkeypatch):
+    def discover(refresh=False):
+        raise AssertionError('adb discovery ran')
+    monkeypatch.setattr(config, 'discover_android_devices', discover)
+
+
+@pytest.mark.parametrize('raw', ['', 'any', 'any_active'])
+def test_offline_run_skips_device_discovery(monkeypatch, no_adb, raw):
+    monkeypatch.setattr(config, '_ANDROID_DEVICE_NAME_RAW', raw)
+    monkeypatch.setattr(config, 'ANDROID_DEVICE_DISCOVERY', False)
+    assert config.get_android_device_name() == 'emulator-5554'
+
+
+def test_explicit_device_needs_no_discovery(monkeypatch, no_adb):
+    monkeypatch.setattr(config, '_ANDROID_DEVICE_NAME_RAW', 'R5CT4037HVT')
+    assert config.get_android_device_name() == 'R5CT4037HVT'
+
+
+def test_any_device_picks_the_first_healthy_one(monkeypatch):
+    monkeypatch.setattr(config, '_ANDROID_DEVICE_NAME_RAW', 'any')
+    monkeypatch.setattr(config, 'discover_android_devices', lambda refresh=False: [
+        {'device': 'emulator-5554', 'healthy': False},
+        {'device': 'emulator-5556', 'healthy': True},
+    ])
+    assert config.get_android_device_name() == 'emulator-5556'
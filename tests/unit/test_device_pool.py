@@ -0,0 +1,70 @@
+"""
+Unit tests for device_pool.py leases.
+"""
+
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+import device_pool
+from device_pool import NoDeviceAvailable, lease_device
+
+
+@pytest.fixture(autouse=True)
+def lease_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(device_pool, 'LEASE_DIR', tmp_path)
+    return tmp_path
+
+
+def test_leases_are_exclusive_until_released():
+    first = lease_device(['a', 'b'], 'gw0', wait=0)
+    second = lease_device(['a', 'b'], 'gw0', wait=0)
+    assert {first.device, second.device} == {'a', 'b'}
+    with pytest.raises(NoDeviceAvailable):
+        lease_device(['a', 'b'], 'gw0', wait=0)
+    first.release()
+    assert lease_device(['a', 'b'], 'gw0', wait=0).device == first.device
+
+
+def test_lease_file_without_a_lock_is_free(lease_dir):
+    # An empty lease file (e.g. a leftover of an old run) does not block the device
+    (lease_dir / 'a.lease').write_text('')
+    assert lease_device(['a'], wait=0).device == 'a'
+
+
+def test_lease_of_a_killed_process_is_free(lease_dir):
+    android_app = Path(device_pool.__file__).resolve().parent
+    paths = [str(android_app), str(android_app.parent.parent)]
+    holder = subprocess.Popen([sys.executable, '-c', textwrap.dedent(f'''
+        import sys, time
+        sys.path[:0] = {paths!r}
+        import device_pool
+        from pathlib import Path
+        device_pool.LEASE_DIR = Path({str(lease_dir)!r})
+        device_pool.lease_device(['a'], wait=0)
+        print('leased', flush=True)
+        time.sleep(60)
+    ''')], stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == 'leased'
+        with pytest.raises(NoDeviceAvailable):
+            lease_device(['a'], wait=0)
+    finally:
+        holder.kill()
+        holder.wait()
+    assert lease_device(['a'], wait=0).device == 'a'
+
+
+def test_leases_from_part_of_the_pool_never_share_a_system_port():
+    # The prewarmer leases its first device, then a second one from the rest of the pool
+    pool = ['emulator-5556', 'emulator-5554', 'emulator-5558']
+    first = lease_device(['emulator-5556'], wait=0, pool=pool)
+    second = lease_device([d for d in pool if d != first.device], wait=0, pool=pool)
+    third = lease_device([d for d in pool if d != first.device], wait=0, pool=pool)
+    leases = [first, second, third]
+    assert len({lease.system_port for lease in leases}) == 3
+    assert {lease.slot for lease in leases} == {0, 1, 2}
+    assert first.slot == sorted(pool).index('emulator-5556')
@@ -0,0 +1,83 @@
+"""
+Unit tests for the session health monitor of health.py.
+"""
+
+import pytest
+from appium.webdriver.applicationstate import ApplicationState
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+import config
+import health
+
+
+class Executor:
+    def __init__(self, state=ApplicationState.RUNNING_IN_FOREGROUND, error=None):
+        self.state = state
+        self.error = error
+        self.calls = 0
+
+    def execute(self, command, params):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return {'status': 0, 'value': self.state}
+
+
+class ErrorHandler:
+    def check_response(self, response):
+        pass
+
+
+class Driver:
+    session_id = 'session'
+    capabilities = {'udid': 'emulator-5554'}
+    error_handler = ErrorHandler()
+
+    def __init__(self, error, executor):
+        self.error = error
+        self.command_executor = executor
+
+    def execute(self, driver_command, params=None):
+        raise self.error
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    monkeypatch.setattr(health, 'QUARANTINE', {})
+    monkeypatch.setattr(health, 'STATS', health.HealthStats())
+
+
+def test_recoverable_proxy_error_is_raised_as_is():
+    driver = health.install(Driver(WebDriverException('Could not proxy command: socket hang up'), Executor()),
+                            'android', adb=False)
+    with pytest.raises(WebDriverException):
+        driver.execute('findElement', {})
+    assert health.failure(driver) is None
+    assert health.QUARANTINE == {}
+
+
+def test_proxy_error_with_a_dead_server_quarantines_the_device():
+    executor = Executor(error=WebDriverException('instrumentation process is not running'))
+    driver = health.install(Driver(WebDriverException('socket hang up'), executor), 'android', adb=False)
+    with pytest.raises(health.SessionUnhealthy):
+        driver.execute('findElement', {})
+    assert 'emulator-5554' in health.QUARANTINE
+
+
+def test_crashed_instrumentation_is_fatal_without_a_probe():
+    executor = Executor()
+    error = WebDriverException('The instrumentation process is not running (probably crashed)')
+    driver = health.install(Driver(error, executor), 'android', adb=False)
+    with pytest.raises(health.SessionUnhealthy):
+        driver.execute('findElement', {})
+    assert executor.calls == 0
+
+
+def test_app_state_probe_keeps_the_miss_timer(monkeypatch):
+    monkeypatch.setattr(config, 'HEALTH_CHECK_INTERVAL', 0.0)
+    driver = health.install(Driver(NoSuchElementException('no such element'), Executor()), 'android', adb=False)
+    for _ in range(3):
+        with pytest.raises(NoSuchElementException):
+            driver.execute('findElement', {})
+    assert driver._health_monitor.miss_since is not None
+    assert health.STATS.checks == 2
@@ -0,0 +1,30 @@
+"""
+Unit tests for the shards of run_history.py.
+"""
+
+import run_history
+
+
+class Item:
+    def __init__(self, nodeid):
+        self.nodeid = nodeid
+
+    def get_closest_marker(self, name):
+        return None
+
+
+def test_shards_without_history_split_the_suite_in_collection_order():
+    items = [Item(f'test_{i}') for i in range(7)]
+    shards = run_history.lpt_shards(items, run_history.RunHistory(), 3)
+    assert [[item.nodeid for item in shard] for shard in shards] == [
+        ['test_0', 'test_3', 'test_6'], ['test_1', 'test_4'], ['test_2', 'test_5'],
+    ]
+
+
+def test_shards_with_history_balance_expected_durations():
+    items = [Item('slow'), Item('fast 1'), Item('fast 2')]
+    history = run_history.RunHistory({
+        'slow': {'durations': [4.0]}, 'fast 1': {'durations': [2.0]}, 'fast 2': {'durations': [2.0]},
+    })
+    shards = run_history.lpt_shards(items, history, 2)
+    assert [[item.nodeid for item in shard] for shard in shards] == [['slow'], ['fast 1', 'fast 2']]
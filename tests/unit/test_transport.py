@@ -0,0 +1,54 @@
+"""
+Unit tests for transport.py retries.
+"""
+
+import http.client
+
+import pytest
+import urllib3
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+from transport import StaleConnectionRetry
+
+
+def _retry():
+    return StaleConnectionRetry(total=2, connect=2, read=2, status=0, allowed_methods=frozenset({'GET'}))
+
+
+@pytest.mark.parametrize('cause', [
+    http.client.RemoteDisconnected('Remote end closed connection without response'),
+    ConnectionResetError(104, 'Connection reset by peer'),
+    BrokenPipeError(32, 'Broken pipe'),
+])
+def test_stale_pooled_connection_is_retried_for_get(cause):
+    retry = _retry().increment('GET', '/session/1/source', error=ProtocolError('Connection aborted.', cause))
+    assert retry.read == 1
+
+
+@pytest.mark.parametrize('method, url', [
+    ('POST', '/session/1/element/2/click'),
+    ('POST', '/session'),
+    ('DELETE', '/session/1'),
+])
+def test_reset_after_sending_a_command_is_not_retried(method, url):
+    # The server may already have run the command
+    error = ProtocolError('Connection aborted.', ConnectionResetError(104, 'Connection reset by peer'))
+    with pytest.raises(ProtocolError):
+        _retry().increment(method, url, error=error)
+
+
+def test_read_timeout_is_not_retried():
+    error = ReadTimeoutError(None, '/session', 'Read timed out.')
+    with pytest.raises(ReadTimeoutError):
+        _retry().increment('GET', '/session/1/source', error=error)
+
+
+def test_other_protocol_error_is_not_retried():
+    error = ProtocolError('Response ended prematurely')
+    with pytest.raises(ProtocolError):
+        _retry().increment('GET', '/session/1/source', error=error)
+
+
+def test_connect_error_is_retried():
+    error = urllib3.exceptions.NewConnectionError(None, 'Connection refused')
+    assert _retry().increment('POST', '/session', error=error).connect == 1
@@ -0,0 +1,32 @@
+"""
+Unit tests for the wait history of waits.py.
+"""
+
+import pytest
+
+import config
+import waits
+
+
+@pytest.fixture(autouse=True)
+def clean_history(monkeypatch):
+    monkeypatch.setattr(waits, 'HISTORY', {})
+    monkeypatch.setattr(waits, 'STATS', waits.WaitStats())
+
+
+def test_generated_titles_share_one_key():
+    first = waits.wait_key('browser.element((\'-android uiautomator\', \'new UiSelector().text("Soak task 00001")\'))', 'is visible')
+    other = waits.wait_key('browser.element((\'-android uiautomator\', \'new UiSelector().text("Soak task 00917")\'))', 'is visible')
+    label = waits.wait_key('browser.element((\'-android uiautomator\', \'new UiSelector().text("Refresh")\'))', 'is visible')
+    assert first == other
+    assert first != label
+
+
+def test_saved_history_keeps_the_most_recently_used_keys(monkeypatch):
+    monkeypatch.setattr(config, 'WAIT_HISTORY_KEYS', 3)
+    waits.load_history({'old 1': [0.1], 'old 2': [0.2], 'old 3': [0.3]})
+    waits.STATS.learn('old 1', 0.4)
+    waits.STATS.learn('new', 0.5)
+    saved = waits.history_to_save()
+    assert list(saved) == ['old 3', 'old 1', 'new']
+    assert saved['old 1'] == [0.1, 0.4]